@@ -1,47 +1,175 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g, send_file
 from flask_cors import CORS
-import torch
-import torchvision.transforms as transforms
+from werkzeug.exceptions import RequestEntityTooLarge
 from PIL import Image
 import io
 import base64
+import hmac
+import math
 import random
 import os
 import json
-import requests
-import cv2
+import threading
+import time
 import numpy as np
-from model_architecture import load_trained_model
+from batching import MicroBatcher
+from result_cache import ResultCache, make_cache_key
+from image_fetch import ImageFetcher
+from jobs import JobStore, JobRunner, JobQueueFull
+from streaming import RunningAggregate, ndjson_event, sse_event
+from preprocess_pool import PreprocessPool
+import fast_preprocess
+import density as density_engine
+import tiled_density
+import localization
+from vector_index import VectorIndex
+import telemetry
+import profiling
+import process_memory
+
+# torch and torchvision are imported lazily by warm_up(), so importing this
+# module stays cheap and the process can answer liveness probes at once.
+_process_started = time.perf_counter()
 
 app = Flask(__name__)
 CORS(app)
 
-# Load the trained model
-MODEL_PATH = 'model\\best_model.pt'
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+# Leveled logging written from a background thread (LOG_LEVEL=DEBUG adds per-request
+# detail) and Prometheus metrics on /metrics: per-stage latency histograms plus
+# counters for mock predictions, decode failures and model errors
+logger = telemetry.configure_logging('foulingguard', os.environ.get('LOG_LEVEL', 'INFO'))
+metrics = telemetry.Registry()
+STAGE_SECONDS = metrics.histogram('foulingguard_stage_seconds', 'Time spent in each request stage', ('stage',))
+REQUEST_SECONDS = metrics.histogram('foulingguard_request_seconds', 'Request latency by endpoint', ('endpoint',))
+REQUESTS = metrics.counter('foulingguard_requests_total', 'Requests by endpoint and status code', ('endpoint', 'status'))
+MOCK_PREDICTIONS = metrics.counter('foulingguard_mock_predictions_total', 'Predictions made without a trained model')
+FALLBACK_PREDICTIONS = metrics.counter('foulingguard_fallback_predictions_total', 'Random predictions served after a model error')
+MODEL_ERRORS = metrics.counter('foulingguard_model_errors_total', 'Failed model forward passes')
+DECODE_FAILURES = metrics.counter('foulingguard_decode_failures_total', 'Images that could not be read, by stage', ('stage',))
+
+# Opt-in profiling, only enabled when PROFILE_TOKEN is set: POST /admin/profile arms
+# the next N /predict or /calculate-density requests, or a single request sends
+# "X-Profile: cprofile|sampling" with "X-Profile-Token"; see profiling.py
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN') or None
+PROFILED_ENDPOINTS = ('predict', 'calculate_density')
+request_profiler = profiling.RequestProfiler(
+    os.environ.get('PROFILE_DIR', os.path.join('model', 'profiles')),
+    sample_interval=float(os.environ.get('PROFILE_SAMPLE_MS', 5)) / 1000
+)
+
+MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join('model', 'best_model.pt'))
+
+# Inference backend: eager, torchscript or onnxruntime (artifacts from export_model.py),
+# int8 (artifact from quantize_model.py) or compile
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'eager')
+TORCHSCRIPT_PATH = os.environ.get('TORCHSCRIPT_PATH', os.path.join('model', 'best_model.torchscript.pt'))
+ONNX_PATH = os.environ.get('ONNX_PATH', os.path.join('model', 'best_model.onnx'))
+QUANTIZED_PATH = os.environ.get('QUANTIZED_PATH', os.path.join('model', 'best_model.int8.pt'))
+INFERENCE_PARITY_CHECK = os.environ.get('INFERENCE_PARITY_CHECK', '0') == '1'  # compare against eager at startup
+
+# Memory-map eager/compile checkpoints on CPU so every worker process shares one copy
+# of the weights through the page cache (WEIGHTS_MMAP=0 loads a private copy instead)
+WEIGHTS_MMAP = os.environ.get('WEIGHTS_MMAP', '1') != '0'
 
-# Load the actual trained model
-print(f"🔄 Attempting to load model from: {MODEL_PATH}")
+# Filled in by warm_up()
 model = None
-if os.path.exists(MODEL_PATH):
-    try:
-        model = load_trained_model(MODEL_PATH, device, num_classes=10)
-        if model is not None:
-            print(f"🎆 REAL MODEL LOADED - Using your 84% accuracy trained model!")
-        else:
-            print(f"⚠️ Model architecture loading failed - using intelligent mock")
-    except Exception as e:
-        print(f"❌ Model loading error: {e}")
-        model = None
-else:
-    print(f"⚠️ Model file not found: {MODEL_PATH}")
-
-# Image preprocessing
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-])
+device = None
+transform = None
+fast_preprocessor = None
+MODEL_VERSION = 'untrained'  # weight version for cache keys, changes whenever the checkpoint is replaced
+
+_warmup_lock = threading.Lock()
+_service_state = {
+    'status': 'starting',  # starting -> warming_up -> ready | failed
+    'error': None,
+    'startup': {},
+    'parity': None
+}
+
+# Batch inference settings
+PREDICT_BATCH_SIZE = int(os.environ.get('PREDICT_BATCH_SIZE', 32))  # images per stacked forward pass
+MAX_BATCH_IMAGES = int(os.environ.get('MAX_BATCH_IMAGES', 300))     # images accepted by /predict-batch
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 4))      # images per forward pass in /predict-batch/stream
+
+# Sliding-window localization (/localize): window cap per photo, crops per forward
+# pass, and the long-side cap for the resized photo in shared-feature mode
+LOCALIZE_MAX_CROPS = int(os.environ.get('LOCALIZE_MAX_CROPS', 256))
+LOCALIZE_BATCH_SIZE = int(os.environ.get('LOCALIZE_BATCH_SIZE', 64))
+LOCALIZE_MAX_SIDE = int(os.environ.get('LOCALIZE_MAX_SIDE', 2048))
+
+# Forward passes allowed to run at once; request threads queue here instead of oversubscribing cores
+INFERENCE_CONCURRENCY = int(os.environ.get('INFERENCE_CONCURRENCY', 1))
+inference_slots = threading.BoundedSemaphore(max(1, INFERENCE_CONCURRENCY))
+
+# Micro-batching merges concurrent single-image /predict calls into one forward pass
+MICROBATCH_ENABLED = os.environ.get('MICROBATCH_ENABLED', '1') == '1'
+MICROBATCH_MAX_SIZE = int(os.environ.get('MICROBATCH_MAX_SIZE', 16))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get('MICROBATCH_MAX_WAIT_MS', 5))
+
+# Largest multipart or raw image/* upload accepted by the single-image endpoints
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 25 * 1024 * 1024))
+UPLOAD_HINT = ('Use JSON "image": "base64_string" or "image": "http://url", '
+               'a multipart/form-data "image" file, or a raw image/* request body')
+
+# Pooled HTTP fetching for image URLs, shared by every endpoint
+image_fetcher = ImageFetcher(
+    timeout=float(os.environ.get('FETCH_TIMEOUT', 10)),
+    max_bytes=int(os.environ.get('FETCH_MAX_BYTES', 25 * 1024 * 1024)),
+    per_host_limit=int(os.environ.get('FETCH_PER_HOST_LIMIT', 4)),
+    cache_ttl=float(os.environ.get('FETCH_CACHE_TTL', 60)),
+    max_workers=int(os.environ.get('FETCH_MAX_WORKERS', 8))
+)
+
+# Cap on the pixels used for Otsu density (0 = full resolution). At full resolution
+# density stays within ~1 point of the original cv2 pipeline (decoder rounding can
+# move the threshold one gray level); caps down to 0.12 MP stayed within ~2 points
+# on synthetic hull photos, see test_density_engine.py.
+DENSITY_MAX_PIXELS = int(os.environ.get('DENSITY_MAX_PIXELS', 0))
+
+# Fused preprocessing (FAST_PREPROCESS=0 falls back to the torchvision transform).
+# Bit-identical to the transform at full resolution; with DENSITY_MAX_PIXELS set,
+# JPEGs are also decoded at reduced scale, see fast_preprocess.py.
+FAST_PREPROCESS = os.environ.get('FAST_PREPROCESS', '1') != '0'
+# Input buffers of PREDICT_BATCH_SIZE images, allocated once and checked out per
+# batch; the default lets one batch be filled while each inference slot runs
+FAST_PREPROCESS_BUFFERS = int(os.environ.get('FAST_PREPROCESS_BUFFERS', max(1, INFERENCE_CONCURRENCY) + 1))
+
+# Optional decode/preprocessing pool (PREPROCESS_WORKERS=0 keeps it on the request
+# thread). Workers hand tensors back through shared-memory slots; every chunk of
+# PREDICT_BATCH_SIZE images must fit in the slots at once.
+PREPROCESS_WORKERS = int(os.environ.get('PREPROCESS_WORKERS', 0))
+preprocess_pool = PreprocessPool(
+    workers=PREPROCESS_WORKERS,
+    mode=os.environ.get('PREPROCESS_MODE', 'process'),
+    slots=max(PREDICT_BATCH_SIZE, int(os.environ.get('PREPROCESS_SLOTS', 2 * PREDICT_BATCH_SIZE))),
+    density_max_pixels=DENSITY_MAX_PIXELS
+) if PREPROCESS_WORKERS > 0 else None
+
+# Content-hash result cache for /predict and /calculate-density (RESULT_CACHE_PATH adds a disk tier)
+result_cache = ResultCache(
+    max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 1024)),
+    ttl_seconds=float(os.environ.get('RESULT_CACHE_TTL', 3600)),
+    disk_path=os.environ.get('RESULT_CACHE_PATH') or None
+)
+
+# Asynchronous inspection jobs (/jobs): SQLite store so unfinished jobs resume after a
+# restart, a small worker pool (inference itself is bounded by INFERENCE_CONCURRENCY),
+# and a cap on images waiting across all jobs before submissions get 429
+JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH', os.path.join('model', 'jobs.db'))
+JOB_MAX_IMAGES = int(os.environ.get('JOB_MAX_IMAGES', 5000))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 0.5))
+job_runner = JobRunner(
+    JobStore(JOB_STORE_PATH),
+    lambda items: analyze_chunk(items),
+    workers=int(os.environ.get('JOB_WORKERS', 1)),
+    chunk_size=PREDICT_BATCH_SIZE,
+    max_pending_images=int(os.environ.get('JOB_MAX_PENDING_IMAGES', 20000)),
+    stale_seconds=float(os.environ.get('JOB_STALE_SECONDS', 300))
+)
+
+# Embeddings (/embed, /embed-batch) and the nearest-neighbour index of past inspections
+# (/index/add, /index/search), memory-mapped from VECTOR_INDEX_PATH; see vector_index.py
+vector_index = VectorIndex(os.environ.get('VECTOR_INDEX_PATH', os.path.join('model', 'vector_index')))
 
 # Load actual species from your training data
 CLASS_MAPPING_PATH = 'model/class_mapping.json'
@@ -63,279 +191,915 @@ if os.path.exists(CLASS_MAPPING_PATH):
         with open(CLASS_MAPPING_PATH, 'r') as f:
             class_data = json.load(f)
             SPECIES_MAP = {int(k): v.replace('_', ' ').title() for k, v in class_data['id_to_species'].items()}
-            print(f"✅ Loaded {len(SPECIES_MAP)} species from training data")
-        print(f"🔍 Species: {list(SPECIES_MAP.values())[:3]}...")
     except Exception as e:
-        print(f"⚠️ Using fallback species mapping: {e}")
+        logger.warning("⚠️ Using fallback species mapping: %s", e)
 
-print(f"📊 Model status: {'Loaded' if model is not None else 'Mock Mode'}")
-print(f"📊 Species count: {len(SPECIES_MAP)}")
-print(f"📊 Device: {device}")
+def _load_model():
+    """Import torch, build the preprocessing pipeline and load the trained weights"""
+    global model, device, transform, fast_preprocessor, MODEL_VERSION
+    import torch
+    from backends import load_inference_model, check_parity
+    
+    # Quantized models only have CPU kernels
+    use_cuda = torch.cuda.is_available() and INFERENCE_BACKEND != 'int8'
+    device = torch.device('cuda' if use_cuda else 'cpu')
+    
+    # Image preprocessing
+    transform = fast_preprocess.torchvision_transform()
+    fast_preprocessor = fast_preprocess.FastPreprocessor(device, FAST_PREPROCESS_BUFFERS, PREDICT_BATCH_SIZE)
+    
+    # Load the actual trained model
+    weights_path = {
+        'torchscript': TORCHSCRIPT_PATH,
+        'onnxruntime': ONNX_PATH,
+        'int8': QUANTIZED_PATH
+    }.get(INFERENCE_BACKEND, MODEL_PATH)
+    logger.info("🔄 Attempting to load %s model from: %s", INFERENCE_BACKEND, weights_path)
+    if os.path.exists(weights_path):
+        try:
+            load_timings = {}
+            model = load_inference_model(INFERENCE_BACKEND, weights_path, device, num_classes=10,
+                                         mmap=WEIGHTS_MMAP, timings=load_timings)
+            if load_timings:
+                _service_state['startup']['weights'] = load_timings
+            if model is not None:
+                logger.info("🎆 REAL MODEL LOADED - Using your 84% accuracy trained model!")
+                weights_stat = os.stat(weights_path)
+                MODEL_VERSION = f"{weights_stat.st_size:x}-{weights_stat.st_mtime_ns:x}-{INFERENCE_BACKEND}"
+            else:
+                logger.warning("⚠️ Model architecture loading failed - using intelligent mock")
+        except Exception as e:
+            logger.error("❌ Model loading error: %s", e)
+            model = None
+    else:
+        logger.warning("⚠️ Model file not found: %s", weights_path)
+    
+    if model is not None and INFERENCE_PARITY_CHECK and INFERENCE_BACKEND != 'eager' and os.path.exists(MODEL_PATH):
+        reference = load_inference_model('eager', MODEL_PATH, device, num_classes=10)
+        if reference is not None:
+            parity = check_parity(reference, model, device)
+            _service_state['parity'] = parity
+            logger.info("🔍 %s parity vs eager: %s - %s", INFERENCE_BACKEND, parity['max_abs_diff'],
+                        'passed' if parity['passed'] else 'FAILED')
 
-def process_image(image_data):
-    """Process base64 image data or image URL"""
-    try:
-        # Check if it's a URL
-        if image_data.startswith(('http://', 'https://')):
-            print(f"Downloading image from URL: {image_data[:50]}...")
+def warm_up():
+    """Load the model and run one dummy forward pass; safe to call repeatedly.
+    
+    Serving entry points call this at startup. Requests that arrive earlier
+    (e.g. from a test client) block here until warm-up has finished.
+    """
+    if _service_state['status'] in ('ready', 'failed'):
+        return
+    with _warmup_lock:
+        if _service_state['status'] in ('ready', 'failed'):
+            return
+        _service_state['status'] = 'warming_up'
+        timings = _service_state['startup']
+        started = time.perf_counter()
+        try:
+            import torch
+            timings['torch_import_seconds'] = round(time.perf_counter() - started, 3)
             
-            # Extract direct image URL from Bing search if needed
-            if 'bing.com/images/search' in image_data and 'mediaurl=' in image_data:
-                import urllib.parse
-                parsed = urllib.parse.parse_qs(urllib.parse.urlparse(image_data).query)
-                if 'mediaurl' in parsed:
-                    direct_url = urllib.parse.unquote(parsed['mediaurl'][0])
-                    print(f"Extracted direct URL: {direct_url[:50]}...")
-                    image_data = direct_url
+            load_started = time.perf_counter()
+            _load_model()
+            timings['model_load_seconds'] = round(time.perf_counter() - load_started, 3)
             
-            response = requests.get(image_data, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
+            if model is not None:
+                # First forward pass allocates buffers and picks kernels; do it before taking traffic
+                forward_started = time.perf_counter()
+                with torch.no_grad():
+                    model(torch.zeros(1, 3, 224, 224, device=device))
+                timings['dummy_forward_seconds'] = round(time.perf_counter() - forward_started, 3)
             
-            # Check if response is actually an image
-            content_type = response.headers.get('content-type', '')
-            if not content_type.startswith('image/'):
-                raise ValueError(f"URL returned {content_type}, not an image")
-                
-            image_bytes = response.content
-        else:
-            # Handle base64 data
-            if ',' in image_data:
-                image_data = image_data.split(',')[1]
+            timings['warm_up_seconds'] = round(time.perf_counter() - started, 3)
+            timings['cold_start_seconds'] = round(time.perf_counter() - _process_started, 3)
+            _service_state['status'] = 'ready'
+        except Exception as e:
+            logger.exception("❌ Warm-up failed: %s", e)
+            _service_state['status'] = 'failed'
+            _service_state['error'] = str(e)
+            return
+    
+    logger.info("📊 Model status: %s", 'Loaded' if model is not None else 'Mock Mode')
+    logger.info("📊 Species count: %d", len(SPECIES_MAP))
+    logger.debug("🔍 Species: %s...", list(SPECIES_MAP.values())[:3])
+    logger.info("📊 Device: %s", device)
+    logger.info("⏱️ Cold start: %ss (warm-up %ss)", timings['cold_start_seconds'], timings['warm_up_seconds'])
+
+def resume_jobs():
+    """Start the job workers to pick up jobs a previous process left unfinished
+    
+    Call this in each serving process, never in serve.py's preloading parent:
+    job threads running a forward pass there would be forked mid-flight, and
+    a worker could start with inference_slots or the job store lock held.
+    """
+    if os.path.exists(JOB_STORE_PATH):
+        job_runner.start()
+
+def fetch_image_bytes(image_data):
+    """Like load_image_bytes() but returns None instead of raising"""
+    try:
+        return load_image_bytes(image_data)
+    except Exception as e:
+        logger.warning("❌ Error loading image: %s", e)
+        return None
+
+def load_image_bytes(image_data):
+    """Fetch raw image bytes from base64 image data or an image URL"""
+    # Check if it's a URL
+    if image_data.startswith(('http://', 'https://')):
+        try:
+            with STAGE_SECONDS.time(stage='fetch'):
+                image_bytes = image_fetcher.fetch(image_data)
+        except Exception:
+            DECODE_FAILURES.inc(stage='fetch')
+            raise
+    else:
+        # Handle base64 data
+        if ',' in image_data:
+            image_data = image_data.split(',')[1]
+        
+        # Validate base64
+        if len(image_data) < 100:
+            DECODE_FAILURES.inc(stage='base64')
+            raise ValueError("Base64 data too short")
             
-            # Validate base64
-            if len(image_data) < 100:
-                raise ValueError("Base64 data too short")
-                
-            # Add padding if needed
-            missing_padding = len(image_data) % 4
-            if missing_padding:
-                image_data += '=' * (4 - missing_padding)
-                
-            image_bytes = base64.b64decode(image_data)
+        # Add padding if needed
+        missing_padding = len(image_data) % 4
+        if missing_padding:
+            image_data += '=' * (4 - missing_padding)
+        
+        try:
+            with STAGE_SECONDS.time(stage='base64'):
+                image_bytes = base64.b64decode(image_data)
+        except Exception:
+            DECODE_FAILURES.inc(stage='base64')
+            raise
+    
+    return image_bytes
+
+def read_capped(stream, limit):
+    """Read a body of unknown length, stopping one byte past ``limit`` so oversized uploads can be refused"""
+    chunks = []
+    size = 0
+    while size <= limit:
+        chunk = stream.read(min(1024 * 1024, limit + 1 - size))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    return b''.join(chunks)
+
+def read_image_request():
+    """Image bytes and options from a JSON, multipart/form-data or raw image/* request
+    
+    Binary uploads skip base64 entirely: the body (or the form's ``image``
+    file) is read once into bytes that go straight to the decoder, and
+    options come from the form fields or the query string. Returns
+    ``(image_bytes, options, error)`` where ``error`` is a ready
+    ``(response, status)`` pair or None.
+    """
+    too_large = (jsonify({
+        'error': 'Upload too large',
+        'details': f'At most {MAX_UPLOAD_BYTES} bytes are accepted per image'
+    }), 413)
+    if request.content_length and request.content_length > MAX_UPLOAD_BYTES and not request.is_json:
+        return None, {}, too_large
+    
+    mimetype = request.mimetype or ''
+    if mimetype == 'multipart/form-data':
+        # Chunked bodies have no Content-Length; bound the form parser as well (Flask 3.1+)
+        try:
+            request.max_content_length = MAX_UPLOAD_BYTES
+        except AttributeError:
+            pass
+        try:
+            upload = request.files.get('image')
+        except RequestEntityTooLarge:
+            return None, {}, too_large
+        options = request.form.to_dict()
+        if upload is None:
+            if 'image' not in options:
+                return None, options, (jsonify({'error': 'No image data provided', 'details': UPLOAD_HINT}), 400)
+            # A text "image" field carries base64 or a URL, as in the JSON form
+            return fetch_image_bytes(options.pop('image')), options, None
+        image_bytes = read_capped(upload.stream, MAX_UPLOAD_BYTES)
+        if len(image_bytes) > MAX_UPLOAD_BYTES:
+            return None, options, too_large
+        return image_bytes, options, None
+    
+    if mimetype.startswith('image/') or mimetype == 'application/octet-stream':
+        image_bytes = read_capped(request.stream, MAX_UPLOAD_BYTES)
+        if len(image_bytes) > MAX_UPLOAD_BYTES:
+            return None, {}, too_large
+        if not image_bytes:
+            return None, {}, (jsonify({'error': 'No image data provided', 'details': UPLOAD_HINT}), 400)
+        return image_bytes, request.args.to_dict(), None
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'image' not in data:
+        return None, {}, (jsonify({'error': 'No image data provided', 'details': UPLOAD_HINT}), 400)
+    return fetch_image_bytes(data['image']), data, None
+
+def option_flag(value):
+    """Boolean request option from JSON (true/false) or form/query text ("1", "true", "yes", "on")"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def decode_image(image_data, max_pixels=None):
+    """Decode base64 image data, an image URL or raw image bytes once into an RGB image.
+    
+    The decoded image is the single pixel buffer shared by the classifier
+    transform and the Otsu density calculation, so each upload is fetched
+    and decoded exactly once per request. With ``max_pixels`` (the density
+    cap) and fast preprocessing on, JPEGs are decoded at a reduced scale.
+    """
+    try:
+        if isinstance(image_data, bytes):
+            image_bytes = image_data
+        else:
+            image_bytes = load_image_bytes(image_data)
         
         # Validate image bytes
         if len(image_bytes) < 1000:
+            DECODE_FAILURES.inc(stage='decode')
             raise ValueError("Image data too small")
         
-        # Process image with error handling
+        # Decode with error handling; convert() forces a full decode, so
+        # truncated or corrupt data fails here without a separate verify() pass
         try:
-            image = Image.open(io.BytesIO(image_bytes))
-            # Verify image can be loaded
-            image.verify()
-            # Reopen for processing (verify closes the image)
-            image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+            with STAGE_SECONDS.time(stage='decode'):
+                if FAST_PREPROCESS and max_pixels:
+                    image = fast_preprocess.decode_rgb(image_bytes, max_pixels)
+                else:
+                    image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
         except Exception as img_error:
+            DECODE_FAILURES.inc(stage='decode')
             raise ValueError(f"Invalid image format: {img_error}")
         
+        logger.debug("✅ Image decoded successfully: %s", image.size)
+        return image
+        
+    except Exception as e:
+        logger.warning("❌ Error decoding image: %s", e)
+        return None
+
+def process_image(image):
+    """Turn a decoded RGB image (or raw base64 data / image URL) into a model input tensor"""
+    try:
+        if isinstance(image, str):
+            image = decode_image(image)
+            if image is None:
+                return None
+        
         # Apply transforms
-        image_tensor = transform(image).unsqueeze(0).to(device)
-        print(f"✅ Image processed successfully: {image.size}")
+        warm_up()
+        with STAGE_SECONDS.time(stage='transform'):
+            image_tensor = transform(image).unsqueeze(0).to(device)
+        logger.debug("✅ Image processed successfully: %s", image.size)
         return image_tensor
         
     except Exception as e:
-        print(f"❌ Error processing image: {e}")
+        logger.warning("❌ Error processing image: %s", e)
         return None
 
-def calculate_fouling_density(image_data):
-    """Calculate fouling density using Otsu thresholding similar to the Google Colab approach"""
+def calculate_fouling_density(image, tile_size=None, local_threshold=False):
+    """Calculate fouling density using Otsu thresholding similar to the Google Colab approach
+    
+    Accepts an RGB image already decoded by decode_image(), or encoded image
+    bytes / base64 data / an image URL, which are decoded straight to
+    grayscale without building an RGB copy. With ``tile_size`` the result
+    also carries a per-tile density grid (see tiled_density.py).
+    """
     try:
-        # Process image data similar to process_image function
-        if image_data.startswith(('http://', 'https://')):
-            print(f"Downloading image from URL for density calculation: {image_data[:50]}...")
-            
-            if 'bing.com/images/search' in image_data and 'mediaurl=' in image_data:
-                import urllib.parse
-                parsed = urllib.parse.parse_qs(urllib.parse.urlparse(image_data).query)
-                if 'mediaurl' in parsed:
-                    direct_url = urllib.parse.unquote(parsed['mediaurl'][0])
-                    image_data = direct_url
-            
-            response = requests.get(image_data, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
-            image_bytes = response.content
+        if isinstance(image, str):
+            image = load_image_bytes(image)
+        
+        if isinstance(image, bytes):
+            if len(image) < 1000:
+                DECODE_FAILURES.inc(stage='decode')
+                raise ValueError("Image data too small")
+            try:
+                with STAGE_SECONDS.time(stage='decode'):
+                    gray = density_engine.decode_grayscale(image, DENSITY_MAX_PIXELS)
+            except Exception:
+                DECODE_FAILURES.inc(stage='decode')
+                raise
+        elif image is not None:
+            gray = None
         else:
-            # Handle base64 data
-            if ',' in image_data:
-                image_data = image_data.split(',')[1]
-            
-            # Add padding if needed
-            missing_padding = len(image_data) % 4
-            if missing_padding:
-                image_data += '=' * (4 - missing_padding)
-                
-            image_bytes = base64.b64decode(image_data)
-        
-        # Convert to OpenCV format
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if img is None:
             raise ValueError("Could not decode image")
         
-        # Convert BGR to RGB (OpenCV loads as BGR)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-        
-        # Apply Otsu thresholding - same as in the Google Colab code
-        _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
-        # Calculate density (ratio of white pixels to total pixels)
-        # White pixels represent fouling areas
-        density = mask.sum() / (mask.size * 255) * 100
+        # Otsu threshold and fouling pixel count come from the histogram alone;
+        # fouling pixels are those brighter than the threshold
+        with STAGE_SECONDS.time(stage='otsu'):
+            if gray is None:
+                gray = density_engine.to_grayscale(image, DENSITY_MAX_PIXELS)
+            if tile_size:
+                source = tiled_density.ArraySource(np.asarray(gray))
+                result = tiled_density.calculate_tiled_density(source, tile_size, local_threshold)
+            else:
+                result = density_engine.calculate_density(gray)
+        result['success'] = True
         
-        print(f"✅ Density calculation complete: {density:.2f}%")
-        
-        return {
-            'density_percentage': round(density, 2),
-            'total_pixels': mask.size,
-            'fouling_pixels': int(mask.sum() / 255),
-            'threshold_method': 'otsu',
-            'success': True
-        }
+        logger.debug("✅ Density calculation complete: %.2f%%", result['density_percentage'])
+        return result
         
     except Exception as e:
-        print(f"❌ Error calculating density: {e}")
+        logger.warning("❌ Error calculating density: %s", e)
         return {
             'error': f'Density calculation failed: {str(e)}',
             'success': False
         }
 
-def predict_fouling(image_tensor, image_data=None):
-    """Make prediction using the actual trained model with density calculation"""
-    # Always calculate density using Otsu thresholding when image_data is provided
-    density_result = None
-    calculated_density = None
-    
-    if image_data:
-        print("🔍 Calculating density using Otsu thresholding...")
-        density_result = calculate_fouling_density(image_data)
-        if density_result and density_result['success']:
-            calculated_density = density_result['density_percentage']
-            print(f"✅ Density calculated: {calculated_density}%")
-        else:
-            print("❌ Density calculation failed, will use fallback")
+def _density_for(image):
+    """Run Otsu density for a decoded image, returning the result only when it succeeded"""
+    if image is None:
+        return None
+    density_result = calculate_fouling_density(image)
+    if density_result and density_result['success']:
+        return density_result
+    logger.warning("❌ Density calculation failed, will use fallback")
+    return None
+
+def _mock_prediction(density_result):
+    """Intelligent mock prediction used when no trained model is loaded"""
+    species_weights = [0.096, 0.137, 0.091, 0.086, 0.039, 0.060, 0.137, 0.115, 0.131, 0.122]
+    species_id = random.choices(range(len(SPECIES_MAP)), weights=species_weights)[0]
+    species = SPECIES_MAP[species_id]
+    
+    # Always prefer calculated density over mock
+    if density_result is not None:
+        density = density_result['density_percentage']
+    else:
+        density = max(20, min(95, int(random.gauss(75, 18))))
+        logger.debug("📊 Using fallback mock density: %s%%", density)
+    
+    high_risk_species = [1, 6, 8]
+    if density > 80 or species_id in high_risk_species:
+        criticality = 'High'
+        confidence = round(random.uniform(0.85, 0.95), 2)
+    elif density > 50:
+        criticality = 'Medium'
+        confidence = round(random.uniform(0.75, 0.88), 2)
+    else:
+        criticality = 'Low'
+        confidence = round(random.uniform(0.70, 0.82), 2)
+        
+    return {
+        'species': species,
+        'density': density,
+        'criticality': criticality,
+        'confidence': confidence,
+        'density_details': density_result,
+        'source': 'mock'
+    }
+
+def _model_prediction(species_probs, coverage_raw, density_result):
+    """Turn one row of model outputs into a prediction"""
+    # Species prediction
+    species_pred = int(np.argmax(species_probs))
+    confidence = float(np.max(species_probs))
+    
+    # Always prefer calculated density over model coverage prediction
+    if density_result is not None:
+        density = density_result['density_percentage']
+    else:
+        # Fallback to coverage prediction only if density calculation failed
+        density = 1 / (1 + math.exp(-coverage_raw)) * 100
+        density = max(5, min(95, int(density)))
+        logger.debug("📊 Using model coverage prediction as density fallback: %s%%", density)
+    
+    # Determine criticality based on density and species
+    high_risk_species = [1, 6, 8]  # Balanus Amphitrite, Perna Viridis, Saccostrea
+    if density > 75 or int(species_pred) in high_risk_species:
+        criticality = 'High'
+    elif density > 40:
+        criticality = 'Medium'
+    else:
+        criticality = 'Low'
+    
+    logger.debug("🤖 REAL MODEL PREDICTION: %s - %s%% density - %s", SPECIES_MAP.get(int(species_pred)), density, criticality)
+    
+    return {
+        'species': SPECIES_MAP.get(int(species_pred), 'Unknown Species'),
+        'density': density,
+        'criticality': criticality,
+        'confidence': round(confidence, 3),
+        'density_details': density_result,
+        'source': 'model'
+    }
+
+def _fallback_prediction(density_result):
+    """Random prediction used when the model forward pass fails"""
+    # Fallback to mock with calculated density
+    if density_result is not None:
+        fallback_density = density_result['density_percentage']
+    else:
+        fallback_density = random.randint(15, 85)
+        logger.debug("📊 Using random density in fallback: %s%%", fallback_density)
+        
+    return {
+        'species': random.choice(list(SPECIES_MAP.values())),
+        'density': fallback_density,
+        'criticality': random.choice(['Low', 'Medium', 'High']),
+        'confidence': 0.75,
+        'density_details': density_result,
+        'source': 'fallback'
+    }
+
+def forward_in_chunks(image_tensors, batch_size=None):
+    """Run the model over 1x3x224x224 tensors stacked into chunks of ``batch_size``
+    
+    Returns one (species_probs, coverage_raw) pair per input tensor, as a
+    NumPy probability vector and a float logit.
+    """
+    import torch
+    
+    batch_size = batch_size or PREDICT_BATCH_SIZE
+    outputs = []
+    with torch.no_grad():
+        for start in range(0, len(image_tensors), batch_size):
+            batch = torch.cat(image_tensors[start:start + batch_size], dim=0)
+            with inference_slots, STAGE_SECONDS.time(stage='forward'), request_profiler.torch_forward():
+                species_logits, coverage_raw = model(batch)
+            species_probs = torch.softmax(species_logits, dim=1).cpu().numpy()
+            outputs.extend(zip(species_probs, coverage_raw[:, 0].cpu().tolist()))
+    return outputs
+
+inference_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_inference_batcher():
+    """Return the shared micro-batcher, starting its worker on first use"""
+    global inference_batcher
+    if not MICROBATCH_ENABLED or MICROBATCH_MAX_SIZE <= 1:
+        return None
+    with _batcher_lock:
+        if inference_batcher is None:
+            # Created lazily so the worker thread starts in the serving process
+            inference_batcher = MicroBatcher(
+                lambda image_tensors: forward_in_chunks(image_tensors, MICROBATCH_MAX_SIZE),
+                max_batch_size=MICROBATCH_MAX_SIZE,
+                max_wait_ms=MICROBATCH_MAX_WAIT_MS
+            )
+        return inference_batcher
+
+def _forward(image_tensors):
+    """Single images go through the micro-batcher, explicit batches run directly"""
+    if len(image_tensors) == 1:
+        batcher = get_inference_batcher()
+        if batcher is not None:
+            return [batcher.submit(image_tensors[0])]
+    return forward_in_chunks(image_tensors)
+
+def predict_fouling_batch(image_tensors, images=None, density_results=None):
+    """Predict several images with a single stacked forward pass per chunk
+    
+    ``images`` are the decoded RGB images the tensors were built from and are
+    used for the Otsu density calculation, unless ``density_results`` were
+    already computed (by the preprocessing pool).
+    """
+    warm_up()
+    if images is None:
+        images = [None] * len(image_tensors)
+    if density_results is None:
+        density_results = [None] * len(image_tensors)
+    density_results = [
+        density_result if density_result is not None else _density_for(image)
+        for image, density_result in zip(images, density_results)
+    ]
     
     if model is None:
-        # Fallback to intelligent mock
-        species_weights = [0.096, 0.137, 0.091, 0.086, 0.039, 0.060, 0.137, 0.115, 0.131, 0.122]
-        species_id = random.choices(range(len(SPECIES_MAP)), weights=species_weights)[0]
-        species = SPECIES_MAP[species_id]
-        
-        # Always prefer calculated density over mock
-        if calculated_density is not None:
-            density = calculated_density
-            print(f"📊 Using calculated density: {density}%")
-        else:
-            density = max(20, min(95, int(random.gauss(75, 18))))
-            print(f"📊 Using fallback mock density: {density}%")
-        
-        high_risk_species = [1, 6, 8]
-        if density > 80 or species_id in high_risk_species:
-            criticality = 'High'
-            confidence = round(random.uniform(0.85, 0.95), 2)
-        elif density > 50:
-            criticality = 'Medium'
-            confidence = round(random.uniform(0.75, 0.88), 2)
-        else:
-            criticality = 'Low'
-            confidence = round(random.uniform(0.70, 0.82), 2)
-            
-        return {
-            'species': species,
-            'density': density,
-            'criticality': criticality,
-            'confidence': confidence,
-            'density_details': density_result if density_result and density_result['success'] else None
-        }
+        MOCK_PREDICTIONS.inc(len(density_results))
+        return [_mock_prediction(density_result) for density_result in density_results]
     
     # Use actual trained model (84% accuracy)
     try:
-        with torch.no_grad():
-            species_logits, coverage_raw = model(image_tensor)
-            
-            # Species prediction
-            species_probs = torch.softmax(species_logits, dim=1)
-            species_pred = torch.argmax(species_probs, dim=1).item()
-            confidence = torch.max(species_probs, dim=1)[0].item()
-            
-            # Always prefer calculated density over model coverage prediction
-            if calculated_density is not None:
-                density = calculated_density
-                print(f"📊 Using calculated density: {density}%")
-            else:
-                # Fallback to coverage prediction only if density calculation failed
-                density = torch.sigmoid(coverage_raw).item() * 100
-                density = max(5, min(95, int(density)))
-                print(f"📊 Using model coverage prediction as density fallback: {density}%")
-            
-            # Determine criticality based on density and species
-            high_risk_species = [1, 6, 8]  # Balanus Amphitrite, Perna Viridis, Saccostrea
-            if density > 75 or int(species_pred) in high_risk_species:
-                criticality = 'High'
-            elif density > 40:
-                criticality = 'Medium'
-            else:
-                criticality = 'Low'
-            
-            print(f"🤖 REAL MODEL PREDICTION: {SPECIES_MAP.get(int(species_pred))} - {density}% density - {criticality}")
-            
-            return {
-                'species': SPECIES_MAP.get(int(species_pred), 'Unknown Species'),
-                'density': density,
-                'criticality': criticality,
-                'confidence': round(confidence, 3),
-                'density_details': density_result if density_result and density_result['success'] else None
-            }
-            
+        outputs = _forward(image_tensors)
+        return [
+            _model_prediction(species_probs, coverage_raw, density_result)
+            for (species_probs, coverage_raw), density_result in zip(outputs, density_results)
+        ]
     except Exception as e:
-        print(f"❌ Model prediction error: {e}")
-        # Fallback to mock with calculated density
-        if calculated_density is not None:
-            fallback_density = calculated_density
-            print(f"📊 Using calculated density in fallback: {fallback_density}%")
+        logger.exception("❌ Model prediction error: %s", e)
+        MODEL_ERRORS.inc()
+        FALLBACK_PREDICTIONS.inc(len(density_results))
+        return [_fallback_prediction(density_result) for density_result in density_results]
+
+def predict_fouling(image_tensor, image=None, density_result=None):
+    """Make prediction using the actual trained model with density calculation
+    
+    ``image`` is the decoded RGB image the tensor was built from, so the
+    density calculation reuses it instead of decoding the upload again.
+    """
+    return predict_fouling_batch([image_tensor], [image], [density_result])[0]
+
+def prepare_inputs(sources):
+    """Model inputs for raw image bytes (None entries are skipped)
+    
+    Returns ``(image_tensor, image, density_result, handle)`` or None per
+    source. Fused preprocessing writes the tensors into a buffer checked out
+    of fast_preprocessor, and with the preprocessing pool, decode, density
+    and normalisation run in its workers and ``image`` is None; either way
+    ``handle`` must be released with release_inputs() after the forward
+    pass. Otherwise the image is decoded here and density is computed later
+    from ``image``.
+    """
+    warm_up()
+    if preprocess_pool is None and FAST_PREPROCESS:
+        images = [decode_image(image_bytes, DENSITY_MAX_PIXELS) if image_bytes is not None else None
+                  for image_bytes in sources]
+        valid = [index for index, image in enumerate(images) if image is not None]
+        prepared = [None] * len(sources)
+        if valid:
+            # Views into one checked-out buffer, handed back by release_inputs()
+            with STAGE_SECONDS.time(stage='transform'):
+                inputs = fast_preprocessor.checkout([images[index] for index in valid])
+            for slot, index in enumerate(valid):
+                prepared[index] = (inputs.tensor[slot:slot + 1], images[index], None, inputs)
+        return prepared
+    
+    if preprocess_pool is None:
+        prepared = []
+        for image_bytes in sources:
+            image = decode_image(image_bytes) if image_bytes is not None else None
+            image_tensor = process_image(image) if image is not None else None
+            prepared.append((image_tensor, image, None, None) if image_tensor is not None else None)
+        return prepared
+    
+    # Same minimum size as decode_image()
+    valid = [index for index, image_bytes in enumerate(sources) if image_bytes is not None and len(image_bytes) >= 1000]
+    prepared = [None] * len(sources)
+    with STAGE_SECONDS.time(stage='preprocess_pool'):
+        items = preprocess_pool.preprocess_many([sources[index] for index in valid])
+    for index, item in zip(valid, items):
+        if item is not None:
+            prepared[index] = (item.tensor.to(device), None, item.density_result, item)
         else:
-            fallback_density = random.randint(15, 85)
-            print(f"📊 Using random density in fallback: {fallback_density}%")
-            
-        return {
-            'species': random.choice(list(SPECIES_MAP.values())),
-            'density': fallback_density,
-            'criticality': random.choice(['Low', 'Medium', 'High']),
-            'confidence': 0.75,
-            'density_details': density_result if density_result and density_result['success'] else None
-        }
+            DECODE_FAILURES.inc(stage='decode')
+    return prepared
+
+def cache_version():
+    """Result-cache key version: the weights plus the settings that change cached payloads
+    
+    DENSITY_MAX_PIXELS and FAST_PREPROCESS both alter densities and inputs,
+    and the disk tier outlives restarts, so a config change starts fresh keys.
+    """
+    return f"{MODEL_VERSION}-d{DENSITY_MAX_PIXELS}-f{int(FAST_PREPROCESS)}"
+
+def release_inputs(prepared):
+    for entry in prepared:
+        if entry is not None and entry[3] is not None:
+            entry[3].release()
+
+def localize_species(image, window=None, overlap=0.5, mode=None):
+    """Per-region species and coverage for a decoded RGB image
+    
+    ``shared`` mode runs the ResNet trunk once over the resized photo and
+    pools layer4 features per window, so overlapping windows reuse the same
+    convolutions. ``crops`` mode scores real 224x224 crops in batches of
+    LOCALIZE_BATCH_SIZE and also works for exported or quantized backends.
+    """
+    import torch
+    
+    warm_up()
+    width, height = image.size
+    window, stride = localization.plan_windows(width, height, window, overlap, LOCALIZE_MAX_CROPS)
+    if mode is None:
+        mode = 'shared' if localization.supports_shared_features(model) else 'crops'
+    
+    started = time.perf_counter()
+    if mode == 'shared':
+        if not localization.supports_shared_features(model):
+            raise ValueError(f"Shared-feature localization needs the eager model, not the {INFERENCE_BACKEND} backend")
+        scaled, stride_cells = localization.shared_feature_plan(
+            width, height, window, stride, LOCALIZE_MAX_SIDE, LOCALIZE_MAX_CROPS)
+        # transform minus its fixed 224x224 resize
+        image_tensor = transforms_after_resize(image.resize(scaled, Image.BILINEAR)).unsqueeze(0).to(device)
+        with torch.no_grad(), inference_slots:
+            species_logits, coverage_raw, grid = localization.shared_feature_windows(model, image_tensor, stride_cells)
+        species_probs = torch.softmax(species_logits, dim=1).cpu().numpy()
+        coverage_raw = coverage_raw[:, 0].cpu().numpy()
+        boxes = localization.shared_feature_boxes(width, height, scaled, stride_cells, grid)
+    else:
+        boxes, grid = localization.window_boxes(width, height, window, stride)
+        outputs = []
+        # Only one batch of crop tensors is alive at a time
+        for start in range(0, len(boxes), LOCALIZE_BATCH_SIZE):
+            crops = [transform(image.crop(box)).unsqueeze(0).to(device) for box in boxes[start:start + LOCALIZE_BATCH_SIZE]]
+            outputs.extend(forward_in_chunks(crops, LOCALIZE_BATCH_SIZE))
+        species_probs = np.stack([probs for probs, _ in outputs])
+        coverage_raw = np.array([raw for _, raw in outputs])
+    
+    result = localization.summarize_regions(species_probs, coverage_raw, boxes, grid, SPECIES_MAP)
+    result.update({
+        'mode': mode,
+        'window': window,
+        'regions_scored': len(boxes),
+        'inference_seconds': round(time.perf_counter() - started, 4)
+    })
+    logger.info("🗺️ Localized %d regions (%s) in %ss", len(boxes), mode, result['inference_seconds'])
+    return result
+
+def supports_embeddings():
+    """Embeddings need the eager (or compiled) BiofoulingModel; exported backends only return the heads"""
+    return model is not None and hasattr(model, 'embed')
+
+def embed_tensors(image_tensors, normalize=True):
+    """2048-d backbone features for 1x3x224x224 tensors as an (N, 2048) float32 array
+    
+    With ``normalize`` the rows are L2-normalised, so inner products in the
+    vector index are cosine similarities.
+    """
+    import torch
+    
+    features = []
+    with torch.no_grad():
+        for start in range(0, len(image_tensors), PREDICT_BATCH_SIZE):
+            batch = torch.cat(image_tensors[start:start + PREDICT_BATCH_SIZE], dim=0)
+            with inference_slots, STAGE_SECONDS.time(stage='embed'):
+                chunk = model.embed(batch)
+            if normalize:
+                chunk = torch.nn.functional.normalize(chunk, dim=1)
+            features.append(chunk.cpu().numpy())
+    return np.concatenate(features)
+
+def embed_sources(sources, normalize=True):
+    """One embedding (or None for unreadable images) per raw image bytes, at most PREDICT_BATCH_SIZE"""
+    prepared = prepare_inputs(sources)
+    try:
+        valid = [index for index, entry in enumerate(prepared) if entry is not None]
+        vectors = [None] * len(sources)
+        if valid:
+            for index, vector in zip(valid, embed_tensors([prepared[index][0] for index in valid], normalize)):
+                vectors[index] = vector
+    finally:
+        release_inputs(prepared)
+    return vectors
+
+def transforms_after_resize(image):
+    """Apply the preprocessing pipeline without its 224x224 resize"""
+    for step in transform.transforms[1:]:
+        image = step(image)
+    return image
+
+def build_analysis(prediction):
+    """Build the client-facing ``analysis`` object for one prediction"""
+    # Calculate additional metrics
+    fuel_penalty = max(5, int(prediction['density'] * 0.3))
+    
+    # Determine cleaning method and urgency
+    if prediction['criticality'] == 'High':
+        method = 'High-pressure water cleaning with biocide treatment'
+        urgency = 'High'
+    elif prediction['criticality'] == 'Medium':
+        method = 'High-pressure water cleaning'
+        urgency = 'Medium'
+    else:
+        method = 'Routine hull cleaning'
+        urgency = 'Low'
+    
+    # Keeping coverage for backward compatibility but using density values
+    return {
+        'species': prediction['species'],
+        'coverage': prediction['density'],  # Using density value for coverage field for backward compatibility
+        'density': prediction['density'],   # Also providing density field
+        'criticality': prediction['criticality'],
+        'confidence': prediction['confidence'],
+        'fuelPenalty': fuel_penalty,
+        'method': method,
+        'urgency': urgency,
+        'note': f"Biofouling analysis complete. {prediction['species']} detected with {prediction['density']}% density coverage.",
+        'density_details': prediction.get('density_details')  # Include Otsu thresholding details if available
+    }
+
+def chunk_sources(images):
+    """Raw bytes (or None) for a chunk of base64 strings and image URLs"""
+    # Download the chunk's URLs concurrently before decoding
+    urls = [image_data for image_data in images
+            if isinstance(image_data, str) and image_data.startswith(('http://', 'https://'))]
+    with STAGE_SECONDS.time(stage='fetch'):
+        fetched = dict(zip(urls, image_fetcher.fetch_many(urls)))
+    
+    sources = []
+    for image_data in images:
+        source = fetched.get(image_data, image_data) if isinstance(image_data, str) else None
+        if isinstance(source, str):
+            source = fetch_image_bytes(source)
+        sources.append(source if isinstance(source, bytes) else None)
+    return sources
+
+def analyze_chunk(items):
+    """Analyse ``(index, image_data)`` pairs with one stacked forward pass
+    
+    Returns one ``{'index', 'success', 'analysis' | 'error'}`` dict per item,
+    in index order. Shared by /predict-batch and the job workers.
+    """
+    sources = chunk_sources([image_data for _, image_data in items])
+    
+    results = []
+    prepared = prepare_inputs(sources)
+    try:
+        decoded = []
+        for (index, _), entry in zip(items, prepared):
+            if entry is None:
+                results.append({
+                    'index': index,
+                    'success': False,
+                    'error': 'Invalid image data'
+                })
+            else:
+                decoded.append((index, entry))
+        
+        if decoded:
+            predictions = predict_fouling_batch(
+                [entry[0] for _, entry in decoded],
+                [entry[1] for _, entry in decoded],
+                [entry[2] for _, entry in decoded]
+            )
+            for (index, _), prediction in zip(decoded, predictions):
+                results.append({
+                    'index': index,
+                    'success': True,
+                    'analysis': build_analysis(prediction)
+                })
+    finally:
+        release_inputs(prepared)
+    
+    results.sort(key=lambda result: result['index'])
+    return results
+
+def _profile_token_valid():
+    token = request.headers.get('X-Profile-Token', '')
+    return PROFILE_TOKEN is not None and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+@app.before_request
+def _start_request_timer():
+    if PROFILE_TOKEN is not None and request.endpoint in PROFILED_ENDPOINTS:
+        mode = request.headers.get('X-Profile')
+        forced = mode in profiling.MODES and _profile_token_valid()
+        # A torch capture rides on the claimed session and only /predict runs a forward pass
+        session = request_profiler.claim(
+            mode if forced else None,
+            torch_forward=forced and option_flag(request.headers.get('X-Profile-Torch')),
+            forward_pass=request.endpoint == 'predict'
+        )
+        if session is not None:
+            g.profile_session = session
+            session.start()
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    # Streamed responses are timed to their first byte
+    started = g.pop('request_started', None)
+    if started is not None and request.endpoint != 'metrics_endpoint':
+        endpoint = request.endpoint or 'not_found'
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+        REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    session = g.pop('profile_session', None)
+    if session is not None:
+        response.headers['X-Profile-Id'] = session.stop(request.endpoint, response.status_code)
+    return response
+
+@app.teardown_request
+def _stop_abandoned_profile(error=None):
+    # after_request is skipped when a view or another hook raises; stop the session
+    # here so the profiler does not stay active and skip every later request
+    session = g.pop('profile_session', None)
+    if session is not None:
+        session.stop(request.endpoint, 500)
+
+def _admin_denied():
+    """404 while profiling is disabled, 403 for a wrong token"""
+    if PROFILE_TOKEN is None:
+        return jsonify({'error': 'Profiling is disabled', 'details': 'Set PROFILE_TOKEN to enable it'}), 404
+    if not _profile_token_valid():
+        return jsonify({'error': 'Invalid or missing X-Profile-Token'}), 403
+    return None
+
+@app.route('/admin/profile', methods=['GET', 'POST', 'DELETE'])
+def admin_profile():
+    """Arm (POST), inspect (GET) or cancel (DELETE) profiling of upcoming requests"""
+    denied = _admin_denied()
+    if denied is not None:
+        return denied
+    if request.method == 'DELETE':
+        return jsonify(request_profiler.disarm())
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            state = request_profiler.arm(
+                data.get('requests', 1),
+                data.get('mode', 'cprofile'),
+                option_flag(data.get('torch', False))
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(state)
+    return jsonify(request_profiler.stats())
+
+@app.route('/admin/profiles', methods=['GET'])
+def admin_profiles():
+    denied = _admin_denied()
+    if denied is not None:
+        return denied
+    return jsonify({'profiles': request_profiler.list()})
+
+@app.route('/admin/profiles/<profile_id>/<kind>', methods=['GET'])
+def admin_profile_artifact(profile_id, kind):
+    """Download one artifact: summary, prof, folded, torch or ops"""
+    denied = _admin_denied()
+    if denied is not None:
+        return denied
+    if not profiling.PROFILE_ID.match(profile_id) or kind not in profiling.ARTIFACTS:
+        return jsonify({'error': 'Unknown profile artifact'}), 404
+    path = request_profiler.path(profile_id, kind)
+    if not os.path.exists(path):
+        return jsonify({'error': 'Unknown profile artifact'}), 404
+    return send_file(os.path.abspath(path), as_attachment=kind in ('prof', 'torch'),
+                     download_name=os.path.basename(path))
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint for this process"""
+    return Response(metrics.render(), content_type=telemetry.CONTENT_TYPE)
 
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy',
+        'ready': _service_state['status'] == 'ready',
         'model_loaded': model is not None,
         'weights_loaded': os.path.exists(MODEL_PATH),
-        'device': str(device),
+        'device': str(device) if device is not None else 'pending',
         'species_count': len(SPECIES_MAP),
-        'mode': 'inference' if model is not None else 'intelligent_mock'
+        'mode': 'inference' if model is not None else 'intelligent_mock',
+        'microbatching': inference_batcher.stats() if inference_batcher is not None else {'enabled': MICROBATCH_ENABLED},
+        'result_cache': result_cache.stats(),
+        'image_fetch': image_fetcher.stats(),
+        'jobs': job_runner.stats() if job_runner.started else {'started': False},
+        'preprocessing': preprocess_pool.stats() if preprocess_pool is not None else {'enabled': False},
+        'vector_index': vector_index.stats(),
+        'memory': {'pid': os.getpid(), 'weights_mmap': WEIGHTS_MMAP, **(process_memory.memory_usage() or {})},
+        'startup': _service_state['startup']
     })
 
+@app.route('/health/live', methods=['GET'])
+def health_live():
+    """Liveness probe: the process is up and serving HTTP"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness probe: weights are loaded and a dummy forward pass has run"""
+    ready = _service_state['status'] == 'ready'
+    return jsonify({
+        'ready': ready,
+        'status': _service_state['status'],
+        'mode': 'inference' if model is not None else 'intelligent_mock',
+        'backend': INFERENCE_BACKEND,
+        'error': _service_state['error'],
+        'startup': _service_state['startup'],
+        'parity': _service_state['parity']
+    }), 200 if ready else 503
+
 @app.route('/calculate-density', methods=['POST'])
 def calculate_density():
     """Endpoint specifically for calculating fouling density using Otsu thresholding"""
     try:
-        data = request.get_json()
+        image_bytes, options, error = read_image_request()
+        if error is not None:
+            return error
         
-        if not data or 'image' not in data:
+        # Calculate density using Otsu thresholding, reusing results for images seen before
+        if image_bytes is None:
             return jsonify({
-                'error': 'No image data provided', 
-                'details': 'Use "image": "base64_string" or "image": "http://url"'
+                'error': 'Density calculation failed: Could not decode image',
+                'success': False
             }), 400
         
-        # Calculate density using Otsu thresholding
-        density_result = calculate_fouling_density(data['image'])
+        # Optional per-tile grid: "tile_size" in pixels, "local_threshold" for per-tile Otsu
+        try:
+            tile_size = int(options.get('tile_size') or 0)
+        except (TypeError, ValueError):
+            tile_size = -1
+        if tile_size < 0 or 0 < tile_size < 16:
+            return jsonify({
+                'error': 'tile_size must be an integer of at least 16 pixels',
+                'success': False
+            }), 400
+        local_threshold = option_flag(options.get('local_threshold')) and tile_size > 0
+        
+        namespace = f'density-tiled-{tile_size}-{int(local_threshold)}' if tile_size else 'density'
+        cache_key = make_cache_key(image_bytes, namespace, cache_version())
+        density_result = result_cache.get(cache_key)
+        if density_result is None:
+            density_result = calculate_fouling_density(image_bytes, tile_size, local_threshold)
+            if density_result['success']:
+                result_cache.put(cache_key, density_result)
         
         if not density_result['success']:
             return jsonify({
@@ -373,11 +1137,18 @@ def calculate_density():
             },
             'timestamp': '2024-01-01T00:00:00Z'
         }
+        if tile_size:
+            response['density_analysis'].update({
+                'tile_size': density_result['tile_size'],
+                'grid_shape': density_result['grid_shape'],
+                'density_grid': density_result['density_grid']
+            })
         
-        return jsonify(response)
+        with STAGE_SECONDS.time(stage='response'):
+            return jsonify(response)
         
     except Exception as e:
-        print(f"Density API Error: {e}")
+        logger.exception("Density API Error: %s", e)
         return jsonify({
             'error': 'Internal server error', 
             'details': str(e),
@@ -387,62 +1158,433 @@ def calculate_density():
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        data = request.get_json()
+        warm_up()
+        # Fetch or read the upload once; the raw bytes key the result cache and feed the single decode
+        image_bytes, _, error = read_image_request()
+        if error is not None:
+            return error
         
-        if not data or 'image' not in data:
-            return jsonify({'error': 'No image data provided. Use "image": "base64_string" or "image": "http://url"'}), 400
+        # Mock predictions are random, so only real model results are cached
+        cache_key = None
+        if image_bytes is not None and model is not None:
+            cache_key = make_cache_key(image_bytes, 'predict', cache_version())
+            analysis = result_cache.get(cache_key)
+            if analysis is not None:
+                return jsonify({
+                    'success': True,
+                    'analysis': analysis,
+                    'timestamp': '2024-01-01T00:00:00Z'
+                })
         
-        # Process image
-        image_tensor = process_image(data['image'])
-        if image_tensor is None:
+        # Decode once and share the pixels between classification and density
+        prepared = prepare_inputs([image_bytes])
+        if prepared[0] is None:
             return jsonify({
                 'error': 'Invalid image data', 
                 'details': 'Image is corrupted, too small, or invalid format. Try a different image.'
             }), 400
         
         # Make prediction with density calculation
-        prediction = predict_fouling(image_tensor, data['image'])
-        
-        # Calculate additional metrics
-        fuel_penalty = max(5, int(prediction['density'] * 0.3))
-        
-        # Determine cleaning method and urgency
-        if prediction['criticality'] == 'High':
-            method = 'High-pressure water cleaning with biocide treatment'
-            urgency = 'High'
-        elif prediction['criticality'] == 'Medium':
-            method = 'High-pressure water cleaning'
-            urgency = 'Medium'
-        else:
-            method = 'Routine hull cleaning'
-            urgency = 'Low'
+        image_tensor, image, density_result, _ = prepared[0]
+        try:
+            prediction = predict_fouling(image_tensor, image, density_result)
+        finally:
+            release_inputs(prepared)
         
-        # Generate response in client format (keeping coverage for backward compatibility but using density values)
-        response = {
+        # Generate response in client format
+        with STAGE_SECONDS.time(stage='response'):
+            analysis = build_analysis(prediction)
+            if cache_key is not None and prediction['source'] == 'model':
+                result_cache.put(cache_key, analysis)
+            
+            response = jsonify({
+                'success': True,
+                'analysis': analysis,
+                'timestamp': '2024-01-01T00:00:00Z'
+            })
+        
+        return response
+        
+    except Exception as e:
+        logger.exception("API Error: %s", e)
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@app.route('/predict-batch', methods=['POST'])
+def predict_batch():
+    """Analyse a list of images with stacked forward passes of PREDICT_BATCH_SIZE images"""
+    try:
+        warm_up()
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('images'), list) or not data['images']:
+            return jsonify({'error': 'No image data provided. Use "images": ["base64_string" or "http://url", ...]'}), 400
+        
+        if len(data['images']) > MAX_BATCH_IMAGES:
+            return jsonify({
+                'error': 'Too many images',
+                'details': f'At most {MAX_BATCH_IMAGES} images are accepted per request'
+            }), 413
+        
+        results = []
+        # Work chunk by chunk so only one chunk of decoded images is held in memory
+        for start in range(0, len(data['images']), PREDICT_BATCH_SIZE):
+            chunk = data['images'][start:start + PREDICT_BATCH_SIZE]
+            results.extend(analyze_chunk(list(enumerate(chunk, start))))
+        
+        results.sort(key=lambda result: result['index'])
+        
+        return jsonify({
             'success': True,
-            'analysis': {
-                'species': prediction['species'],
-                'coverage': prediction['density'],  # Using density value for coverage field for backward compatibility
-                'density': prediction['density'],   # Also providing density field
-                'criticality': prediction['criticality'],
-                'confidence': prediction['confidence'],
-                'fuelPenalty': fuel_penalty,
-                'method': method,
-                'urgency': urgency,
-                'note': f"Biofouling analysis complete. {prediction['species']} detected with {prediction['density']}% density coverage.",
-                'density_details': prediction.get('density_details')  # Include Otsu thresholding details if available
-            },
+            'count': len(results),
+            'failed': sum(1 for result in results if not result['success']),
+            'results': results,
             'timestamp': '2024-01-01T00:00:00Z'
-        }
+        })
+        
+    except Exception as e:
+        logger.exception("Batch API Error: %s", e)
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@app.route('/localize', methods=['POST'])
+def localize():
+    """Sliding-window species map: a species/coverage grid over overlapping regions"""
+    try:
+        warm_up()
+        image_bytes, options, error = read_image_request()
+        if error is not None:
+            return error
+        
+        if model is None:
+            return jsonify({
+                'error': 'Model not loaded',
+                'details': 'Localization needs trained weights; the service is running in mock mode'
+            }), 503
+        
+        mode = options.get('mode') or None
+        try:
+            window = int(options['window']) if options.get('window') else None
+            overlap = float(options.get('overlap', 0.5))
+        except (TypeError, ValueError):
+            window, overlap = -1, -1
+        if (window is not None and window < 32) or not 0 <= overlap < 1 or mode not in (None, 'shared', 'crops'):
+            return jsonify({
+                'error': 'Invalid localization options',
+                'details': '"window" is a size in pixels (>= 32), "overlap" is in [0, 1), "mode" is "shared" or "crops"'
+            }), 400
+        
+        image = decode_image(image_bytes) if image_bytes is not None else None
+        if image is None:
+            return jsonify({
+                'error': 'Invalid image data', 
+                'details': 'Image is corrupted, too small, or invalid format. Try a different image.'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'localization': localize_species(image, window, overlap, mode),
+            'timestamp': '2024-01-01T00:00:00Z'
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': 'Localization failed', 'details': str(e)}), 400
+    except Exception as e:
+        logger.exception("Localize API Error: %s", e)
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+EMBEDDINGS_UNAVAILABLE = {
+    'error': 'Embeddings unavailable',
+    'details': 'Embeddings need trained weights on the eager or compile backend'
+}
+
+def _batch_images_error(data):
+    if not data or not isinstance(data.get('images'), list) or not data['images']:
+        return jsonify({'error': 'No image data provided. Use "images": ["base64_string" or "http://url", ...]'}), 400
+    if len(data['images']) > MAX_BATCH_IMAGES:
+        return jsonify({
+            'error': 'Too many images',
+            'details': f'At most {MAX_BATCH_IMAGES} images are accepted per request'
+        }), 413
+    return None
+
+@app.route('/embed', methods=['POST'])
+def embed():
+    """2048-d ResNet50 feature vector of one image (L2-normalised unless "normalize" is false)"""
+    try:
+        warm_up()
+        image_bytes, options, error = read_image_request()
+        if error is not None:
+            return error
+        if not supports_embeddings():
+            return jsonify(EMBEDDINGS_UNAVAILABLE), 503
+        
+        normalize = option_flag(options.get('normalize', True))
+        vector = embed_sources([image_bytes], normalize)[0]
+        if vector is None:
+            return jsonify({
+                'error': 'Invalid image data', 
+                'details': 'Image is corrupted, too small, or invalid format. Try a different image.'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'embedding': vector.tolist(),
+            'dimension': len(vector),
+            'normalized': normalize,
+            'timestamp': '2024-01-01T00:00:00Z'
+        })
+        
+    except Exception as e:
+        logger.exception("Embed API Error: %s", e)
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@app.route('/embed-batch', methods=['POST'])
+def embed_batch():
+    """Feature vectors for a list of images, PREDICT_BATCH_SIZE images per forward pass"""
+    try:
+        warm_up()
+        data = request.get_json(silent=True)
+        error = _batch_images_error(data)
+        if error is not None:
+            return error
+        if not supports_embeddings():
+            return jsonify(EMBEDDINGS_UNAVAILABLE), 503
+        
+        normalize = option_flag(data.get('normalize', True))
+        results = []
+        for start in range(0, len(data['images']), PREDICT_BATCH_SIZE):
+            vectors = embed_sources(chunk_sources(data['images'][start:start + PREDICT_BATCH_SIZE]), normalize)
+            for index, vector in enumerate(vectors, start):
+                if vector is None:
+                    results.append({'index': index, 'success': False, 'error': 'Invalid image data'})
+                else:
+                    results.append({'index': index, 'success': True, 'embedding': vector.tolist()})
+        
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'failed': sum(1 for result in results if not result['success']),
+            'dimension': 2048,
+            'normalized': normalize,
+            'results': results,
+            'timestamp': '2024-01-01T00:00:00Z'
+        })
+        
+    except Exception as e:
+        logger.exception("Embed batch API Error: %s", e)
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@app.route('/index/add', methods=['POST'])
+def index_add():
+    """Embed images and insert them into the vector index under caller-chosen ids"""
+    try:
+        warm_up()
+        data = request.get_json(silent=True)
+        error = _batch_images_error(data)
+        if error is not None:
+            return error
+        ids = data.get('ids')
+        metadata = data.get('metadata') or [None] * len(data['images'])
+        if not isinstance(ids, list) or len(ids) != len(data['images']) or \
+                not isinstance(metadata, list) or len(metadata) != len(ids):
+            return jsonify({
+                'error': 'Invalid index entries',
+                'details': '"ids" (and optional "metadata") must list one entry per image'
+            }), 400
+        if not supports_embeddings():
+            return jsonify(EMBEDDINGS_UNAVAILABLE), 503
+        
+        results = []
+        for start in range(0, len(ids), PREDICT_BATCH_SIZE):
+            vectors = embed_sources(chunk_sources(data['images'][start:start + PREDICT_BATCH_SIZE]))
+            added = [(index, vector) for index, vector in enumerate(vectors, start) if vector is not None]
+            if added:
+                vector_index.add(np.stack([vector for _, vector in added]),
+                                 [str(ids[index]) for index, _ in added],
+                                 [metadata[index] for index, _ in added])
+            for index, vector in enumerate(vectors, start):
+                results.append({'index': index, 'id': str(ids[index]), 'success': vector is not None,
+                                **({} if vector is not None else {'error': 'Invalid image data'})})
+        
+        return jsonify({
+            'success': True,
+            'added': sum(1 for result in results if result['success']),
+            'results': results,
+            'index': vector_index.stats()
+        })
+        
+    except Exception as e:
+        logger.exception("Index add API Error: %s", e)
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@app.route('/index/search', methods=['POST'])
+def index_search():
+    """Past inspections that look most like the uploaded image (cosine similarity)"""
+    try:
+        warm_up()
+        image_bytes, options, error = read_image_request()
+        if error is not None:
+            return error
+        if not supports_embeddings():
+            return jsonify(EMBEDDINGS_UNAVAILABLE), 503
         
-        return jsonify(response)
+        try:
+            k = int(options.get('k', 10))
+            nprobe = int(options.get('nprobe', 8))
+        except (TypeError, ValueError):
+            k = nprobe = 0
+        if not 1 <= k <= 1000 or nprobe < 1:
+            return jsonify({'error': 'Invalid search options', 'details': '"k" is 1-1000 and "nprobe" at least 1'}), 400
+        
+        vector = embed_sources([image_bytes])[0]
+        if vector is None:
+            return jsonify({
+                'error': 'Invalid image data', 
+                'details': 'Image is corrupted, too small, or invalid format. Try a different image.'
+            }), 400
+        
+        with STAGE_SECONDS.time(stage='index_search'):
+            matches = vector_index.search(vector, k, options.get('method') or None, nprobe)
+        return jsonify({
+            'success': True,
+            'matches': matches,
+            'index': vector_index.stats(),
+            'timestamp': '2024-01-01T00:00:00Z'
+        })
         
+    except ValueError as e:
+        return jsonify({'error': 'Search failed', 'details': str(e)}), 400
     except Exception as e:
-        print(f"API Error: {e}")
+        logger.exception("Index search API Error: %s", e)
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
+@app.route('/predict-batch/stream', methods=['POST'])
+def predict_batch_stream():
+    """Like /predict-batch, but each result is streamed as soon as its chunk finishes
+    
+    Responds with NDJSON by default, or Server-Sent Events when the client
+    sends ``Accept: text/event-stream`` or ``?format=sse``. Every event
+    carries the per-image result plus running batch aggregates; the last
+    one is ``{"done": true, "aggregate": {...}}``.
+    """
+    warm_up()
+    data = request.get_json(silent=True)
+    
+    if not data or not isinstance(data.get('images'), list) or not data['images']:
+        return jsonify({'error': 'No image data provided. Use "images": ["base64_string" or "http://url", ...]'}), 400
+    
+    if len(data['images']) > MAX_BATCH_IMAGES:
+        return jsonify({
+            'error': 'Too many images',
+            'details': f'At most {MAX_BATCH_IMAGES} images are accepted per request'
+        }), 413
+    
+    use_sse = request.args.get('format') == 'sse' or \
+        request.accept_mimetypes.best_match(['application/x-ndjson', 'text/event-stream']) == 'text/event-stream'
+    format_event = sse_event if use_sse else ndjson_event
+    images = data['images']
+    chunk_size = max(1, STREAM_CHUNK_SIZE)
+    
+    def generate():
+        aggregate = RunningAggregate(len(images))
+        for start in range(0, len(images), chunk_size):
+            try:
+                results = analyze_chunk(list(enumerate(images[start:start + chunk_size], start)))
+            except Exception as e:
+                # One bad chunk must not end the stream for the rest of the batch
+                logger.exception("Stream chunk Error: %s", e)
+                results = [{'index': index, 'success': False, 'error': str(e)}
+                           for index in range(start, min(start + chunk_size, len(images)))]
+            for result in results:
+                aggregate.add(result)
+                yield format_event({**result, 'aggregate': aggregate.snapshot()})
+        yield format_event({'done': True, 'aggregate': aggregate.snapshot()}, 'done')
+    
+    response = Response(stream_with_context(generate()),
+                        mimetype='text/event-stream' if use_sse else 'application/x-ndjson')
+    # Keep proxies from buffering the stream
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a batch of images for background analysis; poll /jobs/<id> or stream /jobs/<id>/results"""
+    try:
+        data = request.get_json(silent=True)
+        
+        if not data or not isinstance(data.get('images'), list) or not data['images']:
+            return jsonify({'error': 'No image data provided. Use "images": ["base64_string" or "http://url", ...]'}), 400
+        
+        if not all(isinstance(image_data, str) for image_data in data['images']):
+            return jsonify({'error': 'Invalid image data', 'details': 'Every image must be a base64 string or URL'}), 400
+        
+        if len(data['images']) > JOB_MAX_IMAGES:
+            return jsonify({
+                'error': 'Too many images',
+                'details': f'At most {JOB_MAX_IMAGES} images are accepted per job'
+            }), 413
+        
+        try:
+            job_id = job_runner.submit(data['images'])
+        except JobQueueFull as e:
+            response = jsonify({'error': 'Job queue full', 'details': str(e)})
+            response.headers['Retry-After'] = '30'
+            return response, 429
+        
+        logger.info("📥 Job %s queued with %d images", job_id, len(data['images']))
+        return jsonify({
+            'success': True,
+            'job': job_runner.store.get(job_id),
+            'status_url': f'/jobs/{job_id}',
+            'results_url': f'/jobs/{job_id}/results'
+        }), 202
+        
+    except Exception as e:
+        logger.exception("Jobs API Error: %s", e)
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_runner.store.get(job_id) if os.path.exists(JOB_STORE_PATH) else None
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """Per-image results as NDJSON, in index order, as soon as each chunk is stored
+    
+    With ``?follow=0`` only the results finished so far are returned. The
+    last line is ``{"job": {...}}`` with the job's final status.
+    """
+    store = job_runner.store
+    if not os.path.exists(JOB_STORE_PATH) or store.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    follow = option_flag(request.args.get('follow', '1'))
+    
+    def generate():
+        last_index = -1
+        while True:
+            job = store.get(job_id)
+            for result in store.results_after(job_id, last_index):
+                last_index = result['index']
+                yield json.dumps(result) + '\n'
+            if job['status'] in ('completed', 'failed') or not follow:
+                # Results written between the status read and the scan above are still sent
+                for result in store.results_after(job_id, last_index, limit=-1):
+                    last_index = result['index']
+                    yield json.dumps(result) + '\n'
+                yield json.dumps({'job': store.get(job_id)}) + '\n'
+                return
+            time.sleep(JOB_POLL_SECONDS)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
     print("🚀 Starting FoulingGuard AI Model Service")
+    warm_up()
+    resume_jobs()
     print(f"📱 Device: {device}")
     print(f"🤖 Model: {'Loaded' if model else 'Mock Mode'}")
-    app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
+    print("💡 Development server only - use `python serve.py --workers N` in production")
+    app.run(host='0.0.0.0', port=5001, debug=os.environ.get('FLASK_DEBUG') == '1')
\ No newline at end of file
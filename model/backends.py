@@ -0,0 +1,120 @@
+import logging
+import os
+
+import torch
+from model_architecture import load_trained_model
+
+logger = logging.getLogger('foulingguard.backends')
+
+# eager: BiofoulingModel built from torchvision with the trained state dict
+# torchscript: self-contained artifact written by export_model.py (no torchvision needed)
+# compile: the eager model wrapped in torch.compile
+# onnxruntime: ONNX export from export_model.py run on the ONNX Runtime CPU provider
+# int8: quantized TorchScript artifact written by quantize_model.py
+BACKENDS = ('eager', 'torchscript', 'compile', 'onnxruntime', 'int8')
+
+
+class OnnxRuntimeModel:
+    """Callable wrapper that runs an exported ONNX model like BiofoulingModel.
+
+    Takes a Nx3x224x224 tensor and returns (species_logits, coverage) tensors,
+    so the rest of the service does not care which backend produced them.
+    ONNX Runtime thread pools do not survive fork(), so each process builds
+    its own session on first use.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self._session = None
+        self._session_pid = None
+
+    def _get_session(self):
+        if self._session is None or self._session_pid != os.getpid():
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.intra_op_num_threads = self.num_threads or torch.get_num_threads()
+            self._session = ort.InferenceSession(self.model_path, options, providers=['CPUExecutionProvider'])
+            self._session_pid = os.getpid()
+        return self._session
+
+    def eval(self):
+        return self
+
+    def __call__(self, inputs):
+        session = self._get_session()
+        batch = inputs.detach().cpu().numpy() if isinstance(inputs, torch.Tensor) else inputs
+        species_logits, coverage = session.run(None, {session.get_inputs()[0].name: batch})
+        return torch.from_numpy(species_logits), torch.from_numpy(coverage)
+
+
+def load_inference_model(backend, model_path, device, num_classes=10, mmap=False, timings=None):
+    """Load a callable returning (species_logits, coverage) for the chosen backend
+
+    ``mmap`` maps eager/compile checkpoints instead of copying them and
+    ``timings`` collects their load times, see load_trained_model().
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == 'onnxruntime':
+        module = OnnxRuntimeModel(model_path)
+        module._get_session()
+        logger.info("✅ ONNX Runtime model loaded from %s", model_path)
+        return module
+
+    if backend == 'int8':
+        # Quantized kernels only run on CPU with the engine they were converted for
+        engine = os.environ.get('QUANTIZED_ENGINE')
+        if engine:
+            torch.backends.quantized.engine = engine
+        module = torch.jit.load(model_path, map_location='cpu')
+        module.eval()
+        logger.info("✅ INT8 model loaded from %s (%s engine)", model_path, torch.backends.quantized.engine)
+        return module
+
+    if backend == 'torchscript':
+        module = torch.jit.load(model_path, map_location=device)
+        module.eval()
+        logger.info("✅ TorchScript model loaded from %s", model_path)
+        return module
+
+    model = load_trained_model(model_path, device, num_classes=num_classes, mmap=mmap, timings=timings)
+    if model is None or backend == 'eager':
+        return model
+
+    # torch.compile only compiles on the first call, so trigger it here and
+    # fall back to eager if the toolchain is missing
+    try:
+        compiled = torch.compile(model)
+        with torch.no_grad():
+            compiled(torch.zeros(1, 3, 224, 224, device=device))
+        logger.info("✅ Model compiled with torch.compile")
+        return compiled
+    except Exception as e:
+        logger.warning("⚠️ torch.compile failed, using eager model: %s", e)
+        return model
+
+
+def check_parity(reference, candidate, device, batch_size=4, atol=1e-3, seed=0):
+    """Compare both model heads of ``candidate`` against ``reference`` on a random batch"""
+    generator = torch.Generator().manual_seed(seed)
+    inputs = torch.randn(batch_size, 3, 224, 224, generator=generator).to(device)
+    with torch.no_grad():
+        expected = reference(inputs)
+        actual = candidate(inputs)
+
+    max_abs_diff = {
+        name: float((torch.as_tensor(a, device=device) - b).abs().max())
+        for name, a, b in zip(('species_logits', 'coverage'), actual, expected)
+    }
+    same_species = bool(
+        (torch.as_tensor(actual[0], device=device).argmax(dim=1) == expected[0].argmax(dim=1)).all()
+    )
+    return {
+        'max_abs_diff': max_abs_diff,
+        'same_species': same_species,
+        'atol': atol,
+        'passed': same_species and all(diff <= atol for diff in max_abs_diff.values())
+    }
@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Merge concurrent single-item requests into batched calls.
+
+    Callers ``submit`` one item and block until its result is ready. A
+    background worker takes the first waiting item, keeps collecting for up to
+    ``max_wait_ms`` or until ``max_batch_size`` items are gathered, then calls
+    ``run_batch(items)`` once and hands every caller its own result.
+    """
+
+    def __init__(self, run_batch, max_batch_size=16, max_wait_ms=5):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_size_histogram = {}
+        self._queue_depth_histogram = {}
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, item, timeout=None):
+        """Queue one item and wait for its result"""
+        future = Future()
+        self._queue.put((item, future))
+        return future.result(timeout=timeout)
+
+    def _collect(self):
+        """Block for the first item, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        queue_depth = self._queue.qsize() + 1
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch, queue_depth
+
+    def _run(self):
+        while True:
+            batch, queue_depth = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.run_batch(items)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                for _, future in batch:
+                    future.set_exception(e)
+            self._record(len(batch), queue_depth)
+
+    def _record(self, batch_size, queue_depth):
+        with self._lock:
+            self._batches += 1
+            self._items += batch_size
+            self._batch_size_histogram[batch_size] = self._batch_size_histogram.get(batch_size, 0) + 1
+            self._queue_depth_histogram[queue_depth] = self._queue_depth_histogram.get(queue_depth, 0) + 1
+
+    def stats(self):
+        """Snapshot of queue depth and batch size counters for /health"""
+        with self._lock:
+            return {
+                'enabled': True,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'items': self._items,
+                'errors': self._errors,
+                'mean_batch_size': round(self._items / self._batches, 2) if self._batches else 0.0,
+                'batch_size_histogram': {str(k): v for k, v in sorted(self._batch_size_histogram.items())},
+                'queue_depth_histogram': {str(k): v for k, v in sorted(self._queue_depth_histogram.items())}
+            }
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the model service hot paths.
+
+    python benchmark.py --output benchmark_results.json
+    python benchmark.py --fixtures inspections/ --compare benchmark_results.json
+
+Every stage is timed on its own at several image resolutions (base64 decode,
+PIL and cv2 decode, the torchvision transform and the fused preprocessing,
+Otsu density, JSON serialization), the model forward pass at several batch
+sizes, and /predict end to end through the Flask test client under
+concurrent load. Synthetic JPEGs are generated with a fixed seed; images in
+``--fixtures`` are added as their own resolution group. Results go to a JSON
+file, and ``--compare`` flags stages that got slower than a previous run.
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+import density as density_engine
+import fast_preprocess
+
+RESOLUTIONS = ('640x480', '1600x1200', '4000x3000')
+BATCH_SIZES = (1, 4, 8, 16, 32)
+CONCURRENCY = (1, 4, 8)
+
+# The service's torchvision chain, which /predict only runs with FAST_PREPROCESS=0
+# (localization crops always use it); the 'fused_preprocess' stage times the default path
+transform = fast_preprocess.torchvision_transform()
+
+
+def summarize(samples):
+    """Latency statistics in milliseconds"""
+    samples = sorted(sample * 1000 for sample in samples)
+    return {
+        'runs': len(samples),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p50_ms': round(samples[len(samples) // 2], 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'min_ms': round(samples[0], 3)
+    }
+
+
+def measure(function, repeat, warmup=1):
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def fixture_images(directory, limit):
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(('.jpg', '.jpeg', '.png')))
+    images = []
+    for name in names[:limit]:
+        with open(os.path.join(directory, name), 'rb') as f:
+            images.append(f.read())
+    return images
+
+
+def stage_benchmarks(image_bytes, repeat):
+    """Per-stage timings for one encoded image"""
+    encoded = base64.b64encode(image_bytes).decode()
+    decoded = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+    analysis = {
+        'success': True,
+        'analysis': {'species': 'Balanus Amphitrite', 'density': 42.0, 'criticality': 'High', 'confidence': 0.9,
+                     'density_details': density_engine.calculate_density(density_engine.to_grayscale(decoded))},
+        'timestamp': '2024-01-01T00:00:00Z'
+    }
+    out = np.empty((3, 224, 224), dtype=np.float32)
+    stages = {
+        'base64_decode': measure(lambda: base64.b64decode(encoded), repeat),
+        'pil_decode': measure(lambda: Image.open(io.BytesIO(image_bytes)).convert('RGB'), repeat),
+        'transform': measure(lambda: transform(decoded).unsqueeze(0), repeat),
+        'fused_preprocess': measure(lambda: fast_preprocess.normalize_into(decoded, out), repeat),
+        'otsu_density': measure(lambda: density_engine.calculate_density(density_engine.to_grayscale(decoded)), repeat),
+        'otsu_density_from_bytes': measure(lambda: density_engine.calculate_density(density_engine.decode_grayscale(image_bytes)), repeat),
+        'json_serialization': measure(lambda: json.dumps(analysis), repeat)
+    }
+    try:
+        import cv2
+        stages['cv2_decode'] = measure(lambda: cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR), repeat)
+    except ImportError:
+        pass
+    return stages
+
+
+def forward_benchmarks(model, batch_sizes, repeat):
+    results = {}
+    with torch.no_grad():
+        for batch_size in batch_sizes:
+            inputs = torch.randn(batch_size, 3, 224, 224)
+            stats = measure(lambda: model(inputs), repeat)
+            stats['images_per_second'] = round(batch_size / (stats['mean_ms'] / 1000), 2)
+            results[f'batch_{batch_size}'] = stats
+    return results
+
+
+def predict_benchmarks(service, images, concurrency_levels, requests_per_level):
+    """/predict latency and throughput with N client threads posting raw image bodies"""
+    results = {}
+    for concurrency in concurrency_levels:
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        counter = iter(range(requests_per_level))
+
+        def client_loop():
+            client = service.app.test_client()
+            while True:
+                with lock:
+                    index = next(counter, None)
+                if index is None:
+                    return
+                started = time.perf_counter()
+                response = client.post('/predict', data=images[index % len(images)], content_type='image/jpeg')
+                elapsed = time.perf_counter() - started
+                with lock:
+                    (latencies if response.status_code == 200 else errors).append(elapsed)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        stats = summarize(latencies) if latencies else {'runs': 0}
+        stats.update({'errors': len(errors), 'requests_per_second': round(len(latencies) / wall, 2)})
+        results[f'concurrency_{concurrency}'] = stats
+    return results
+
+
+def compare(current, previous, threshold, path=''):
+    """Stage paths whose mean latency grew by more than ``threshold`` (a fraction)"""
+    regressions = []
+    for key, value in current.items():
+        if key not in previous:
+            continue
+        if isinstance(value, dict) and 'mean_ms' in value and 'mean_ms' in previous[key]:
+            before, after = previous[key]['mean_ms'], value['mean_ms']
+            if before > 0 and (after - before) / before > threshold:
+                regressions.append({'stage': path + key, 'before_ms': before, 'after_ms': after,
+                                    'change': round((after - before) / before, 3)})
+        elif isinstance(value, dict) and isinstance(previous[key], dict):
+            regressions.extend(compare(value, previous[key], threshold, f'{path}{key}.'))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the FoulingGuard model service hot paths')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--resolutions', default=','.join(RESOLUTIONS), help='comma-separated WIDTHxHEIGHT list')
+    parser.add_argument('--fixtures', help='folder of real inspection images to benchmark as well')
+    parser.add_argument('--batch-sizes', default=','.join(map(str, BATCH_SIZES)))
+    parser.add_argument('--concurrency', default=','.join(map(str, CONCURRENCY)))
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per stage')
+    parser.add_argument('--requests', type=int, default=32, help='/predict requests per concurrency level')
+    parser.add_argument('--model-path', default=os.environ.get('MODEL_PATH'),
+                        help='trained checkpoint (default: model/best_model.pt, else a randomly initialised model)')
+    parser.add_argument('--compare', help='previous results file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.15, help='slowdown that counts as a regression')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.model_path:
+        os.environ['MODEL_PATH'] = args.model_path
+    # Cached results would turn the end-to-end runs into cache lookups
+    os.environ['RESULT_CACHE_SIZE'] = '0'
+    import app as service
+    from model_architecture import BiofoulingModel
+
+    service.warm_up()
+    model_source = 'trained'
+    if service.model is None:
+        torch.manual_seed(0)
+        service.model = BiofoulingModel(num_classes=10).eval()
+        model_source = 'random_init'
+
+    groups = {}
+    for resolution in args.resolutions.split(','):
+        width, height = (int(value) for value in resolution.lower().split('x'))
+        groups[resolution] = fast_preprocess.synthetic_jpegs(4, width, height)
+    if args.fixtures:
+        groups['fixtures'] = fixture_images(args.fixtures, 16)
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'environment': {
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'cpu_count': os.cpu_count(),
+            'torch_threads': torch.get_num_threads(),
+            'backend': service.INFERENCE_BACKEND,
+            'model': model_source
+        },
+        'stages': {},
+        'forward': {},
+        'predict': {}
+    }
+
+    for name, images in groups.items():
+        if not images:
+            continue
+        print(f"⏱️ Stages at {name}")
+        results['stages'][name] = stage_benchmarks(images[0], args.repeat)
+
+    print("⏱️ Model forward")
+    results['forward'] = forward_benchmarks(service.model, [int(value) for value in args.batch_sizes.split(',')], args.repeat)
+
+    for name, images in groups.items():
+        if not images:
+            continue
+        print(f"⏱️ /predict at {name}")
+        results['predict'][name] = predict_benchmarks(
+            service, images, [int(value) for value in args.concurrency.split(',')], args.requests)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+        results['regressions'] = compare(results, previous, args.threshold)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    for name, stages in results['stages'].items():
+        print(f"📊 {name}: " + ', '.join(f"{stage} {stats['mean_ms']}ms" for stage, stats in stages.items()))
+    for name, stats in results['forward'].items():
+        print(f"📊 forward {name}: {stats['mean_ms']}ms ({stats['images_per_second']} img/s)")
+    for name, levels in results['predict'].items():
+        print(f"📊 /predict {name}: " + ', '.join(
+            f"{level} p50 {stats.get('p50_ms')}ms {stats['requests_per_second']} req/s" for level, stats in levels.items()))
+    for regression in results.get('regressions', []):
+        print(f"⚠️ Regression in {regression['stage']}: {regression['before_ms']}ms -> {regression['after_ms']}ms")
+    print(f"✅ Results written to {args.output}")
+    return 1 if results.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Offline bulk scoring of inspection images, without the Flask server.
+
+    python -m bulk_score surveys/2023-drydock/ --output scores.csv
+    python -m bulk_score --manifest survey_files.txt --output scores.parquet --workers 4
+
+Images are decoded, density-scored and preprocessed in DataLoader worker
+processes; the main process runs BiofoulingModel over stacked batches and
+turns each row into the same analysis /predict returns. Every finished batch
+is appended to ``<output>.progress.jsonl``, so an interrupted run started
+again with the same output skips the files it already scored. The final
+output (CSV, JSONL or Parquet, by extension or ``--format``) is written from
+that checkpoint at the end.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import torch
+from PIL import Image
+import density as density_engine
+import fast_preprocess
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+FORMATS = ('csv', 'jsonl', 'parquet')
+COLUMNS = ('path', 'success', 'error', 'species', 'confidence', 'density', 'criticality', 'fuelPenalty',
+           'method', 'urgency', 'threshold', 'total_pixels', 'fouling_pixels')
+
+# Same preprocessing as the model service
+transform = fast_preprocess.torchvision_transform()
+
+
+def list_images(directory):
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(IMAGE_EXTENSIONS))
+    return paths
+
+
+def read_manifest(path):
+    """Image paths from a text file (one per line) or a CSV with a ``path`` column, relative to the manifest"""
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, 'r', newline='') as f:
+        if path.lower().endswith('.csv'):
+            entries = [row['path'] for row in csv.DictReader(f)]
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [entry if os.path.isabs(entry) else os.path.join(base, entry) for entry in entries]
+
+
+class ImageFileDataset(torch.utils.data.Dataset):
+    """Decode each file once into a model tensor and its Otsu density"""
+
+    def __init__(self, paths, density_max_pixels=0):
+        self.paths = paths
+        self.density_max_pixels = density_max_pixels
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, index):
+        path = self.paths[index]
+        try:
+            with Image.open(path) as image:
+                image = image.convert('RGB')
+            density_result = density_engine.calculate_density(
+                density_engine.to_grayscale(image, self.density_max_pixels))
+            return path, transform(image), density_result, None
+        except Exception as e:
+            return path, None, None, str(e)
+
+
+def collate_items(items):
+    # Keep failures in the batch so they are recorded and not retried on resume
+    return items
+
+
+def load_checkpoint(progress_path):
+    done = {}
+    if os.path.exists(progress_path):
+        with open(progress_path, 'r') as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by an interrupted run
+                done[row['path']] = row
+    return done
+
+
+def score_batch(service, items):
+    """Model + density rows for one collated batch, in the service's /predict format"""
+    rows = []
+    valid = [(path, tensor, density_result) for path, tensor, density_result, error in items if error is None]
+    outputs = service.forward_in_chunks([tensor.unsqueeze(0) for _, tensor, _ in valid], len(valid)) if valid else []
+    for (path, _, density_result), (species_probs, coverage_raw) in zip(valid, outputs):
+        analysis = service.build_analysis(service._model_prediction(species_probs, coverage_raw, density_result))
+        rows.append({
+            'path': path,
+            'success': True,
+            'error': None,
+            **{key: analysis[key] for key in COLUMNS if key in analysis},
+            'threshold': density_result['threshold'],
+            'total_pixels': density_result['total_pixels'],
+            'fouling_pixels': density_result['fouling_pixels']
+        })
+    for path, _, _, error in items:
+        if error is not None:
+            rows.append({'path': path, 'success': False, 'error': error})
+    return rows
+
+
+def write_output(rows, output, output_format):
+    if output_format == 'jsonl':
+        with open(output, 'w') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+    elif output_format == 'csv':
+        with open(output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+        table = pa.Table.from_pylist([{column: row.get(column) for column in COLUMNS} for row in rows])
+        pq.write_table(table, output)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Score a directory or manifest of inspection images offline')
+    parser.add_argument('directory', nargs='?', help='folder of images, searched recursively')
+    parser.add_argument('--manifest', help='text file of image paths, or a CSV with a "path" column')
+    parser.add_argument('--output', required=True, help='results file (.csv, .jsonl or .parquet)')
+    parser.add_argument('--format', choices=FORMATS, help='output format (default: from the output extension)')
+    parser.add_argument('--model-path', default=os.environ.get('MODEL_PATH'),
+                        help='checkpoint to load (default: model/best_model.pt)')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help='decode processes (0 decodes in the main process)')
+    parser.add_argument('--density-max-pixels', type=int, default=int(os.environ.get('DENSITY_MAX_PIXELS', 0)))
+    parser.add_argument('--log-every', type=int, default=10, help='batches between progress lines')
+    args = parser.parse_args(argv)
+    if bool(args.directory) == bool(args.manifest):
+        parser.error('give either a directory or --manifest')
+    if args.format is None:
+        extension = os.path.splitext(args.output)[1].lower().lstrip('.')
+        args.format = extension if extension in FORMATS else 'csv'
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.model_path:
+        os.environ['MODEL_PATH'] = args.model_path
+    # The service module owns model loading and the /predict analysis logic
+    import app as service
+    service.warm_up()
+    if service.model is None:
+        print("❌ No trained model loaded - bulk scoring needs real weights, not mock predictions")
+        return 1
+
+    paths = read_manifest(args.manifest) if args.manifest else list_images(args.directory)
+    progress_path = args.output + '.progress.jsonl'
+    done = load_checkpoint(progress_path)
+    todo = [path for path in paths if path not in done]
+    print(f"📂 {len(paths)} images, {len(paths) - len(todo)} already scored, {len(todo)} to go")
+
+    loader = torch.utils.data.DataLoader(
+        ImageFileDataset(todo, args.density_max_pixels),
+        batch_size=args.batch_size,
+        num_workers=args.workers,
+        collate_fn=collate_items,
+        prefetch_factor=2 if args.workers > 0 else None
+    )
+
+    started = time.perf_counter()
+    scored = 0
+    with open(progress_path, 'a') as progress:
+        for batch_number, items in enumerate(loader, 1):
+            rows = score_batch(service, items)
+            for row in rows:
+                progress.write(json.dumps(row) + '\n')
+                done[row['path']] = row
+            progress.flush()
+            scored += len(rows)
+            if batch_number % args.log_every == 0:
+                rate = scored / (time.perf_counter() - started)
+                print(f"⏱️ {scored}/{len(todo)} images, {rate:.1f} images/s")
+
+    elapsed = time.perf_counter() - started
+    rows = [done[path] for path in paths if path in done]
+    write_output(rows, args.output, args.format)
+    failed = sum(1 for row in rows if not row['success'])
+    rate = scored / elapsed if elapsed > 0 else 0.0
+    print(f"✅ Scored {scored} images in {elapsed:.1f}s ({rate:.1f} images/s), {failed} unreadable")
+    print(f"📄 Wrote {len(rows)} rows to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
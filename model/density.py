@@ -0,0 +1,100 @@
+import io
+import math
+
+import numpy as np
+from PIL import Image
+
+# Fouling density is the share of pixels brighter than the Otsu threshold of
+# the grayscale image. Everything here works from the 256-bin histogram, so no
+# full-size RGB copy, float image or binary mask is ever materialised.
+
+
+def otsu_threshold(hist):
+    """Otsu threshold of a 256-bin histogram, matching cv2.THRESH_OTSU.
+
+    Returns the largest gray level of the background class; pixels strictly
+    above it are foreground, as with cv2.threshold(..., THRESH_BINARY).
+    """
+    hist = np.asarray(hist, dtype=np.float64)
+    total = hist.sum()
+    if total == 0:
+        return 0
+    p = hist / total
+    levels = np.arange(hist.size, dtype=np.float64)
+
+    q1 = np.cumsum(p)
+    q2 = 1.0 - q1
+    mu1_sum = np.cumsum(p * levels)
+    mu = mu1_sum[-1]
+
+    # Same guard as OpenCV: skip splits where one class is (numerically) empty
+    eps = np.finfo(np.float32).eps
+    valid = (np.minimum(q1, q2) >= eps) & (np.maximum(q1, q2) <= 1.0 - eps)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mu1 = mu1_sum / q1
+        mu2 = (mu - mu1_sum) / q2
+        sigma = q1 * q2 * (mu1 - mu2) ** 2
+    sigma = np.where(valid, sigma, -1.0)
+    if sigma.max() < 0:
+        return 0
+    # argmax returns the first maximum, like OpenCV's strict '>' scan
+    return int(np.argmax(sigma))
+
+
+def density_from_histogram(hist):
+    """Otsu density statistics straight from a grayscale histogram"""
+    hist = np.asarray(hist, dtype=np.int64)
+    threshold = otsu_threshold(hist)
+    total_pixels = int(hist.sum())
+    fouling_pixels = int(hist[threshold + 1:].sum())
+    density = fouling_pixels / total_pixels * 100 if total_pixels else 0.0
+    return {
+        'density_percentage': round(density, 2),
+        'total_pixels': total_pixels,
+        'fouling_pixels': fouling_pixels,
+        'threshold': threshold,
+        'threshold_method': 'otsu'
+    }
+
+
+def gray_histogram(gray):
+    """256-bin histogram of a grayscale PIL image or uint8 array"""
+    if not isinstance(gray, Image.Image):
+        gray = Image.fromarray(np.asarray(gray, dtype=np.uint8))
+    # PIL's C histogram is several times faster than np.bincount on large images
+    return np.asarray(gray.histogram(), dtype=np.int64)
+
+
+def _reduction_factor(size, max_pixels):
+    width, height = size
+    if not max_pixels or width * height <= max_pixels:
+        return 1
+    return math.ceil(math.sqrt(width * height / max_pixels))
+
+
+def to_grayscale(image, max_pixels=None):
+    """Grayscale PIL copy of a decoded image, optionally box-reduced to ``max_pixels``"""
+    factor = _reduction_factor(image.size, max_pixels)
+    if factor > 1:
+        image = image.reduce(factor)
+    return image if image.mode == 'L' else image.convert('L')
+
+
+def decode_grayscale(image_bytes, max_pixels=None):
+    """Decode encoded image bytes straight to grayscale.
+
+    For JPEGs the decoder is put in draft mode, so libjpeg only decodes the
+    luma channel and, when ``max_pixels`` is set, scales down by 1/2, 1/4 or
+    1/8 during the IDCT instead of after a full-size decode.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.format == 'JPEG':
+        factor = _reduction_factor(image.size, max_pixels)
+        width, height = image.size
+        image.draft('L', (max(1, width // factor), max(1, height // factor)))
+    return to_grayscale(image, max_pixels)
+
+
+def calculate_density(gray):
+    """Otsu density of a grayscale PIL image or uint8 array"""
+    return density_from_histogram(gray_histogram(gray))
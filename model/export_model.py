@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Export the trained BiofoulingModel to a self-contained inference artifact.
+
+    python export_model.py --format torchscript
+    python export_model.py --format torchscript --method script --output model/best_model.torchscript.pt
+    python export_model.py --format onnx
+
+The export runs a parity check of both heads (species logits and coverage)
+against the eager model and exits non-zero if it fails. ONNX export needs
+the ``onnx`` package; serving it needs only ``onnxruntime``.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import torch
+from model_architecture import load_trained_model
+from backends import OnnxRuntimeModel, check_parity
+
+DEFAULT_OUTPUTS = {
+    'torchscript': os.path.join('model', 'best_model.torchscript.pt'),
+    'onnx': os.path.join('model', 'best_model.onnx'),
+}
+
+
+def export_torchscript(model, output_path, device, method='trace'):
+    """Trace or script the model, freeze it and save it with torch.jit"""
+    model.eval()
+    with torch.no_grad():
+        if method == 'script':
+            module = torch.jit.script(model)
+        else:
+            example = torch.randn(2, 3, 224, 224, device=device)
+            module = torch.jit.trace(model, example)
+        # Freezing inlines the weights as constants and drops training-only paths
+        module = torch.jit.freeze(module)
+    module.save(output_path)
+    return torch.jit.load(output_path, map_location=device)
+
+
+def export_onnx(model, output_path, device, opset_version=17):
+    """Export both heads to ONNX with a dynamic batch axis"""
+    model.eval()
+    example = torch.randn(2, 3, 224, 224, device=device)
+    batch_axis = {0: 'batch'}
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (example,), output_path,
+            input_names=['image'],
+            output_names=['species_logits', 'coverage'],
+            dynamic_axes={'image': batch_axis, 'species_logits': batch_axis, 'coverage': batch_axis},
+            opset_version=opset_version,
+            dynamo=False
+        )
+    return OnnxRuntimeModel(output_path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Export BiofoulingModel for fast inference')
+    parser.add_argument('--format', choices=sorted(DEFAULT_OUTPUTS), default='torchscript')
+    parser.add_argument('--model-path', default=os.environ.get('MODEL_PATH', os.path.join('model', 'best_model.pt')))
+    parser.add_argument('--output', help='artifact path (default depends on --format)')
+    parser.add_argument('--method', choices=['trace', 'script'], default='trace',
+                        help='TorchScript conversion method (ignored for ONNX)')
+    parser.add_argument('--atol', type=float, default=1e-3, help='parity tolerance against eager outputs')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = args.output or DEFAULT_OUTPUTS[args.format]
+    device = torch.device('cpu')
+
+    print(f"🔄 Loading eager model from: {args.model_path}")
+    model = load_trained_model(args.model_path, device)
+    if model is None:
+        return 1
+
+    started = time.perf_counter()
+    if args.format == 'onnx':
+        exported = export_onnx(model, output, device)
+    else:
+        exported = export_torchscript(model, output, device, method=args.method)
+    print(f"📦 Exported {args.format} to {output} in {time.perf_counter() - started:.2f}s")
+
+    parity = check_parity(model, exported, device, atol=args.atol)
+    print(f"🔍 Parity vs eager: {parity['max_abs_diff']} (same species: {parity['same_species']})")
+    if not parity['passed']:
+        print(f"❌ Parity check failed (atol={args.atol})")
+        return 1
+    print("✅ Parity check passed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Fused model preprocessing: one decode, a uint8 resize and a single lookup-table
+pass that converts and normalizes straight into one of a few input buffers
+that are allocated once and checked out per batch.
+
+    python fast_preprocess.py --images 64 --size 1600x1200 --density-max-pixels 500000
+
+replaces transform = Resize((224, 224)) -> ToTensor -> Normalize, which makes
+a float copy of the resized image and then a second normalized copy. Run as a
+script it benchmarks both paths on synthetic JPEGs and compares the model
+outputs they produce.
+"""
+
+import argparse
+import io
+import math
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+IMAGE_SIZE = 224
+MEAN = (0.485, 0.456, 0.406)
+STD = (0.229, 0.224, 0.225)
+
+# lut[c, v] is the normalized value of byte v in channel c, computed with the same
+# float32 operations as ToTensor (v / 255) followed by Normalize ((x - mean) / std)
+NORMALIZE_LUT = (
+    (np.arange(256, dtype=np.float32)[None, :] / np.float32(255) - np.array(MEAN, dtype=np.float32)[:, None])
+    / np.array(STD, dtype=np.float32)[:, None]
+).astype(np.float32)
+
+
+def draft_size(size, density_max_pixels=0):
+    """Smallest decode size that still serves the model input and the density cap.
+
+    Without a density cap, density needs every pixel, so no reduction is
+    allowed; with one, libjpeg may decode at 1/2, 1/4 or 1/8 scale.
+    """
+    if not density_max_pixels:
+        return None
+    width, height = size
+    factor = max(1, math.ceil(math.sqrt(width * height / density_max_pixels)))
+    return max(IMAGE_SIZE, width // factor), max(IMAGE_SIZE, height // factor)
+
+
+def decode_rgb(image_bytes, density_max_pixels=0):
+    """Decode to RGB, letting libjpeg scale down during the IDCT when the density cap allows"""
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.format == 'JPEG':
+        requested = draft_size(image.size, density_max_pixels)
+        if requested is not None:
+            image.draft('RGB', requested)
+    return image.convert('RGB')
+
+
+def torchvision_transform():
+    """The Resize -> ToTensor -> Normalize chain the model was trained with, which normalize_into() reproduces"""
+    import torchvision.transforms as transforms
+    return transforms.Compose([
+        transforms.Resize((IMAGE_SIZE, IMAGE_SIZE)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=list(MEAN), std=list(STD))
+    ])
+
+
+def normalize_into(image, out):
+    """Resize an RGB image to 224x224 in uint8 and write the normalized CHW float32 tensor into ``out``"""
+    pixels = np.asarray(image.resize((IMAGE_SIZE, IMAGE_SIZE), Image.BILINEAR))
+    for channel in range(3):
+        np.take(NORMALIZE_LUT[channel], pixels[:, :, channel], out=out[channel])
+    return out
+
+
+class InputBatch:
+    """An (N, 3, 224, 224) model input held in a FastPreprocessor buffer; release it once the forward pass is done"""
+
+    def __init__(self, preprocessor, buffer, tensor):
+        self.preprocessor = preprocessor
+        self.buffer = buffer
+        self.tensor = tensor
+
+    def release(self):
+        if self.buffer is not None:
+            self.preprocessor.release(self.buffer)
+            self.buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class FastPreprocessor:
+    """A fixed set of input buffers shared by every request thread.
+
+    ``checkout(images)`` waits for a free buffer, fills it and returns an
+    InputBatch; the buffer goes back to the set on release(). Buffers are
+    allocated (and pinned with CUDA, so the host-to-device copy can overlap)
+    the first time they are needed and then reused for the life of the
+    process. A batch larger than ``capacity`` gets a one-off buffer instead.
+    """
+
+    def __init__(self, device=None, buffers=2, capacity=32):
+        self.device = device
+        self.buffer_count = max(1, int(buffers))
+        self.capacity = max(1, int(capacity))
+        self._free = queue.Queue()
+        self._allocated = 0
+        self._lock = threading.Lock()
+
+    def _allocate(self, count):
+        import torch
+        buffer = torch.empty((count, 3, IMAGE_SIZE, IMAGE_SIZE), dtype=torch.float32)
+        if self.device is not None and self.device.type == 'cuda':
+            buffer = buffer.pin_memory()
+        return buffer
+
+    def _acquire(self, timeout):
+        with self._lock:
+            if self._free.empty() and self._allocated < self.buffer_count:
+                self._allocated += 1
+                return self._allocate(self.capacity)
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No free preprocessing buffer") from None
+
+    def release(self, buffer):
+        if buffer.shape[0] == self.capacity:
+            self._free.put(buffer)
+
+    def checkout(self, images, timeout=None):
+        if len(images) > self.capacity:
+            buffer = self._allocate(len(images))
+        else:
+            buffer = self._acquire(timeout)
+        try:
+            array = buffer.numpy()
+            for slot, image in enumerate(images):
+                normalize_into(image, array[slot])
+        except Exception:
+            self.release(buffer)
+            raise
+        batch = buffer[:len(images)]
+        if self.device is not None and self.device.type == 'cuda':
+            batch = batch.to(self.device, non_blocking=True)
+        return InputBatch(self, buffer, batch)
+
+
+def synthetic_jpegs(count, width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        shading = Image.fromarray((rng.random((height // 32, width // 32, 3)) * 255).astype(np.uint8))
+        rgb = np.asarray(shading.resize((width, height), Image.BICUBIC), dtype=np.float32)
+        rgb = (rgb + rng.normal(0, 12, rgb.shape)).clip(0, 255).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(rgb).save(buffer, 'JPEG', quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def benchmark(images, density_max_pixels=0, model_path=None):
+    """Time the torchvision chain against the fused path and compare model outputs"""
+    import torch
+    from model_architecture import BiofoulingModel, load_trained_model
+
+    transform = torchvision_transform()
+    preprocessor = FastPreprocessor(buffers=1, capacity=len(images))
+
+    def torchvision_path():
+        decoded = [Image.open(io.BytesIO(image_bytes)).convert('RGB') for image_bytes in images]
+        return torch.cat([transform(image).unsqueeze(0) for image in decoded], dim=0)
+
+    def fused_path(cap):
+        # One buffer and one thread here, so the view stays intact until the next call
+        with preprocessor.checkout([decode_rgb(image_bytes, cap) for image_bytes in images]) as inputs:
+            return inputs.tensor
+
+    def timed(function):
+        function()
+        started = time.perf_counter()
+        result = function()
+        return result, (time.perf_counter() - started) / len(images) * 1000
+
+    reference, reference_ms = timed(torchvision_path)
+    report = {'images': len(images), 'torchvision_ms_per_image': round(reference_ms, 3), 'fused': {}}
+
+    model = load_trained_model(model_path, torch.device('cpu')) if model_path else None
+    if model is None:
+        torch.manual_seed(0)
+        model = BiofoulingModel(num_classes=10).eval()
+    with torch.no_grad():
+        reference_probs = torch.softmax(model(reference)[0], dim=1)
+        for cap in sorted({0, density_max_pixels}):
+            batch, fused_ms = timed(lambda: fused_path(cap))
+            batch = batch.clone()
+            probs = torch.softmax(model(batch)[0], dim=1)
+            report['fused'][f'density_max_pixels={cap}'] = {
+                'ms_per_image': round(fused_ms, 3),
+                'speedup': round(reference_ms / fused_ms, 2),
+                'max_abs_input_diff': float((batch - reference).abs().max()),
+                'max_abs_prob_diff': float((probs - reference_probs).abs().max()),
+                'same_species': bool((probs.argmax(1) == reference_probs.argmax(1)).all())
+            }
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark fused preprocessing against the torchvision transform')
+    parser.add_argument('--images', type=int, default=32)
+    parser.add_argument('--size', default='1600x1200', help='WIDTHxHEIGHT of the synthetic JPEGs')
+    parser.add_argument('--density-max-pixels', type=int, default=500_000,
+                        help='density cap that lets the decoder scale down (0 = full resolution)')
+    parser.add_argument('--model-path', help='trained checkpoint (default: randomly initialised model)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    import json
+    args = parse_args(argv)
+    width, height = (int(value) for value in args.size.lower().split('x'))
+    report = benchmark(synthetic_jpegs(args.images, width, height), args.density_max_pixels, args.model_path)
+    print(f"⏱️ torchvision chain: {report['torchvision_ms_per_image']} ms/image")
+    for name, result in report['fused'].items():
+        print(f"⚡ fused ({name}): {result['ms_per_image']} ms/image, {result['speedup']}x, "
+              f"max prob diff {result['max_abs_prob_diff']:.2e}, same species: {result['same_species']}")
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
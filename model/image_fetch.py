@@ -0,0 +1,180 @@
+import logging
+import os
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger('foulingguard.fetch')
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+def resolve_image_url(url):
+    """Extract the direct image URL from a Bing image search link"""
+    if 'bing.com/images/search' in url and 'mediaurl=' in url:
+        parsed = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+        if 'mediaurl' in parsed:
+            direct_url = urllib.parse.unquote(parsed['mediaurl'][0])
+            logger.debug("Extracted direct URL: %s...", direct_url[:50])
+            return direct_url
+    return url
+
+
+class ImageFetcher:
+    """Shared HTTP layer for image URLs.
+
+    Keeps one pooled ``requests`` session, limits concurrent downloads per
+    host, streams bodies with a size cap, and holds recently fetched bytes for
+    ``cache_ttl`` seconds. Concurrent requests for the same URL wait for the
+    download already in flight instead of starting another one.
+    """
+
+    def __init__(self, timeout=10, max_bytes=25 * 1024 * 1024, pool_size=16, per_host_limit=4,
+                 cache_ttl=60, cache_max_bytes=64 * 1024 * 1024, max_workers=8):
+        self.timeout = timeout
+        self.max_bytes = int(max_bytes)
+        self.pool_size = int(pool_size)
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.cache_ttl = float(cache_ttl)
+        self.cache_max_bytes = int(cache_max_bytes)
+        self.max_workers = max(1, int(max_workers))
+        self._lock = threading.Lock()
+        self._session = None
+        self._session_pid = None
+        self._host_limits = {}
+        self._inflight = {}
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self.downloads = 0
+        self.cache_hits = 0
+
+    def _get_session(self):
+        # Imported here so services that never see a URL don't pay for requests
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        # Pooled sockets must not be shared with a forked child, so build one per process
+        with self._lock:
+            if self._session is None or self._session_pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = USER_AGENT
+                self._session = session
+                self._session_pid = os.getpid()
+            return self._session
+
+    def _host_limit(self, url):
+        host = urllib.parse.urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+
+    def _cached(self, url):
+        entry = self._cache.get(url)
+        if entry is None:
+            return None
+        fetched_at, content = entry
+        if time.monotonic() - fetched_at > self.cache_ttl:
+            self._evict(url)
+            return None
+        self._cache.move_to_end(url)
+        return content
+
+    def _evict(self, url):
+        _, content = self._cache.pop(url)
+        self._cache_bytes -= len(content)
+
+    def _remember(self, url, content):
+        if self.cache_ttl <= 0 or len(content) > self.cache_max_bytes:
+            return
+        if url in self._cache:
+            self._evict(url)
+        self._cache[url] = (time.monotonic(), content)
+        self._cache_bytes += len(content)
+        while self._cache_bytes > self.cache_max_bytes:
+            self._evict(next(iter(self._cache)))
+
+    def fetch(self, url):
+        """Download an image URL and return its bytes, raising on HTTP, type or size errors"""
+        url = resolve_image_url(url)
+        with self._lock:
+            content = self._cached(url)
+            if content is not None:
+                self.cache_hits += 1
+                return content
+            future = self._inflight.get(url)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[url] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            content = self._download(url)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+
+        with self._lock:
+            self._remember(url, content)
+        future.set_result(content)
+        return content
+
+    def _download(self, url):
+        session = self._get_session()
+        with self._host_limit(url):
+            logger.debug("Downloading image from URL: %s...", url[:50])
+            with session.get(url, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+
+                # Check if response is actually an image
+                content_type = response.headers.get('content-type', '')
+                if not content_type.startswith('image/'):
+                    raise ValueError(f"URL returned {content_type}, not an image")
+
+                declared = response.headers.get('content-length')
+                if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+                    raise ValueError(f"Image is larger than {self.max_bytes} bytes")
+
+                body = bytearray()
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    body += chunk
+                    if len(body) > self.max_bytes:
+                        raise ValueError(f"Image is larger than {self.max_bytes} bytes")
+
+        with self._lock:
+            self.downloads += 1
+        return bytes(body)
+
+    def fetch_many(self, urls):
+        """Fetch several URLs concurrently; each slot holds the bytes or the exception raised"""
+        def fetch_one(url):
+            try:
+                return self.fetch(url)
+            except Exception as e:
+                logger.warning("❌ Error fetching image: %s", e)
+                return e
+
+        if len(urls) <= 1:
+            return [fetch_one(url) for url in urls]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            return list(executor.map(fetch_one, urls))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'downloads': self.downloads,
+                'cache_hits': self.cache_hits,
+                'cached_urls': len(self._cache),
+                'cached_bytes': self._cache_bytes
+            }
@@ -0,0 +1,20 @@
+import base64
+import io
+
+import numpy as np
+from PIL import Image
+
+# Synthetic JPEG uploads shared by the test scripts
+
+
+def jpeg_bytes(seed=0, size=(320, 240)):
+    """Random-noise RGB JPEG of ``size`` (width, height), reproducible per seed"""
+    rgb = (np.random.default_rng(seed).random((size[1], size[0], 3)) * 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(rgb).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def encoded_jpeg(seed=0, size=(320, 240)):
+    """jpeg_bytes() as the base64 string the JSON endpoints take"""
+    return base64.b64encode(jpeg_bytes(seed, size)).decode()
@@ -0,0 +1,241 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from sqlite_util import PerProcessConnection
+
+logger = logging.getLogger('foulingguard.jobs')
+
+
+class JobQueueFull(Exception):
+    """Raised when accepting a job would exceed the pending image limit"""
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """Job records and per-image results in SQLite.
+
+    Each job keeps its inputs until they are scored, so unfinished jobs can be
+    picked up again after a restart. ``owner`` is the pid running the job and
+    ``updated`` doubles as its heartbeat.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = PerProcessConnection(path, (
+            'CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, total INTEGER NOT NULL, '
+            'completed INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL, '
+            'updated REAL NOT NULL, owner INTEGER, error TEXT)',
+            'CREATE TABLE IF NOT EXISTS job_items (job_id TEXT NOT NULL, idx INTEGER NOT NULL, image TEXT, '
+            'result TEXT, PRIMARY KEY (job_id, idx))'
+        ), timeout=10, wal=True)
+        self._lock = threading.Lock()
+
+    def create(self, images):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                'INSERT INTO jobs (id, status, total, created, updated) VALUES (?, ?, ?, ?, ?)',
+                (job_id, 'queued', len(images), now, now)
+            )
+            conn.executemany(
+                'INSERT INTO job_items (job_id, idx, image) VALUES (?, ?, ?)',
+                ((job_id, index, image) for index, image in enumerate(images))
+            )
+            conn.commit()
+        return job_id
+
+    def claim(self, job_id, owner):
+        """Mark a queued job as running in this process; False if another process holds it"""
+        with self._lock:
+            conn = self._connection()
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, updated = ? "
+                "WHERE id = ? AND status IN ('queued', 'running') AND (owner IS NULL OR owner = ?)",
+                (owner, time.time(), job_id, owner)
+            ).rowcount
+            conn.commit()
+        return claimed == 1
+
+    def release_stale(self, stale_seconds):
+        """Unassign unfinished jobs whose owner died or stopped heartbeating; returns their ids"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                "SELECT id, owner, updated FROM jobs WHERE status IN ('queued', 'running') ORDER BY created"
+            ).fetchall()
+            released = []
+            for job_id, owner, updated in rows:
+                if owner is not None and owner != os.getpid() and _process_alive(owner) and now - updated < stale_seconds:
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', owner = NULL WHERE id = ? AND owner IS ?",
+                    (job_id, owner)
+                )
+                released.append(job_id)
+            conn.commit()
+        return released
+
+    def pending_items(self, job_id, limit):
+        with self._lock:
+            return self._connection().execute(
+                'SELECT idx, image FROM job_items WHERE job_id = ? AND result IS NULL ORDER BY idx LIMIT ?',
+                (job_id, limit)
+            ).fetchall()
+
+    def record_results(self, job_id, results):
+        """Store one chunk of per-image results and bump the job's counters"""
+        failed = sum(1 for result in results if not result['success'])
+        with self._lock:
+            conn = self._connection()
+            # Inputs are dropped once scored; base64 uploads are most of the database
+            conn.executemany(
+                'UPDATE job_items SET result = ?, image = NULL WHERE job_id = ? AND idx = ?',
+                ((json.dumps(result), job_id, result['index']) for result in results)
+            )
+            conn.execute(
+                'UPDATE jobs SET completed = completed + ?, failed = failed + ?, updated = ? WHERE id = ?',
+                (len(results), failed, time.time(), job_id)
+            )
+            conn.commit()
+
+    def finish(self, job_id, status, error=None):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, owner = NULL, updated = ? WHERE id = ?',
+                (status, error, time.time(), job_id)
+            )
+            conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT id, status, total, completed, failed, created, updated, error FROM jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(('id', 'status', 'total', 'completed', 'failed', 'created', 'updated', 'error'), row))
+        job['progress'] = round(job['completed'] / job['total'], 4) if job['total'] else 1.0
+        return job
+
+    def results_after(self, job_id, after_index=-1, limit=500):
+        """Finished per-image results with an index above ``after_index``, in index order"""
+        with self._lock:
+            rows = self._connection().execute(
+                'SELECT result FROM job_items WHERE job_id = ? AND idx > ? AND result IS NOT NULL ORDER BY idx LIMIT ?',
+                (job_id, after_index, limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def pending_image_count(self):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT COALESCE(SUM(total - completed), 0) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()
+        return int(row[0])
+
+
+class JobRunner:
+    """Bounded pool of worker threads draining queued jobs chunk by chunk.
+
+    ``process_chunk(items)`` scores a list of ``(index, image_data)`` pairs and
+    returns one result dict (with ``index`` and ``success``) per item. Results
+    are written after every chunk, so a restarted job continues where it
+    stopped. ``submit`` refuses new work once ``max_pending_images`` images are
+    waiting across all unfinished jobs.
+    """
+
+    def __init__(self, store, process_chunk, workers=1, chunk_size=32, max_pending_images=20000, stale_seconds=300):
+        self.store = store
+        self.process_chunk = process_chunk
+        self.workers = max(1, int(workers))
+        self.chunk_size = max(1, int(chunk_size))
+        self.max_pending_images = int(max_pending_images)
+        self.stale_seconds = float(stale_seconds)
+        self._queue = queue.Queue()
+        self._submit_lock = threading.Lock()
+        self._threads = []
+        self._started_pid = None
+        self.jobs_run = 0
+        self.jobs_failed = 0
+
+    @property
+    def started(self):
+        return self._started_pid == os.getpid()
+
+    def start(self):
+        """Start the worker threads in this process and requeue unfinished jobs"""
+        with self._submit_lock:
+            if self.started:
+                return
+            self._started_pid = os.getpid()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'job-worker-{index}', daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        resumed = self.store.release_stale(self.stale_seconds)
+        for job_id in resumed:
+            self._queue.put(job_id)
+        if resumed:
+            logger.info("🔁 Resuming %d unfinished job(s)", len(resumed))
+
+    def submit(self, images):
+        """Persist a job and queue it; raises JobQueueFull when the backlog is full"""
+        self.start()
+        with self._submit_lock:
+            pending = self.store.pending_image_count()
+            if pending + len(images) > self.max_pending_images:
+                raise JobQueueFull(f"{pending} images are already waiting (limit {self.max_pending_images})")
+            job_id = self.store.create(images)
+        self._queue.put(job_id)
+        return job_id
+
+    def _run(self):
+        owner = os.getpid()
+        while True:
+            job_id = self._queue.get()
+            if not self.store.claim(job_id, owner):
+                continue
+            try:
+                while True:
+                    items = self.store.pending_items(job_id, self.chunk_size)
+                    if not items:
+                        break
+                    self.store.record_results(job_id, self.process_chunk(items))
+                self.store.finish(job_id, 'completed')
+                self.jobs_run += 1
+            except Exception as e:
+                logger.exception("❌ Job %s failed: %s", job_id, e)
+                self.store.finish(job_id, 'failed', str(e))
+                self.jobs_failed += 1
+
+    def stats(self):
+        """Worker and backlog counters for /health"""
+        return {
+            'workers': self.workers,
+            'queued_jobs': self._queue.qsize(),
+            'pending_images': self.store.pending_image_count(),
+            'max_pending_images': self.max_pending_images,
+            'jobs_run': self.jobs_run,
+            'jobs_failed': self.jobs_failed
+        }
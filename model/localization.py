@@ -0,0 +1,150 @@
+import math
+
+import numpy as np
+
+# Sliding-window species localization. A photo is covered by overlapping square
+# windows, each scored by BiofoulingModel as if it were a 224x224 input, which
+# gives a per-region species/coverage grid instead of one whole-photo label.
+
+INPUT_SIZE = 224
+FEATURE_STRIDE = 32  # ResNet50 layer4 cells per input pixel
+WINDOW_CELLS = INPUT_SIZE // FEATURE_STRIDE
+
+
+def plan_windows(width, height, window=None, overlap=0.5, max_crops=256):
+    """Pick a square window and stride (in source pixels) covering the image.
+
+    ``window`` defaults to half the short side. The stride follows from
+    ``overlap`` and is widened, then the window enlarged, until the grid fits
+    in ``max_crops`` windows. A non-square image needs two windows along its
+    long side, so with ``max_crops=1`` it gets a single window from the top
+    left corner and the far end goes unscored.
+    """
+    window = int(min(window or min(width, height) // 2, width, height))
+    window = max(1, window)
+    stride = max(1, int(window * (1 - overlap)))
+    while math.prod(grid_size(width, height, window, stride)) > max_crops:
+        widest = max(width, height) - window
+        if stride < widest:
+            stride = min(widest, max(stride + 1, math.ceil(stride * 1.25)))
+        elif window < min(width, height):
+            # Even edge-to-edge strides give too many windows, so the windows grow
+            window = min(width, height, math.ceil(window * 1.25))
+        else:
+            # One window per axis, signalled by a stride no grid would use
+            stride = max(width, height)
+            break
+    return window, stride
+
+
+def grid_size(width, height, window, stride):
+    if stride >= max(width, height):
+        return 1, 1
+    rows = 1 + math.ceil(max(0, height - window) / stride)
+    cols = 1 + math.ceil(max(0, width - window) / stride)
+    return rows, cols
+
+
+def window_boxes(width, height, window, stride):
+    """(left, top, right, bottom) boxes row by row; the last row/column is pinned to the edge"""
+    rows, cols = grid_size(width, height, window, stride)
+    tops = [min(row * stride, height - window) for row in range(rows)]
+    lefts = [min(col * stride, width - window) for col in range(cols)]
+    return [(left, top, left + window, top + window) for top in tops for left in lefts], (rows, cols)
+
+
+def supports_shared_features(model):
+    """Feature reuse needs the eager ResNet trunk; exported and quantized models run per crop"""
+    module = getattr(model, '_orig_mod', model)
+    backbone = getattr(module, 'backbone', None)
+    return all(hasattr(backbone, name) for name in ('conv1', 'layer4')) and hasattr(module, 'classifier') \
+        and not hasattr(backbone, 'quant')
+
+
+def backbone_feature_map(backbone, x):
+    """ResNet trunk up to layer4, stopping before global pooling"""
+    x = backbone.maxpool(backbone.relu(backbone.bn1(backbone.conv1(x))))
+    return backbone.layer4(backbone.layer3(backbone.layer2(backbone.layer1(x))))
+
+
+def shared_feature_plan(width, height, window, stride, max_side=2048, max_crops=256):
+    """Scale and cell stride for running the trunk once over the whole image.
+
+    The image is resized so one window spans 224 pixels (7x7 layer4 cells);
+    the window grows if that would push the long side past ``max_side``.
+    """
+    window = max(window, math.ceil(max(width, height) * INPUT_SIZE / max_side))
+    window = min(window, width, height)
+    scale = INPUT_SIZE / window
+    scaled = (max(INPUT_SIZE, round(width * scale)), max(INPUT_SIZE, round(height * scale)))
+    cells = (scaled[0] // FEATURE_STRIDE, scaled[1] // FEATURE_STRIDE)
+    stride_cells = max(1, round(stride * scale / FEATURE_STRIDE))
+    while math.prod(_pooled_size(cells, stride_cells)) > max_crops and stride_cells < max(cells):
+        stride_cells += 1
+    return scaled, stride_cells
+
+
+def _pooled_size(cells, stride_cells):
+    cols = (cells[0] - WINDOW_CELLS) // stride_cells + 1
+    rows = (cells[1] - WINDOW_CELLS) // stride_cells + 1
+    return rows, cols
+
+
+def shared_feature_windows(model, image_tensor, stride_cells):
+    """Score every window from one trunk pass over a 1x3xHxW tensor.
+
+    Average-pooling 7x7 blocks of the layer4 map stands in for the global
+    pooling each 224x224 crop would get, so overlapping windows share all
+    convolution work. Border context differs slightly from real crops.
+    Returns (species_logits, coverage_raw, (rows, cols)).
+    """
+    import torch.nn.functional as F
+
+    module = getattr(model, '_orig_mod', model)
+    feature_map = backbone_feature_map(module.backbone, image_tensor)
+    pooled = F.avg_pool2d(feature_map, kernel_size=WINDOW_CELLS, stride=stride_cells)
+    rows, cols = pooled.shape[2], pooled.shape[3]
+    features = pooled[0].flatten(1).transpose(0, 1)
+    return module.classifier(features), module.regressor(features), (rows, cols)
+
+
+def shared_feature_boxes(width, height, scaled, stride_cells, grid):
+    """Source-pixel boxes for the windows scored by shared_feature_windows()"""
+    rows, cols = grid
+    scale_x, scale_y = width / scaled[0], height / scaled[1]
+    step, span = stride_cells * FEATURE_STRIDE, INPUT_SIZE
+    return [
+        (round(col * step * scale_x), round(row * step * scale_y),
+         min(width, round((col * step + span) * scale_x)), min(height, round((row * step + span) * scale_y)))
+        for row in range(rows) for col in range(cols)
+    ]
+
+
+def summarize_regions(species_probs, coverage_raw, boxes, grid, species_map):
+    """Per-region grid plus species proportions from (N, classes) probabilities and (N,) coverage logits"""
+    species_probs = np.asarray(species_probs, dtype=np.float64)
+    coverage = 100 / (1 + np.exp(-np.asarray(coverage_raw, dtype=np.float64)))
+    top = species_probs.argmax(axis=1)
+
+    rows, cols = grid
+    regions = [[None] * cols for _ in range(rows)]
+    for index, box in enumerate(boxes):
+        regions[index // cols][index % cols] = {
+            'box': [int(value) for value in box],
+            'species': species_map.get(int(top[index]), 'Unknown Species'),
+            'confidence': round(float(species_probs[index, top[index]]), 4),
+            'coverage': round(float(coverage[index]), 2)
+        }
+
+    counts = np.bincount(top, minlength=species_probs.shape[1])
+    proportions = {
+        species_map.get(species, 'Unknown Species'): round(int(count) / len(top), 4)
+        for species, count in sorted(enumerate(counts), key=lambda item: -item[1]) if count
+    }
+    return {
+        'grid_shape': [rows, cols],
+        'regions': regions,
+        'species_proportions': proportions,
+        'dominant_species': next(iter(proportions), None),
+        'mean_coverage': round(float(coverage.mean()), 2) if len(coverage) else 0.0
+    }
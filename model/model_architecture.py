@@ -1,6 +1,12 @@
+import logging
+import time
+
 import torch
 import torch.nn as nn
 import torchvision.models as models
+import torchvision.models.quantization as quantizable_models
+
+logger = logging.getLogger('foulingguard.model')
 
 class BiofoulingModel(nn.Module):
     def __init__(self, num_classes=10):
@@ -32,24 +38,82 @@ class BiofoulingModel(nn.Module):
         coverage = self.regressor(features)
         
         return species_logits, coverage
+    
+    def embed(self, x):
+        """2048-d ResNet50 features that both heads are computed from"""
+        return self.backbone(x)
+
+class QuantizableBiofoulingModel(BiofoulingModel):
+    """BiofoulingModel on torchvision's quantizable ResNet50.
+
+    The backbone carries quant/dequant stubs and fusable conv-bn-relu blocks,
+    and its state dict keys match BiofoulingModel, so trained weights load
+    unchanged before post-training static quantization.
+    """
+    def __init__(self, num_classes=10):
+        super(QuantizableBiofoulingModel, self).__init__(num_classes=num_classes)
+        self.backbone = quantizable_models.resnet50(weights=None, quantize=False)
+        self.backbone.fc = nn.Identity()
+    
+    def fuse_model(self):
+        self.backbone.fuse_model(is_qat=False)
+
+def build_model_skeleton(num_classes=10):
+    """BiofoulingModel with parameters on the meta device: no memory, no random init"""
+    with torch.device('meta'):
+        return BiofoulingModel(num_classes=num_classes)
+
+def load_trained_model(model_path, device, num_classes=10, mmap=False, timings=None):
+    """Load the trained model with weights
 
-def load_trained_model(model_path, device, num_classes=10):
-    """Load the trained model with weights"""
+    The module is built on the meta device, so ResNet50's random init is
+    skipped, and the checkpoint tensors are assigned as its parameters
+    instead of being copied into freshly allocated ones. With ``mmap`` (CPU
+    only) the checkpoint is memory-mapped, so every process loading the same
+    file shares one set of physical pages through the page cache. Load times
+    are written into ``timings`` when given.
+    """
+    timings = timings if timings is not None else {}
     try:
+        started = time.perf_counter()
         # Create model architecture
-        model = BiofoulingModel(num_classes=num_classes)
+        model = build_model_skeleton(num_classes)
+        timings['build_seconds'] = round(time.perf_counter() - started, 4)
         
         # Load state dict
-        state_dict = torch.load(model_path, map_location=device, weights_only=True)
+        read_started = time.perf_counter()
+        map_weights = mmap and device.type == 'cpu'
+        state_dict = None
+        if map_weights:
+            try:
+                state_dict = torch.load(model_path, map_location='cpu', weights_only=True, mmap=True)
+            except RuntimeError as e:
+                # Only zip-format checkpoints (torch.save since 1.6) can be mapped
+                logger.warning("⚠️ Cannot memory-map %s (%s); loading a private copy", model_path, e)
+                map_weights = False
+        if state_dict is None:
+            state_dict = torch.load(model_path, map_location=device, weights_only=True)
+        timings['read_seconds'] = round(time.perf_counter() - read_started, 4)
         
-        # Load weights into model
-        model.load_state_dict(state_dict)
+        # Load weights into model; assign keeps the checkpoint tensors instead of copying them
+        assign_started = time.perf_counter()
+        model.load_state_dict(state_dict, assign=True)
+        if any(tensor.is_meta for tensor in list(model.parameters()) + list(model.buffers())):
+            raise RuntimeError("Checkpoint did not provide every parameter and buffer")
+        if any(parameter.dtype != torch.float32 for parameter in model.parameters()):
+            # Half-precision checkpoints: match what copying into float32 parameters produced
+            model.float()
         model.to(device)
         model.eval()
+        timings['assign_seconds'] = round(time.perf_counter() - assign_started, 4)
+        timings['load_seconds'] = round(time.perf_counter() - started, 4)
+        timings['mmap'] = map_weights
         
-        print(f"✅ Model architecture created and weights loaded successfully")
+        logger.info("✅ Model architecture created and weights loaded in %ss (build %ss, read %ss%s, assign %ss)",
+                    timings['load_seconds'], timings['build_seconds'], timings['read_seconds'],
+                    ', mapped' if map_weights else '', timings['assign_seconds'])
         return model
         
     except Exception as e:
-        print(f"❌ Error loading model architecture: {e}")
-        return None
\ No newline at end of file
+        logger.error("❌ Error loading model architecture: %s", e)
+        return None
@@ -0,0 +1,228 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import density as density_engine
+import fast_preprocess
+
+logger = logging.getLogger('foulingguard.preprocess')
+
+# Decode, density and model preprocessing off the request thread. Workers write
+# normalized 3x224x224 float32 tensors straight into slots of one shared buffer,
+# so only the slot number and the small density dict travel back to the caller.
+
+IMAGE_SIZE = fast_preprocess.IMAGE_SIZE
+
+_worker_slots = None
+_worker_memory = None
+
+
+def _attach_shared_slots(name, shape):
+    """Process-pool initializer: map the parent's slot buffer into this worker"""
+    global _worker_slots, _worker_memory
+    _worker_memory = SharedMemory(name=name)
+    _worker_slots = np.ndarray(shape, dtype=np.float32, buffer=_worker_memory.buf)
+
+
+def preprocess_into(image_bytes, out, density_max_pixels=0):
+    """Decode once, score Otsu density and write the normalized CHW tensor into ``out``"""
+    image = fast_preprocess.decode_rgb(image_bytes, density_max_pixels)
+    density_result = density_engine.calculate_density(density_engine.to_grayscale(image, density_max_pixels))
+    density_result['success'] = True
+    fast_preprocess.normalize_into(image, out)
+    return image.size, density_result
+
+
+def _preprocess_in_slot(image_bytes, slot, density_max_pixels, slots=None):
+    slots = _worker_slots if slots is None else slots
+    return preprocess_into(image_bytes, slots[slot], density_max_pixels)
+
+
+class Preprocessed:
+    """A ready model input held in a pool slot; release it once the forward pass is done"""
+
+    def __init__(self, pool, slot, size, density_result):
+        self.pool = pool
+        self.slot = slot
+        self.size = size
+        self.density_result = density_result
+        self.tensor = pool.slot_tensor(slot)
+
+    def release(self):
+        if self.slot is not None:
+            self.pool.release(self.slot)
+            self.slot = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class PreprocessPool:
+    """Pool of decode/preprocess workers feeding tensors to the inference thread.
+
+    ``mode='process'`` uses worker processes and a shared-memory slot buffer,
+    so CPU-bound decoding scales across cores. ``mode='thread'`` keeps the
+    buffer in-process and relies on PIL releasing the GIL while it decodes
+    and resizes. Slots bound the number of images in flight: ``preprocess``
+    blocks for a free slot, which is the pool's backpressure.
+    """
+
+    def __init__(self, workers=2, mode='process', slots=32, density_max_pixels=0):
+        if mode not in ('process', 'thread'):
+            raise ValueError(f"Unknown preprocessing mode: {mode}")
+        self.workers = max(1, int(workers))
+        self.mode = mode
+        self.slot_count = max(1, int(slots))
+        self.density_max_pixels = density_max_pixels
+        self._lock = threading.Lock()
+        self._acquire_lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._memory = None
+        self._slots = None
+        self._free = None
+        self.processed = 0
+        self.errors = 0
+
+    def _ensure_started(self):
+        # Executors and shared memory are per process, so a forked server worker builds its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            shape = (self.slot_count, 3, IMAGE_SIZE, IMAGE_SIZE)
+            if self.mode == 'process':
+                self._memory = SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+                atexit.register(self.close)
+                self._slots = np.ndarray(shape, dtype=np.float32, buffer=self._memory.buf)
+                self._executor = self._process_executor()
+            else:
+                self._slots = np.empty(shape, dtype=np.float32)
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='preprocess')
+            self._free = queue.Queue()
+            for slot in range(self.slot_count):
+                self._free.put(slot)
+            self._pid = os.getpid()
+
+    def _process_executor(self):
+        # Spawned, not forked: workers only need PIL and NumPy, never the parent's torch threads
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context('spawn'),
+            initializer=_attach_shared_slots,
+            initargs=(self._memory.name, self._slots.shape)
+        )
+
+    def _replace_broken_executor(self, broken):
+        """A worker killed mid-task (e.g. by the OOM killer) breaks the whole executor; start a fresh one"""
+        with self._lock:
+            if self._executor is broken:
+                logger.warning("⚠️ Preprocessing worker died - restarting the pool")
+                self._executor = self._process_executor()
+
+    def slot_tensor(self, slot):
+        """1x3x224x224 torch view of a slot (no copy)"""
+        import torch
+        return torch.from_numpy(self._slots[slot:slot + 1])
+
+    def release(self, slot):
+        self._free.put(slot)
+
+    def _acquire(self, count, timeout):
+        """Take ``count`` free slots at once, so concurrent callers never hold partial sets and deadlock"""
+        if count > self.slot_count:
+            raise ValueError(f"{count} images exceed the {self.slot_count} preprocessing slots")
+        slots = []
+        with self._acquire_lock:
+            try:
+                for _ in range(count):
+                    slots.append(self._free.get(timeout=timeout))
+            except queue.Empty:
+                for slot in slots:
+                    self.release(slot)
+                raise TimeoutError("No free preprocessing slot")
+        return slots
+
+    def _submit(self, image_bytes, slot):
+        try:
+            if self.mode == 'process':
+                executor = self._executor
+                try:
+                    return executor.submit(_preprocess_in_slot, image_bytes, slot, self.density_max_pixels)
+                except BrokenProcessPool:
+                    self._replace_broken_executor(executor)
+                    return self._executor.submit(_preprocess_in_slot, image_bytes, slot, self.density_max_pixels)
+            return self._executor.submit(_preprocess_in_slot, image_bytes, slot, self.density_max_pixels, self._slots)
+        except Exception:
+            self.release(slot)
+            raise
+
+    def collect(self, slot, future):
+        """Wait for a submitted image; returns Preprocessed, or None if it could not be decoded"""
+        try:
+            size, density_result = future.result()
+        except Exception as e:
+            # A broken process pool is replaced on the next submit
+            self.release(slot)
+            self.errors += 1
+            logger.warning("❌ Error preprocessing image: %s", e)
+            return None
+        self.processed += 1
+        return Preprocessed(self, slot, size, density_result)
+
+    def preprocess(self, image_bytes, timeout=None):
+        return self.preprocess_many([image_bytes], timeout)[0]
+
+    def preprocess_many(self, images, timeout=None):
+        """Preprocess several images in parallel, in order; at most ``slots`` per call"""
+        self._ensure_started()
+        slots = self._acquire(len(images), timeout)
+        pending = []
+        try:
+            for slot, image_bytes in zip(slots, images):
+                # _submit releases the slot itself if submitting fails
+                pending.append((slot, self._submit(image_bytes, slot)))
+        finally:
+            if len(pending) < len(slots):
+                for slot in slots[len(pending) + 1:]:
+                    self.release(slot)
+                # Wait out the images already handed to workers, which still write into their slots
+                for slot, future in pending:
+                    item = self.collect(slot, future)
+                    if item is not None:
+                        item.release()
+        return [self.collect(slot, future) for slot, future in pending]
+
+    def close(self):
+        """Stop the workers and free the shared slot buffer"""
+        if self._pid != os.getpid():
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._memory is not None:
+            self._slots = None
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+        self._pid = None
+
+    def stats(self):
+        return {
+            'enabled': True,
+            'mode': self.mode,
+            'workers': self.workers,
+            'slots': self.slot_count,
+            'free_slots': self._free.qsize() if self._free is not None else self.slot_count,
+            'processed': self.processed,
+            'errors': self.errors
+        }
@@ -0,0 +1,57 @@
+import os
+
+# Resident vs shared memory of a process, from /proc on Linux. Weights that
+# workers map from the same checkpoint file (or inherit copy-on-write from the
+# preloading parent) show up as shared; PSS splits shared pages evenly between
+# the processes mapping them, so summing PSS over the workers gives their real
+# combined footprint.
+
+_FIELDS = {
+    'Rss': 'rss_mb',
+    'Pss': 'pss_mb',
+    'Shared_Clean': 'shared_clean_mb',
+    'Shared_Dirty': 'shared_dirty_mb',
+    'Private_Clean': 'private_clean_mb',
+    'Private_Dirty': 'private_dirty_mb'
+}
+
+
+def memory_usage(pid=None):
+    """Memory of ``pid`` (default: this process) in MB, or None where /proc is unavailable"""
+    pid = pid or os.getpid()
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            values = {}
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in _FIELDS:
+                    values[_FIELDS[key]] = round(int(rest.split()[0]) / 1024, 1)
+    except (OSError, ValueError):
+        return _statm_usage(pid)
+    values['shared_mb'] = round(values.get('shared_clean_mb', 0) + values.get('shared_dirty_mb', 0), 1)
+    values['private_mb'] = round(values.get('private_clean_mb', 0) + values.get('private_dirty_mb', 0), 1)
+    return values
+
+
+def _statm_usage(pid):
+    # Kernels before 4.14 have no smaps_rollup; statm only knows resident and file-backed shared pages
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            _, resident, shared = (int(value) for value in f.read().split()[:3])
+    except (OSError, ValueError):
+        return None
+    page_mb = os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    return {
+        'rss_mb': round(resident * page_mb, 1),
+        'shared_mb': round(shared * page_mb, 1),
+        'private_mb': round((resident - shared) * page_mb, 1)
+    }
+
+
+def format_usage(usage):
+    if usage is None:
+        return 'memory usage unavailable'
+    text = f"RSS {usage['rss_mb']} MB (shared {usage['shared_mb']} MB, private {usage['private_mb']} MB"
+    if 'pss_mb' in usage:
+        text += f", PSS {usage['pss_mb']} MB"
+    return text + ')'
@@ -0,0 +1,253 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger('foulingguard.profiling')
+
+# Opt-in request profiling. A session covers one request: cProfile for the
+# request thread, or a stack sampler over every thread (request, micro-batcher,
+# fetch pool) that writes folded stacks for flamegraph.pl or speedscope. The
+# model forward pass can be captured separately with torch.profiler, which
+# exports a Chrome trace of the BiofoulingModel operators. The capture belongs
+# to the session that asked for it and is dropped when that session stops.
+
+MODES = ('cprofile', 'sampling')
+PROFILE_ID = re.compile(r'^[0-9a-f]{8,32}$')
+ARTIFACTS = {
+    'summary': '.json',
+    'prof': '.prof',       # pstats dump (snakeviz, flameprof, gprof2dot)
+    'folded': '.folded',   # "frame;frame;frame count" lines
+    'torch': '.torch.json',  # chrome://tracing / Perfetto
+    'ops': '.ops.txt'      # torch operator table
+}
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class StackSampler:
+    """Samples the stacks of every other thread at a fixed interval"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f'thread-{ident}'))
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.counts.items()))
+
+
+class ProfileSession:
+    def __init__(self, profiler, mode, torch_forward=False):
+        self.profiler = profiler
+        self.mode = mode
+        self.torch_forward = torch_forward
+        self.id = uuid.uuid4().hex[:16]
+        self._profile = None
+        self._sampler = None
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = StackSampler(self.profiler.sample_interval)
+            self._sampler.start()
+
+    def stop(self, endpoint, status):
+        """Stop capturing and write the artifacts; returns the profile id"""
+        duration = time.perf_counter() - self._started
+        summary = {
+            'id': self.id,
+            'endpoint': endpoint,
+            'status': status,
+            'mode': self.mode,
+            'duration_ms': round(duration * 1000, 3),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        }
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+                self._profile.dump_stats(self.profiler.path(self.id, 'prof'))
+                report = io.StringIO()
+                pstats.Stats(self._profile, stream=report).sort_stats('cumulative').print_stats(25)
+                summary['top_functions'] = report.getvalue()
+            else:
+                self._sampler.stop()
+                with open(self.profiler.path(self.id, 'folded'), 'w') as f:
+                    f.write(self._sampler.folded())
+                summary['samples'] = self._sampler.samples
+            with open(self.profiler.path(self.id, 'summary'), 'w') as f:
+                json.dump(summary, f, indent=2)
+        finally:
+            self.profiler._session_done()
+        logger.info("🔬 Profiled %s (%s) in %.1f ms: %s", endpoint, self.mode, duration * 1000, self.id)
+        return self.id
+
+
+class RequestProfiler:
+    """Arms profiling for the next N requests and stores the results under ``directory``.
+
+    Only one session runs at a time; requests arriving while one is active
+    are served unprofiled and do not use up the armed count.
+    """
+
+    def __init__(self, directory, sample_interval=0.005, max_requests=100):
+        self.directory = directory
+        self.sample_interval = sample_interval
+        self.max_requests = max_requests
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._mode = 'cprofile'
+        self._torch = False
+        self._session = None
+        self.captured = 0
+
+    def path(self, profile_id, kind):
+        return os.path.join(self.directory, profile_id + ARTIFACTS[kind])
+
+    def arm(self, requests, mode='cprofile', torch_forward=False):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        requests = int(requests)
+        if not 1 <= requests <= self.max_requests:
+            raise ValueError(f"requests must be between 1 and {self.max_requests}")
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._remaining = requests
+            self._mode = mode
+            self._torch = bool(torch_forward)
+        return self.stats()
+
+    def disarm(self):
+        with self._lock:
+            self._remaining = 0
+            self._torch = False
+        return self.stats()
+
+    def claim(self, mode=None, torch_forward=False, forward_pass=True):
+        """Session for this request, either armed or forced by ``mode``, or None
+
+        ``torch_forward`` asks a forced session to capture the forward pass;
+        armed sessions use the flag they were armed with. Either way only a
+        request that runs one (``forward_pass``) gets a capture.
+        """
+        with self._lock:
+            if self._session is not None or (mode is None and self._remaining <= 0):
+                return None
+            if mode is None:
+                self._remaining -= 1
+                mode = self._mode
+                torch_forward = self._torch
+            session = ProfileSession(self, mode, bool(torch_forward and forward_pass))
+            self._session = session
+        os.makedirs(self.directory, exist_ok=True)
+        return session
+
+    def _session_done(self):
+        with self._lock:
+            self._session = None
+            self.captured += 1
+
+    def torch_forward(self):
+        """Context for one model forward pass: a torch.profiler capture if the active session wants one, else a no-op"""
+        with self._lock:
+            session = self._session
+            if session is None or not session.torch_forward:
+                return nullcontext()
+            session.torch_forward = False
+        return self._torch_capture(session.id)
+
+    @contextmanager
+    def _torch_capture(self, session_id):
+        import torch
+        from torch.profiler import ProfilerActivity, profile, record_function
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        profile_id = uuid.uuid4().hex[:16]
+        with profile(activities=activities, record_shapes=True) as capture:
+            with record_function('BiofoulingModel.forward'):
+                yield
+        capture.export_chrome_trace(self.path(profile_id, 'torch'))
+        with open(self.path(profile_id, 'ops'), 'w') as f:
+            f.write(capture.key_averages().table(sort_by='self_cpu_time_total', row_limit=30))
+        with open(self.path(profile_id, 'summary'), 'w') as f:
+            json.dump({
+                'id': profile_id,
+                'endpoint': 'forward',
+                'mode': 'torch',
+                'session': session_id,
+                'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            }, f, indent=2)
+        logger.info("🔬 Captured torch profile of a forward pass: %s", profile_id)
+
+    def list(self):
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory)):
+            profile_id, _, extension = name.partition('.')
+            if extension != 'json' or not PROFILE_ID.match(profile_id):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r') as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summary.pop('top_functions', None)
+            summary['artifacts'] = [kind for kind in ARTIFACTS if os.path.exists(self.path(profile_id, kind))]
+            profiles.append(summary)
+        return sorted(profiles, key=lambda summary: summary['created'], reverse=True)
+
+    def stats(self):
+        return {
+            'armed_requests': self._remaining,
+            'mode': self._mode,
+            'torch': self._torch,
+            'armed_forward_passes': int(self._session is not None and self._session.torch_forward),
+            'active': self._session is not None,
+            'captured': self.captured
+        }
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Post-training INT8 quantization of the trained BiofoulingModel.
+
+    python quantize_model.py --mode static --data-dir data/ --calibration-size 200
+    python quantize_model.py --mode dynamic
+
+``--data-dir`` is the training dataset laid out as <split>/<Species_name>/*.jpg.
+Static quantization calibrates on a sample of the train split drawn in the
+proportions of model/dataset_summary.json; accuracy is measured on the test
+split and compared with the fp32 ``test_acc`` in model/results.json.
+
+``--mode dynamic`` only quantizes the nn.Linear classifier heads; the ResNet50
+backbone, which holds nearly all weights and compute, stays fp32, so size,
+memory and latency are practically unchanged. It is kept as a no-calibration
+baseline, not as a way to shrink the model.
+
+The quantized model is written as a frozen TorchScript artifact that the
+service loads with INFERENCE_BACKEND=int8, and a JSON report compares
+accuracy, latency, model size and runtime memory (RSS/PSS of a fresh process
+before and after loading each model) with the fp32 model.
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import torch
+import torch.nn as nn
+from PIL import Image
+import fast_preprocess
+from model_architecture import QuantizableBiofoulingModel, load_trained_model
+from process_memory import memory_usage
+
+SUMMARY_PATH = os.path.join('model', 'dataset_summary.json')
+CLASS_MAPPING_PATH = os.path.join('model', 'class_mapping.json')
+RESULTS_PATH = os.path.join('model', 'results.json')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Same preprocessing as the model service, so calibration sees serving inputs
+transform = fast_preprocess.torchvision_transform()
+
+
+def default_engine():
+    engines = torch.backends.quantized.supported_engines
+    for engine in ('x86', 'fbgemm', 'qnnpack'):
+        if engine in engines:
+            return engine
+    raise RuntimeError(f"No quantized engine available (supported: {engines})")
+
+
+def sample_split(data_dir, split, limit, seed=0):
+    """Pick up to ``limit`` (path, class_id) pairs from a split, stratified like dataset_summary.json"""
+    with open(SUMMARY_PATH, 'r') as f:
+        distribution = json.load(f)['split_distribution'][split]
+    with open(CLASS_MAPPING_PATH, 'r') as f:
+        species_to_id = json.load(f)['species_to_id']
+
+    rng = random.Random(seed)
+    split_total = sum(distribution.values())
+    samples = []
+    for species, count in sorted(distribution.items()):
+        species_dir = os.path.join(data_dir, split, species)
+        if not os.path.isdir(species_dir):
+            print(f"⚠️ Missing {split} folder for {species}: {species_dir}")
+            continue
+        files = sorted(name for name in os.listdir(species_dir) if name.lower().endswith(IMAGE_EXTENSIONS))
+        quota = len(files) if limit is None else max(1, round(limit * count / split_total))
+        for name in rng.sample(files, min(quota, len(files))):
+            samples.append((os.path.join(species_dir, name), species_to_id[species]))
+    rng.shuffle(samples)
+    return samples if limit is None else samples[:limit]
+
+
+def iterate_batches(samples, batch_size):
+    for start in range(0, len(samples), batch_size):
+        chunk = samples[start:start + batch_size]
+        images = [transform(Image.open(path).convert('RGB')) for path, _ in chunk]
+        yield torch.stack(images), torch.tensor([label for _, label in chunk])
+
+
+def quantize_dynamic(model):
+    """Dynamic INT8 for the Linear heads only; the conv backbone stays fp32 (see the module docstring)"""
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(model_path, calibration_samples, engine, batch_size=16):
+    """Static INT8 for the fused ResNet50 backbone, calibrated on real images"""
+    model = QuantizableBiofoulingModel(num_classes=10)
+    model.load_state_dict(torch.load(model_path, map_location='cpu', weights_only=True))
+    model.eval()
+    model.fuse_model()
+
+    torch.backends.quantized.engine = engine
+    model.backbone.qconfig = torch.ao.quantization.get_default_qconfig(engine)
+    torch.ao.quantization.prepare(model.backbone, inplace=True)
+
+    with torch.no_grad():
+        for images, _ in iterate_batches(calibration_samples, batch_size):
+            model(images)
+    torch.ao.quantization.convert(model.backbone, inplace=True)
+
+    # The heads are tiny next to the backbone but run on its fp32 output, so quantize them dynamically
+    return quantize_dynamic(model)
+
+
+def save_torchscript(model, output_path):
+    with torch.no_grad():
+        module = torch.jit.freeze(torch.jit.trace(model, torch.randn(2, 3, 224, 224)))
+    module.save(output_path)
+    return torch.jit.load(output_path, map_location='cpu')
+
+
+def serialized_size_mb(model):
+    buffer = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buffer)
+    else:
+        torch.save(model.state_dict(), buffer)
+    return round(len(buffer.getvalue()) / (1024 * 1024), 2)
+
+
+def measure_latency(model, batch_size, runs=10):
+    inputs = torch.randn(batch_size, 3, 224, 224)
+    with torch.no_grad():
+        model(inputs)
+        started = time.perf_counter()
+        for _ in range(runs):
+            model(inputs)
+    return round((time.perf_counter() - started) / runs * 1000, 2)
+
+
+def _load_and_measure(backend, model_path):
+    # Runs in a fresh spawned process, so the numbers only cover this one model
+    from backends import load_inference_model
+    before = memory_usage()
+    model = load_inference_model(backend, model_path, torch.device('cpu'), mmap=True)
+    loaded = memory_usage()
+    with torch.no_grad():
+        model(torch.zeros(1, 3, 224, 224))
+    return before, loaded, memory_usage()
+
+
+def measure_memory(backend, model_path):
+    """RSS/PSS in MB of a fresh process before loading ``model_path``, after loading it and after one forward pass
+
+    fp32 checkpoints are memory-mapped as the service maps them, so their
+    weights count as shared file pages in PSS. Returns None where /proc is
+    unavailable.
+    """
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        before, loaded, forward = pool.apply(_load_and_measure, (backend, model_path))
+    if before is None:
+        return None
+    fields = [field for field in ('rss_mb', 'pss_mb') if field in before]
+    return {
+        'before_load': {field: before[field] for field in fields},
+        'after_load': {field: loaded[field] for field in fields},
+        'after_forward': {field: forward[field] for field in fields},
+        'model_mb': {field: round(forward[field] - before[field], 1) for field in fields}
+    }
+
+
+def evaluate_accuracy(model, samples, batch_size=32):
+    correct = 0
+    with torch.no_grad():
+        for images, labels in iterate_batches(samples, batch_size):
+            species_logits, _ = model(images)
+            correct += int((species_logits.argmax(dim=1) == labels).sum())
+    return round(correct / len(samples), 4) if samples else None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Quantize BiofoulingModel to INT8')
+    parser.add_argument('--mode', choices=['dynamic', 'static'], default='static',
+                        help='static quantizes the whole backbone; dynamic only the Linear heads (backbone stays fp32)')
+    parser.add_argument('--model-path', default=os.environ.get('MODEL_PATH', os.path.join('model', 'best_model.pt')))
+    parser.add_argument('--output', default=os.path.join('model', 'best_model.int8.pt'))
+    parser.add_argument('--report', default=os.path.join('model', 'quantization_report.json'))
+    parser.add_argument('--data-dir', help='dataset root with train/val/test splits')
+    parser.add_argument('--calibration-size', type=int, default=200)
+    parser.add_argument('--eval-size', type=int, default=None, help='test images to score (default: whole split)')
+    parser.add_argument('--engine', default=None, help='quantized engine (x86, fbgemm, qnnpack)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    engine = args.engine or default_engine()
+    torch.backends.quantized.engine = engine
+
+    fp32_model = load_trained_model(args.model_path, torch.device('cpu'))
+    if fp32_model is None:
+        return 1
+
+    if args.mode == 'static':
+        if not args.data_dir:
+            print("❌ Static quantization needs --data-dir for calibration images")
+            return 1
+        calibration = sample_split(args.data_dir, 'train', args.calibration_size)
+        print(f"📊 Calibrating on {len(calibration)} train images with the {engine} engine")
+        quantized = quantize_static(args.model_path, calibration, engine)
+    else:
+        print("⚠️ Dynamic mode only quantizes the Linear heads; the fp32 backbone dominates size and latency")
+        quantized = quantize_dynamic(fp32_model)
+
+    int8_model = save_torchscript(quantized, args.output)
+    print(f"📦 Saved {args.mode} INT8 model to {args.output}")
+
+    report = {
+        'mode': args.mode,
+        'engine': engine,
+        'artifact': args.output,
+        'size_mb': {'fp32': serialized_size_mb(fp32_model), 'int8': round(os.path.getsize(args.output) / (1024 * 1024), 2)},
+        'latency_ms': {
+            f'batch_{batch_size}': {'fp32': measure_latency(fp32_model, batch_size), 'int8': measure_latency(int8_model, batch_size)}
+            for batch_size in (1, 8)
+        },
+        'memory_mb': {'fp32': measure_memory('eager', args.model_path), 'int8': measure_memory('int8', args.output)},
+        'accuracy': None
+    }
+
+    if args.data_dir:
+        test_samples = sample_split(args.data_dir, 'test', args.eval_size)
+        reference = None
+        if os.path.exists(RESULTS_PATH):
+            with open(RESULTS_PATH, 'r') as f:
+                reference = json.load(f).get('test_acc')
+        fp32_acc = evaluate_accuracy(fp32_model, test_samples)
+        int8_acc = evaluate_accuracy(int8_model, test_samples)
+        report['accuracy'] = {
+            'test_images': len(test_samples),
+            'reported_test_acc': reference,
+            'fp32': fp32_acc,
+            'int8': int8_acc,
+            'drop': round(fp32_acc - int8_acc, 4) if fp32_acc is not None and int8_acc is not None else None
+        }
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"📊 Size: {report['size_mb']['fp32']} MB fp32 -> {report['size_mb']['int8']} MB int8")
+    for name, latency in report['latency_ms'].items():
+        print(f"⏱️ {name}: {latency['fp32']} ms fp32 -> {latency['int8']} ms int8")
+    if report['memory_mb']['fp32'] and report['memory_mb']['int8']:
+        print("🧠 Memory added by the model: " + ', '.join(
+            f"{field} {report['memory_mb']['fp32']['model_mb'][field]} MB fp32 -> {report['memory_mb']['int8']['model_mb'][field]} MB int8"
+            for field in report['memory_mb']['int8']['model_mb']))
+    if report['accuracy']:
+        accuracy = report['accuracy']
+        print(f"🎯 Accuracy: {accuracy['fp32']} fp32 -> {accuracy['int8']} int8 (reported test_acc {accuracy['reported_test_acc']})")
+    print(f"✅ Report written to {args.report}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlite_util import PerProcessConnection
+
+logger = logging.getLogger('foulingguard.cache')
+
+
+def make_cache_key(image_bytes, namespace, version):
+    """Key a result by the image content, the endpoint and the model weights that produced it"""
+    digest = hashlib.blake2b(image_bytes, digest_size=20).hexdigest()
+    return f"{namespace}:{version}:{digest}"
+
+
+class ResultCache:
+    """Size-bounded LRU cache with a TTL and an optional SQLite tier on disk.
+
+    Values must be JSON-serialisable. Entries found only on disk are promoted
+    back into memory, so a restarted service warms up from the disk tier.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, disk_path=None, disk_max_entries=100000):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self.disk_path = disk_path
+        self.disk_max_entries = int(disk_max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = PerProcessConnection(disk_path, (
+            'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS results_created ON results (created)'
+        ))
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 or self.disk_path is not None
+
+    def _expired(self, created, now):
+        return self.ttl > 0 and now - created > self.ttl
+
+    def get(self, key):
+        """Return the cached value, or None on a miss"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+            if self.disk_path is not None:
+                try:
+                    row = self._connection().execute(
+                        'SELECT value, created FROM results WHERE key = ?', (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning("⚠️ Result cache disk read failed: %s", e)
+                    row = None
+                if row is not None and not self._expired(row[1], now):
+                    value = json.loads(row[0])
+                    self._store(key, value, row[1])
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Store a JSON-serialisable value in memory and, when configured, on disk"""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._store(key, value, now)
+            if self.disk_path is not None:
+                try:
+                    conn = self._connection()
+                    conn.execute(
+                        'INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)',
+                        (key, json.dumps(value), now)
+                    )
+                    self._disk_writes += 1
+                    if self._disk_writes % 100 == 0:
+                        self._prune_disk(conn, now)
+                    conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning("⚠️ Result cache disk write failed: %s", e)
+
+    def _store(self, key, value, created):
+        if self.max_entries == 0:
+            return
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self, conn, now):
+        if self.ttl > 0:
+            conn.execute('DELETE FROM results WHERE created < ?', (now - self.ttl,))
+        conn.execute(
+            'DELETE FROM results WHERE key IN '
+            '(SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)',
+            (self.disk_max_entries,)
+        )
+
+    def stats(self):
+        """Hit/miss/eviction counters for /health"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'disk_tier': self.disk_path is not None,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0
+            }
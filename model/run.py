@@ -22,11 +22,11 @@ def main():
         if not install_requirements():
             return
     
-    # Start the Flask app
+    # Start the production server (settings come from HOST, PORT, WORKERS, ... env vars)
     try:
-        from app import app
+        from serve import main as serve
         print("🤖 Model service starting on http://localhost:5001")
-        app.run(host='0.0.0.0', port=5001, debug=False)
+        serve([])
     except ImportError as e:
         print(f"❌ Import error: {e}")
         print("Please install requirements first: pip install -r requirements.txt")
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the FoulingGuard AI model service.
+
+The parent process loads BiofoulingModel once, binds the listening socket and
+forks the worker processes, so every worker shares the weights copy-on-write.
+Each worker runs a threaded WSGI server and limits torch to its share of the
+cores. On platforms without fork a single threaded server is started.
+
+With a single worker the server starts listening straight away and warms the
+model up in the background, so /health/live answers immediately and
+/health/ready flips to 200 once the weights are loaded.
+
+    python serve.py --workers 4 --port 5001
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+from process_memory import format_usage, memory_usage
+
+# Seconds after the workers start before the first memory report
+MEMORY_REPORT_DELAY = 5.0
+
+
+def parse_args(argv=None):
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Serve the FoulingGuard AI model API')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5001)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WORKERS', 1)),
+                        help='worker processes forked after the model is loaded')
+    parser.add_argument('--torch-threads', type=int, default=int(os.environ.get('TORCH_THREADS', 0)),
+                        help='intra-op threads per worker (default: cores / workers)')
+    parser.add_argument('--inference-concurrency', type=int,
+                        default=int(os.environ.get('INFERENCE_CONCURRENCY', 1)),
+                        help='forward passes allowed to run at once in each worker')
+    parser.add_argument('--model-path', default=os.environ.get('MODEL_PATH'),
+                        help='checkpoint to load (default: model/best_model.pt)')
+    parser.add_argument('--memory-report', type=float, default=float(os.environ.get('MEMORY_REPORT_SECONDS', 0)),
+                        help='seconds between per-worker memory reports (0 = once, shortly after start-up)')
+    args = parser.parse_args(argv)
+    args.workers = max(1, args.workers)
+    if args.torch_threads <= 0:
+        args.torch_threads = max(1, cpu_count // args.workers)
+    return args
+
+
+def load_service(args):
+    """Import the Flask app; the model itself is loaded by warm_up()"""
+    # The app reads these at import time
+    os.environ['INFERENCE_CONCURRENCY'] = str(args.inference_concurrency)
+    if args.model_path:
+        os.environ['MODEL_PATH'] = args.model_path
+
+    import app as service
+    return service
+
+
+def preload_model(service):
+    """Warm the model up in the parent so forked workers share its weights"""
+    import torch
+    # Keep the parent single-threaded so no OpenMP thread team exists when
+    # the workers are forked; each worker sets its own thread count
+    torch.set_num_threads(1)
+    service.warm_up()
+
+
+def run_worker(service, args, listen_fd=None, warm_in_background=False):
+    import threading
+    from werkzeug.serving import make_server
+
+    def configure_and_warm():
+        import torch
+        torch.set_num_threads(args.torch_threads)
+        service.warm_up()
+        # Job threads start here, after fork, so the preloading parent never runs any
+        service.resume_jobs()
+        print(f"🧠 Worker {os.getpid()}: {format_usage(memory_usage())}")
+
+    server = make_server(args.host, args.port, service.app, threaded=True, fd=listen_fd)
+    if warm_in_background:
+        # Listen first so liveness probes succeed while torch is still importing
+        threading.Thread(target=configure_and_warm, name='warm-up', daemon=True).start()
+    else:
+        configure_and_warm()
+    print(f"🤖 Worker {os.getpid()} serving on http://{args.host}:{args.port} "
+          f"({args.torch_threads} torch threads)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def report_memory(workers):
+    """Print resident vs shared memory for the parent and every worker"""
+    print(f"🧠 Parent {os.getpid()}: {format_usage(memory_usage())}")
+    usages = {pid: memory_usage(pid) for pid in sorted(workers)}
+    for pid, usage in usages.items():
+        print(f"🧠 Worker {pid}: {format_usage(usage)}")
+    known = [usage for usage in usages.values() if usage is not None and 'pss_mb' in usage]
+    if known:
+        print(f"🧠 {len(known)} workers: {round(sum(usage['rss_mb'] for usage in known), 1)} MB resident, "
+              f"{round(sum(usage['pss_mb'] for usage in known), 1)} MB proportional (shared pages counted once)")
+
+
+def spawn_worker(service, args, listen_fd):
+    pid = os.fork()
+    if pid == 0:
+        # Child: restore default signal handling and serve until told to stop
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        if hasattr(signal, 'setitimer'):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, signal.SIG_DFL)
+        try:
+            run_worker(service, args, listen_fd)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def run_prefork(service, args):
+    listener = socket.socket(socket.AF_INET6 if ':' in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((args.host, args.port))
+    listener.listen(128)
+    listener.set_inheritable(True)
+    listen_fd = listener.fileno()
+
+    workers = {spawn_worker(service, args, listen_fd) for _ in range(args.workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Reported from a SIGALRM handler on the main thread, so the parent never
+    # holds another thread's locks when it forks a replacement worker
+    if hasattr(signal, 'setitimer'):
+        def on_alarm(signum, frame):
+            try:
+                report_memory(workers)
+            except Exception as e:
+                # Never let a report take down the supervisor
+                print(f"⚠️ Memory report failed: {e}")
+
+        signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, MEMORY_REPORT_DELAY, max(0.0, args.memory_report))
+
+    # Supervise: replace workers that die unexpectedly
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited with status {status}, restarting")
+            time.sleep(1)
+            workers.add(spawn_worker(service, args, listen_fd))
+
+    listener.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("🚀 Starting FoulingGuard AI Model Service")
+    service = load_service(args)
+    print(f"👷 Workers: {args.workers}, torch threads per worker: {args.torch_threads}, "
+          f"inference concurrency: {args.inference_concurrency}")
+
+    if args.workers > 1 and hasattr(os, 'fork'):
+        preload_model(service)
+        print(f"🤖 Model: {'Loaded' if service.model is not None else 'Mock Mode'}")
+        run_prefork(service, args)
+    else:
+        if args.workers > 1:
+            print("⚠️ fork() is not available on this platform, running a single threaded worker")
+        run_worker(service, args, warm_in_background=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
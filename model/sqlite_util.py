@@ -0,0 +1,32 @@
+import os
+import sqlite3
+
+# SQLite connections must not cross a fork: a connection inherited from the
+# preloading parent shares its file locks and page cache state with every
+# worker. Stores that live across serve.py's fork open one per process.
+
+
+class PerProcessConnection:
+    """Callable returning this process's connection to ``path``, opened (and its schema created) on first use"""
+
+    def __init__(self, path, schema=(), timeout=5, wal=False):
+        self.path = path
+        self.schema = tuple(schema)
+        self.timeout = timeout
+        self.wal = wal
+        self._conn = None
+        self._pid = None
+
+    def __call__(self):
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.timeout)
+            if self.wal:
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            for statement in self.schema:
+                self._conn.execute(statement)
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
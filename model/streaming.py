@@ -0,0 +1,48 @@
+import json
+
+CRITICALITY_ORDER = {'Low': 0, 'Medium': 1, 'High': 2}
+
+
+class RunningAggregate:
+    """Batch-level summary updated as each per-image result arrives"""
+
+    def __init__(self, total):
+        self.total = total
+        self.count = 0
+        self.failed = 0
+        self._density_sum = 0.0
+        self.species_histogram = {}
+        self.worst_criticality = None
+
+    def add(self, result):
+        self.count += 1
+        if not result['success']:
+            self.failed += 1
+            return
+        analysis = result['analysis']
+        self._density_sum += float(analysis['density'])
+        species = analysis['species']
+        self.species_histogram[species] = self.species_histogram.get(species, 0) + 1
+        criticality = analysis['criticality']
+        if self.worst_criticality is None or \
+                CRITICALITY_ORDER.get(criticality, 0) > CRITICALITY_ORDER.get(self.worst_criticality, 0):
+            self.worst_criticality = criticality
+
+    def snapshot(self):
+        analysed = self.count - self.failed
+        return {
+            'completed': self.count,
+            'total': self.total,
+            'failed': self.failed,
+            'mean_density': round(self._density_sum / analysed, 2) if analysed else None,
+            'species_histogram': dict(sorted(self.species_histogram.items(), key=lambda item: -item[1])),
+            'worst_criticality': self.worst_criticality
+        }
+
+
+def ndjson_event(payload, event=None):
+    return json.dumps(payload) + '\n'
+
+
+def sse_event(payload, event='result'):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
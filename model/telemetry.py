@@ -0,0 +1,202 @@
+import atexit
+import bisect
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueListener
+
+# Prometheus-format metrics and leveled logging for the model service, with no
+# dependency beyond the standard library. Metrics live in process memory, so
+# with serve.py --workers N each worker reports its own requests.
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; the low buckets resolve base64 and Otsu, the high ones URL fetches and CPU forward passes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, '') for name in self.labelnames), 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = dict(self._values) or ({(): 0} if not self.labelnames else {})
+        for key, value in sorted(values.items()):
+            lines.append(f'{self.name}{_label_text(self.labelnames, key)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, rendered in the Prometheus text format"""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        series = self._series.get(tuple(labels.get(name, '') for name in self.labelnames))
+        return sum(series[:-1]) if series else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += bucket_count
+                labels = _label_text(self.labelnames + ('le',), key + (_number(float(bound)),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _label_text(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_number(series[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class BackgroundLogHandler(logging.Handler):
+    """Queue records and write them from a listener thread, so request threads never block on stderr.
+
+    The listener is started per process on the first record, because
+    serve.py forks its workers after the service module was imported.
+    """
+
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+        self._pid = None
+        self._queue = None
+        self._listener = None
+        self._exit_registered = False
+        self._start_lock = threading.Lock()
+        # Drain and stop the writer thread before fork(), so no child inherits a
+        # stream lock held mid-write; the next record restarts it in each process
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(before=self.flush_and_stop)
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.SimpleQueue()
+            self._listener = QueueListener(self._queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            if not self._exit_registered:
+                atexit.register(self.flush_and_stop)
+                self._exit_registered = True
+
+    def emit(self, record):
+        try:
+            self._ensure_listener()
+            # Format now, as QueueHandler does, so the listener never touches request objects
+            record.msg = self.format(record)
+            record.args = None
+            record.exc_info = None
+            record.exc_text = None
+            self._queue.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+    def flush_and_stop(self):
+        with self._start_lock:
+            if self._pid == os.getpid() and self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+                self._pid = None
+
+
+def configure_logging(name, level='INFO', background=True):
+    """Leveled logger for the service; per-request detail goes to DEBUG"""
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        return logger
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'))
+    if background:
+        handler = BackgroundLogHandler(stream)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+    else:
+        handler = stream
+    logger.addHandler(handler)
+    logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    logger.propagate = False
+    return logger
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script to check that the micro-batcher merges concurrent requests
+"""
+
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from batching import MicroBatcher
+
+def test_concurrent_submits_are_merged():
+    """Concurrent submits share batches and each caller gets its own result"""
+    batch_sizes = []
+
+    def run_batch(items):
+        batch_sizes.append(len(items))
+        time.sleep(0.01)
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=20)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(batcher.submit, range(32)))
+
+    print(f"📦 Batch sizes: {batch_sizes}")
+    assert results == [item * 2 for item in range(32)]
+    assert max(batch_sizes) <= 8
+    assert len(batch_sizes) < 32
+
+    stats = batcher.stats()
+    assert stats['items'] == 32
+    assert sum(stats['batch_size_histogram'].values()) == stats['batches']
+
+def test_batch_errors_reach_every_caller():
+    """A failing batch raises in every waiting caller instead of hanging them"""
+    def run_batch(items):
+        raise RuntimeError("forward pass failed")
+
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=1)
+    try:
+        batcher.submit(1, timeout=5)
+        assert False, "expected the batch error to propagate"
+    except RuntimeError as e:
+        assert 'forward pass failed' in str(e)
+    assert batcher.stats()['errors'] == 1
+
+if __name__ == "__main__":
+    test_concurrent_submits_are_merged()
+    test_batch_errors_reach_every_caller()
+    print("✅ Micro-batching tests passed!")
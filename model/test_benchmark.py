@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the service benchmark helpers
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import torch
+import app as service
+from benchmark import compare, forward_benchmarks, predict_benchmarks, stage_benchmarks, summarize
+from fast_preprocess import synthetic_jpegs
+from result_cache import ResultCache
+
+class StubModel(torch.nn.Module):
+    """Species logits and a coverage logit from the mean pixel, so timings stay tiny"""
+
+    def __init__(self, num_classes=10):
+        super().__init__()
+        self.head = torch.nn.Linear(3, num_classes + 1)
+
+    def forward(self, x):
+        output = self.head(x.mean(dim=(2, 3)))
+        return output[:, :-1], output[:, -1:]
+
+def test_stage_benchmarks():
+    """Every hot-path stage is timed for an image"""
+    stages = stage_benchmarks(synthetic_jpegs(1, 320, 240)[0], repeat=2)
+    for stage in ('base64_decode', 'pil_decode', 'transform', 'fused_preprocess', 'otsu_density', 'json_serialization'):
+        assert stages[stage]['runs'] == 2
+        assert stages[stage]['mean_ms'] >= 0
+
+def test_forward_benchmarks():
+    """Each batch size gets latency and throughput"""
+    results = forward_benchmarks(StubModel().eval(), [1, 4], repeat=2)
+    assert list(results) == ['batch_1', 'batch_4']
+    assert all(stats['runs'] == 2 and stats['images_per_second'] > 0 for stats in results.values())
+
+def test_predict_benchmarks():
+    """Concurrent /predict runs through the Flask test client all succeed"""
+    service.warm_up()
+    loaded_model, service.model = service.model, StubModel().eval()
+    cache, service.result_cache = service.result_cache, ResultCache(max_entries=0)
+    errors, mock = service.MODEL_ERRORS.value(), service.MOCK_PREDICTIONS.value()
+    try:
+        results = predict_benchmarks(service, synthetic_jpegs(2, 320, 240), [1, 2], requests_per_level=4)
+        # Served by the stub rather than the mock or the fallback after a failed forward pass
+        assert (service.MODEL_ERRORS.value(), service.MOCK_PREDICTIONS.value()) == (errors, mock)
+    finally:
+        service.model = loaded_model
+        service.result_cache = cache
+    assert list(results) == ['concurrency_1', 'concurrency_2']
+    for stats in results.values():
+        assert stats['runs'] == 4 and stats['errors'] == 0 and stats['requests_per_second'] > 0
+
+def test_summarize():
+    stats = summarize([0.001, 0.002, 0.003, 0.004])
+    assert stats['runs'] == 4
+    assert stats['min_ms'] == 1.0
+    assert stats['mean_ms'] == 2.5
+
+def test_compare_flags_slow_stages():
+    previous = {'stages': {'640x480': {'pil_decode': {'mean_ms': 10.0}, 'transform': {'mean_ms': 5.0}}}}
+    current = {'stages': {'640x480': {'pil_decode': {'mean_ms': 13.0}, 'transform': {'mean_ms': 5.2}},
+                          '4000x3000': {'pil_decode': {'mean_ms': 90.0}}}}
+    regressions = compare(current, previous, threshold=0.15)
+    assert [regression['stage'] for regression in regressions] == ['stages.640x480.pil_decode']
+    assert regressions[0]['change'] == 0.3
+
+if __name__ == "__main__":
+    test_stage_benchmarks()
+    print("✅ Stage benchmark test passed!")
+    test_forward_benchmarks()
+    print("✅ Forward benchmark test passed!")
+    test_predict_benchmarks()
+    print("✅ /predict benchmark test passed!")
+    test_summarize()
+    print("✅ Summary test passed!")
+    test_compare_flags_slow_stages()
+    print("✅ Regression comparison test passed!")
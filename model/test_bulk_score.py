@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline bulk scorer and its resume checkpoint
+"""
+
+import sys
+import os
+import csv
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import torch
+from PIL import Image
+from model_architecture import BiofoulingModel
+import app as service
+import bulk_score
+
+def write_images(directory, count, start=0):
+    rng = np.random.default_rng(start)
+    for index in range(start, start + count):
+        rgb = (rng.random((120, 160, 3)) * 255).astype(np.uint8)
+        Image.fromarray(rgb).save(os.path.join(directory, f'hull_{index:03d}.jpg'), quality=90)
+
+def test_scores_directory_and_resumes():
+    """Every image gets a row, unreadable files are recorded, and a rerun only scores new files"""
+    service.warm_up()
+    torch.manual_seed(0)
+    loaded_model, service.model = service.model, BiofoulingModel(num_classes=10).eval()
+
+    try:
+        score_survey()
+    finally:
+        service.model = loaded_model
+
+def score_survey():
+    with tempfile.TemporaryDirectory() as directory:
+        images = os.path.join(directory, 'survey')
+        os.makedirs(images)
+        write_images(images, 5)
+        with open(os.path.join(images, 'broken.jpg'), 'w') as f:
+            f.write('not a jpeg')
+
+        output = os.path.join(directory, 'scores.csv')
+        assert bulk_score.main([images, '--output', output, '--workers', '0', '--batch-size', '4']) == 0
+        with open(output, newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 6
+        assert sum(row['success'] == 'False' for row in rows) == 1
+        scored = [row for row in rows if row['success'] == 'True']
+        assert all(row['species'] in service.SPECIES_MAP.values() for row in scored)
+        assert all(0 <= float(row['density']) <= 100 for row in scored)
+
+        write_images(images, 2, start=5)
+        output_jsonl = os.path.join(directory, 'scores.jsonl')
+        os.rename(output + '.progress.jsonl', output_jsonl + '.progress.jsonl')
+        assert bulk_score.main([images, '--output', output_jsonl, '--workers', '0']) == 0
+        with open(output_jsonl + '.progress.jsonl') as f:
+            progress = [json.loads(line) for line in f]
+        # The 6 files from the first run are not scored a second time
+        assert len(progress) == 8
+        with open(output_jsonl) as f:
+            assert len(f.readlines()) == 8
+
+if __name__ == "__main__":
+    test_scores_directory_and_resumes()
+    print("✅ Bulk scoring tests passed!")
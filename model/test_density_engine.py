@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script comparing the histogram density engine with the original cv2 Otsu code
+"""
+
+import sys
+import os
+import io
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+import numpy as np
+from PIL import Image
+from density import calculate_density, decode_grayscale, otsu_threshold, gray_histogram
+
+def hull_jpeg(width, height, seed):
+    """Synthetic hull photo: smooth shading, bright growth patches and sensor noise"""
+    rng = np.random.default_rng(seed)
+    shading = Image.fromarray((rng.random((height // 64, width // 64)) * 255).astype(np.uint8))
+    shading = np.asarray(shading.resize((width, height), Image.BICUBIC), dtype=np.float32)
+    patches = Image.fromarray(((rng.random((height // 8, width // 8)) > 0.8) * 90).astype(np.uint8))
+    patches = np.asarray(patches.resize((width, height), Image.NEAREST), dtype=np.float32)
+    gray = shading * 0.6 + patches + rng.normal(0, 18, (height, width)) + 20
+    rgb = np.stack([gray * 0.8, gray, gray * 0.9 + 10], axis=-1).clip(0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(rgb).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+def original_density(image_bytes):
+    """The cv2 pipeline calculate_fouling_density used before the density engine"""
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return round(mask.sum() / (mask.size * 255) * 100, 2)
+
+def test_threshold_matches_opencv():
+    """Histogram Otsu picks the same threshold as cv2.THRESH_OTSU"""
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        gray = np.clip(rng.normal(rng.uniform(30, 200), rng.uniform(2, 60), (64, 64)), 0, 255).astype(np.uint8)
+        expected, _ = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        assert otsu_threshold(gray_histogram(gray)) == int(expected)
+    assert otsu_threshold(gray_histogram(np.zeros((4, 4), np.uint8))) == 0
+
+def test_full_resolution_matches_original():
+    """Without a cap the engine stays within 1 density point of the original.
+    
+    PIL and OpenCV ship different JPEG decoders, and the luma plane rounds
+    differently from an RGB->GRAY conversion, so the Otsu threshold can move
+    by one gray level; on identical pixels the results are exact.
+    """
+    for seed in range(3):
+        image_bytes = hull_jpeg(1600, 1200, seed)
+        result = calculate_density(decode_grayscale(image_bytes))
+        assert abs(result['density_percentage'] - original_density(image_bytes)) < 1.0
+        assert result['total_pixels'] == 1600 * 1200
+
+    gray = np.asarray(Image.open(io.BytesIO(hull_jpeg(800, 600, 0))).convert('L'))
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    result = calculate_density(gray)
+    assert result['fouling_pixels'] == int(mask.sum() / 255)
+
+def test_capped_resolution_error_bound():
+    """A reduced working resolution stays within 2 density points of the original"""
+    for seed in range(3):
+        image_bytes = hull_jpeg(1600, 1200, seed)
+        reference = original_density(image_bytes)
+        for max_pixels in (500_000, 120_000):
+            result = calculate_density(decode_grayscale(image_bytes, max_pixels))
+            error = abs(result['density_percentage'] - reference)
+            print(f"📊 seed {seed}, cap {max_pixels}: {result['density_percentage']}% vs {reference}% (error {error:.2f})")
+            assert result['total_pixels'] <= max_pixels
+            assert error < 2.0
+
+if __name__ == "__main__":
+    test_threshold_matches_opencv()
+    test_full_resolution_matches_original()
+    test_capped_resolution_error_bound()
+    print("✅ Density engine tests passed!")
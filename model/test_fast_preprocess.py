@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script comparing fused preprocessing with the torchvision transform chain
+"""
+
+import sys
+import os
+import io
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+from model_architecture import BiofoulingModel
+from fast_preprocess import FastPreprocessor, decode_rgb, synthetic_jpegs
+
+transform = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+])
+
+def reference_batch(images):
+    return torch.stack([transform(Image.open(io.BytesIO(image_bytes)).convert('RGB')) for image_bytes in images])
+
+def test_full_resolution_is_identical():
+    """Without a density cap the fused path reproduces the transform exactly"""
+    images = synthetic_jpegs(4, 640, 480)
+    with FastPreprocessor(capacity=len(images)).checkout([decode_rgb(image_bytes) for image_bytes in images]) as inputs:
+        fused = inputs.tensor.clone()
+    assert torch.equal(fused, reference_batch(images))
+
+def test_draft_decode_model_outputs_within_tolerance():
+    """Reduced-scale JPEG decoding changes the model outputs only within tolerance"""
+    images = synthetic_jpegs(4, 1600, 1200)
+    with FastPreprocessor(capacity=len(images)).checkout([decode_rgb(image_bytes, 500_000) for image_bytes in images]) as inputs:
+        fused = inputs.tensor.clone()
+    reference = reference_batch(images)
+    torch.manual_seed(0)
+    model = BiofoulingModel(num_classes=10).eval()
+    with torch.no_grad():
+        fused_logits, fused_coverage = model(fused)
+        reference_logits, reference_coverage = model(reference)
+    print(f"🔍 Max input diff {float((fused - reference).abs().max()):.3f}, "
+          f"logit diff {float((fused_logits - reference_logits).abs().max()):.2e}")
+    assert float((fused - reference).abs().mean()) < 0.05
+    assert torch.allclose(torch.softmax(fused_logits, 1), torch.softmax(reference_logits, 1), atol=1e-3)
+    assert torch.allclose(fused_coverage, reference_coverage, rtol=1e-2)
+
+def test_buffers_are_shared_across_threads():
+    """Buffers are allocated once and reused by whichever thread checks one out next"""
+    preprocessor = FastPreprocessor(buffers=2, capacity=4)
+    images = [decode_rgb(image_bytes) for image_bytes in synthetic_jpegs(5, 320, 240)]
+    pointers = []
+
+    def request(count):
+        with preprocessor.checkout(images[:count]) as inputs:
+            assert inputs.tensor.shape == (count, 3, 224, 224)
+            pointers.append(inputs.tensor.data_ptr())
+
+    for count in (1, 2, 3):
+        thread = threading.Thread(target=request, args=(count,))
+        thread.start()
+        thread.join()
+    assert len(set(pointers)) == 1 and preprocessor._allocated == 1
+
+    first = preprocessor.checkout(images[:1])
+    second = preprocessor.checkout(images[:1])
+    assert first.tensor.data_ptr() != second.tensor.data_ptr() and preprocessor._allocated == 2
+    try:
+        preprocessor.checkout(images[:1], timeout=0.05)
+        assert False, "a third checkout should wait for a free buffer"
+    except TimeoutError:
+        pass
+    first_pointer = first.tensor.data_ptr()
+    first.release()
+    first.release()
+    with preprocessor.checkout(images[:1]) as third:
+        assert third.tensor.data_ptr() == first_pointer
+    second.release()
+
+    # Oversized batches get a one-off buffer that never joins the set
+    with preprocessor.checkout(images) as oversized:
+        assert oversized.tensor.shape == (5, 3, 224, 224)
+    assert preprocessor._free.qsize() == 2
+
+def test_requests_on_new_threads_reuse_buffers():
+    """Each /predict runs on a fresh thread, as under threaded werkzeug, yet one buffer serves them all"""
+    import app as service
+    from result_cache import ResultCache
+
+    service.warm_up()
+    torch.manual_seed(0)
+    loaded_model, service.model = service.model, BiofoulingModel(num_classes=10).eval()
+    cache, service.result_cache = service.result_cache, ResultCache(max_entries=0)
+    preprocessor = service.fast_preprocessor
+    service.fast_preprocessor = FastPreprocessor(buffers=2, capacity=service.PREDICT_BATCH_SIZE)
+    statuses = []
+
+    def request(image_bytes):
+        response = service.app.test_client().post('/predict', data=image_bytes, content_type='image/jpeg')
+        statuses.append(response.status_code)
+
+    try:
+        for image_bytes in synthetic_jpegs(5, 320, 240):
+            thread = threading.Thread(target=request, args=(image_bytes,))
+            thread.start()
+            thread.join()
+        assert statuses == [200] * 5
+        assert service.fast_preprocessor._allocated == 1
+        assert service.fast_preprocessor._free.qsize() == 1
+    finally:
+        service.fast_preprocessor = preprocessor
+        service.result_cache = cache
+        service.model = loaded_model
+
+if __name__ == "__main__":
+    test_full_resolution_is_identical()
+    test_draft_decode_model_outputs_within_tolerance()
+    test_buffers_are_shared_across_threads()
+    test_requests_on_new_threads_reuse_buffers()
+    print("✅ Fast preprocessing tests passed!")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test script for the /health/live and /health/ready probes
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as service
+
+def test_probes_around_warm_up():
+    """/health/ready is 503 until warm_up() has run and 200 after; /health/live never loads the model"""
+    loads = []
+    load_model = service._load_model
+
+    def counting_load_model():
+        loads.append(1)
+        load_model()
+
+    service._load_model = counting_load_model
+    status = service._service_state['status']
+    service._service_state['status'] = 'starting'
+    try:
+        client = service.app.test_client()
+        response = client.get('/health/ready')
+        assert response.status_code == 503
+        assert response.get_json()['ready'] is False and response.get_json()['status'] == 'starting'
+
+        for _ in range(3):
+            response = client.get('/health/live')
+            assert response.status_code == 200 and response.get_json() == {'status': 'alive'}
+        assert loads == [] and service._service_state['status'] == 'starting'
+
+        service.warm_up()
+        assert loads == [1]
+        response = client.get('/health/ready')
+        assert response.status_code == 200
+        assert response.get_json()['ready'] is True
+        assert 'warm_up_seconds' in response.get_json()['startup']
+    finally:
+        service._load_model = load_model
+        if service._service_state['status'] == 'starting':
+            service._service_state['status'] = status
+
+if __name__ == "__main__":
+    test_probes_around_warm_up()
+    print("✅ Health probe tests passed!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled image fetcher against a local HTTP stand-in server
+"""
+
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from image_fetch import ImageFetcher
+
+IMAGE_BYTES = b'\xff\xd8\xff\xe0' + b'\x00' * 4096
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves fake images and records how many requests arrive and overlap"""
+    requests_seen = 0
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests_seen += 1
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            time.sleep(0.05)
+            if self.path.startswith('/page'):
+                body, content_type = b'<html></html>', 'text/html'
+            elif self.path.startswith('/huge'):
+                body, content_type = b'\x00' * (256 * 1024), 'image/jpeg'
+            else:
+                body, content_type = IMAGE_BYTES, 'image/jpeg'
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server():
+    StandInHandler.requests_seen = 0
+    StandInHandler.max_active = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def test_same_url_is_downloaded_once():
+    """Repeated and concurrent fetches of one URL share a single download"""
+    server, base_url = start_server()
+    try:
+        fetcher = ImageFetcher(cache_ttl=30)
+        results = fetcher.fetch_many([f"{base_url}/hull.jpg"] * 4)
+        assert all(result == IMAGE_BYTES for result in results)
+        assert fetcher.fetch(f"{base_url}/hull.jpg") == IMAGE_BYTES
+        assert StandInHandler.requests_seen == 1
+    finally:
+        server.shutdown()
+
+def test_concurrent_fetch_respects_per_host_limit():
+    """Distinct URLs download in parallel but never above the per-host limit"""
+    server, base_url = start_server()
+    try:
+        fetcher = ImageFetcher(per_host_limit=2, max_workers=8)
+        urls = [f"{base_url}/frame-{i}.jpg" for i in range(8)]
+        results = fetcher.fetch_many(urls)
+        print(f"📡 Requests: {StandInHandler.requests_seen}, max concurrent: {StandInHandler.max_active}")
+        assert all(result == IMAGE_BYTES for result in results)
+        assert StandInHandler.requests_seen == 8
+        assert StandInHandler.max_active == 2
+    finally:
+        server.shutdown()
+
+def test_rejects_non_images_and_oversized_bodies():
+    """HTML pages and bodies over the size cap come back as errors"""
+    server, base_url = start_server()
+    try:
+        fetcher = ImageFetcher(max_bytes=64 * 1024)
+        page, huge = fetcher.fetch_many([f"{base_url}/page", f"{base_url}/huge.jpg"])
+        assert isinstance(page, ValueError) and 'not an image' in str(page)
+        assert isinstance(huge, ValueError) and 'larger than' in str(huge)
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_same_url_is_downloaded_once()
+    test_concurrent_fetch_respects_per_host_limit()
+    test_rejects_non_images_and_oversized_bodies()
+    print("✅ Image fetch tests passed!")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for the asynchronous job store, worker pool and /jobs endpoints
+"""
+
+import sys
+import os
+import json
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from image_fixtures import encoded_jpeg
+from jobs import JobStore, JobRunner, JobQueueFull
+
+def fake_chunk(items):
+    return [{'index': index, 'success': image != 'bad', 'analysis': {'image': image}} for index, image in items]
+
+def wait_for(store, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while store.get(job_id)['status'] not in ('completed', 'failed'):
+        assert time.time() < deadline, "job did not finish"
+        time.sleep(0.02)
+    return store.get(job_id)
+
+def test_runner_completes_jobs_in_chunks():
+    """Jobs are scored chunk by chunk and results come back in index order"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = JobStore(os.path.join(directory, 'jobs.db'))
+        runner = JobRunner(store, fake_chunk, workers=2, chunk_size=3)
+        job_id = runner.submit(['a', 'b', 'bad', 'c', 'd'])
+        job = wait_for(store, job_id)
+        assert job['status'] == 'completed'
+        assert (job['total'], job['completed'], job['failed'], job['progress']) == (5, 5, 1, 1.0)
+        assert [result['index'] for result in store.results_after(job_id)] == [0, 1, 2, 3, 4]
+        assert [result['index'] for result in store.results_after(job_id, 2)] == [3, 4]
+
+def test_backpressure():
+    """Submissions beyond the pending image limit are refused"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = JobStore(os.path.join(directory, 'jobs.db'))
+        runner = JobRunner(store, fake_chunk, max_pending_images=4)
+        runner.start()
+        # Jobs created behind the runner's back stay queued and count as pending
+        store.create(['a', 'b', 'c'])
+        try:
+            runner.submit(['d', 'e'])
+            assert False, "submit should have been refused"
+        except JobQueueFull as e:
+            print(f"✅ Refused: {e}")
+
+def test_unfinished_jobs_resume_after_restart():
+    """A job left running by a dead process is picked up and only its missing images are scored"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'jobs.db')
+        store = JobStore(path)
+        job_id = store.create(['a', 'b', 'c', 'd'])
+        dead_pid = 2 ** 22 + 12345
+        assert store.claim(job_id, dead_pid)
+        store.record_results(job_id, fake_chunk([(0, 'a'), (1, 'b')]))
+
+        scored = []
+        def counting_chunk(items):
+            scored.extend(index for index, _ in items)
+            return fake_chunk(items)
+
+        restarted = JobStore(path)
+        JobRunner(restarted, counting_chunk).start()
+        job = wait_for(restarted, job_id)
+        assert job['status'] == 'completed' and job['completed'] == 4
+        assert scored == [2, 3]
+
+def test_jobs_endpoints():
+    """POST /jobs queues work, GET /jobs/<id> reports it and /results streams NDJSON"""
+    import app as service
+    image = encoded_jpeg()
+    store_path, runner = service.JOB_STORE_PATH, service.job_runner
+
+    with tempfile.TemporaryDirectory() as directory:
+        service.JOB_STORE_PATH = os.path.join(directory, 'jobs.db')
+        service.job_runner = JobRunner(JobStore(service.JOB_STORE_PATH), service.analyze_chunk, chunk_size=2)
+        client = service.app.test_client()
+        try:
+            response = client.post('/jobs', json={'images': [image, 'not-an-image', image]})
+            assert response.status_code == 202
+            job_id = response.get_json()['job']['id']
+
+            lines = [json.loads(line) for line in client.get(f'/jobs/{job_id}/results').get_data(as_text=True).splitlines()]
+            assert [line['index'] for line in lines[:-1]] == [0, 1, 2]
+            assert [line['success'] for line in lines[:-1]] == [True, False, True]
+            assert lines[-1]['job']['status'] == 'completed'
+
+            status = client.get(f'/jobs/{job_id}').get_json()['job']
+            assert (status['completed'], status['failed']) == (3, 1)
+            assert client.get('/jobs/missing').status_code == 404
+            assert client.post('/jobs', json={'images': []}).status_code == 400
+        finally:
+            service.JOB_STORE_PATH, service.job_runner = store_path, runner
+
+if __name__ == "__main__":
+    test_runner_completes_jobs_in_chunks()
+    test_backpressure()
+    test_unfinished_jobs_resume_after_restart()
+    test_jobs_endpoints()
+    print("✅ Job tests passed!")
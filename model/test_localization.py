@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for sliding-window species localization
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import torch
+from model_architecture import BiofoulingModel
+from localization import (plan_windows, window_boxes, shared_feature_plan, shared_feature_windows,
+                          shared_feature_boxes, summarize_regions, supports_shared_features)
+
+def build_model():
+    torch.manual_seed(0)
+    return BiofoulingModel(num_classes=10).eval()
+
+def test_window_plan_respects_crop_cap():
+    """Windows cover the image edge to edge and never exceed the crop cap"""
+    for width, height, cap in ((4000, 3000, 256), (4000, 3000, 16), (640, 480, 4), (300, 300, 1)):
+        window, stride = plan_windows(width, height, overlap=0.75, max_crops=cap)
+        boxes, (rows, cols) = window_boxes(width, height, window, stride)
+        assert len(boxes) == rows * cols <= cap
+        assert max(box[2] for box in boxes) == width and max(box[3] for box in boxes) == height
+        assert all(box[2] - box[0] == window for box in boxes)
+
+        scaled, stride_cells = shared_feature_plan(width, height, window, stride, max_crops=cap)
+        assert max(scaled) <= 2048 or min(width, height) * 224 / max(width, height) < 224
+
+def test_single_crop_on_wide_image():
+    """max_crops=1 on a 2:1 image gives exactly one window in both modes"""
+    width, height = 800, 400
+    window, stride = plan_windows(width, height, max_crops=1)
+    boxes, grid = window_boxes(width, height, window, stride)
+    assert grid == (1, 1) and boxes == [(0, 0, 400, 400)]
+    scaled, stride_cells = shared_feature_plan(width, height, window, stride, max_crops=1)
+    with torch.no_grad():
+        _, _, shared_grid = shared_feature_windows(build_model(), torch.randn(1, 3, scaled[1], scaled[0]), stride_cells)
+    assert shared_grid == (1, 1)
+
+def test_shared_features_match_single_window():
+    """With one window covering the whole input, pooled features equal the plain forward pass"""
+    model = build_model()
+    assert supports_shared_features(model)
+    image = torch.randn(1, 3, 224, 224)
+    with torch.no_grad():
+        species_logits, coverage = model(image)
+        shared_logits, shared_coverage, grid = shared_feature_windows(model, image, stride_cells=1)
+    assert grid == (1, 1)
+    assert torch.allclose(species_logits, shared_logits, atol=1e-4)
+    assert torch.allclose(coverage, shared_coverage, atol=1e-4)
+
+def test_shared_feature_grid():
+    """One trunk pass scores every window, and boxes map back to source pixels"""
+    model = build_model()
+    width, height = 1200, 900
+    window, stride = plan_windows(width, height, window=450, overlap=0.5, max_crops=64)
+    scaled, stride_cells = shared_feature_plan(width, height, window, stride, max_crops=64)
+    with torch.no_grad():
+        species_logits, coverage, grid = shared_feature_windows(model, torch.randn(1, 3, scaled[1], scaled[0]), stride_cells)
+    boxes = shared_feature_boxes(width, height, scaled, stride_cells, grid)
+    assert species_logits.shape == (grid[0] * grid[1], 10)
+    assert len(boxes) == grid[0] * grid[1] <= 64
+    assert all(0 <= box[0] < box[2] <= width and 0 <= box[1] < box[3] <= height for box in boxes)
+
+def test_summary_proportions():
+    """Species proportions count each region's top species"""
+    probs = np.array([[0.9, 0.1], [0.2, 0.8], [0.7, 0.3], [0.6, 0.4]])
+    boxes, grid = window_boxes(20, 20, 10, 10)
+    summary = summarize_regions(probs, np.zeros(4), boxes, grid, {0: 'Ulva Lactuca', 1: 'Perna Viridis'})
+    assert summary['species_proportions'] == {'Ulva Lactuca': 0.75, 'Perna Viridis': 0.25}
+    assert summary['dominant_species'] == 'Ulva Lactuca'
+    assert summary['regions'][0][1]['species'] == 'Perna Viridis'
+    assert summary['mean_coverage'] == 50.0
+
+if __name__ == "__main__":
+    test_window_plan_respects_crop_cap()
+    test_single_crop_on_wide_image()
+    test_shared_features_match_single_window()
+    test_shared_feature_grid()
+    test_summary_proportions()
+    print("✅ Localization tests passed!")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script to check exported inference artifacts against the eager model
+"""
+
+import sys
+import os
+import importlib.util
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import torch
+from model_architecture import BiofoulingModel
+from backends import check_parity, load_inference_model
+from export_model import export_onnx, export_torchscript
+
+def build_model():
+    torch.manual_seed(0)
+    return BiofoulingModel(num_classes=10).eval()
+
+def test_torchscript_export_matches_eager():
+    """The traced artifact reproduces both heads and loads through the torchscript backend"""
+    device = torch.device('cpu')
+    model = build_model()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'model.torchscript.pt')
+        export_torchscript(model, path, device)
+
+        loaded = load_inference_model('torchscript', path, device)
+        parity = check_parity(model, loaded, device, batch_size=3)
+        print(f"🔍 TorchScript parity: {parity['max_abs_diff']}")
+        assert parity['passed']
+
+        # Traced with batch 2, the artifact must still accept other batch sizes
+        species_logits, coverage = loaded(torch.randn(5, 3, 224, 224))
+        assert species_logits.shape == (5, 10)
+        assert coverage.shape == (5, 1)
+
+def test_onnx_export_matches_eager():
+    """The ONNX artifact reproduces both heads through ONNX Runtime with a dynamic batch axis"""
+    if not all(importlib.util.find_spec(name) for name in ('onnx', 'onnxruntime')):
+        print("⚠️ onnx/onnxruntime not installed - skipping ONNX parity test")
+        return
+
+    device = torch.device('cpu')
+    model = build_model()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'model.onnx')
+        export_onnx(model, path, device)
+
+        loaded = load_inference_model('onnxruntime', path, device)
+        for batch_size in (1, 4):
+            parity = check_parity(model, loaded, device, batch_size=batch_size)
+            print(f"🔍 ONNX Runtime parity (batch {batch_size}): {parity['max_abs_diff']}")
+            assert parity['passed']
+            assert parity['max_abs_diff']['species_logits'] < 1e-3
+            assert parity['max_abs_diff']['coverage'] < 1e-3
+
+if __name__ == "__main__":
+    test_torchscript_export_matches_eager()
+    test_onnx_export_matches_eager()
+    print("✅ Model export tests passed!")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for /predict-batch: per-image failures, chunked forward passes and the image cap
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import torch
+import app as service
+from image_fixtures import encoded_jpeg
+from model_architecture import BiofoulingModel
+
+class RecordingModel:
+    """Wraps a model and records the batch size of every forward pass"""
+
+    def __init__(self, model):
+        self.model = model
+        self.batch_sizes = []
+
+    def __call__(self, batch):
+        self.batch_sizes.append(batch.shape[0])
+        return self.model(batch)
+
+def test_bad_image_fails_alone():
+    """One unreadable image fails at its own index while the others are analysed"""
+    service.warm_up()
+    client = service.app.test_client()
+    response = client.post('/predict-batch', json={'images': [encoded_jpeg(0), 'not-an-image', encoded_jpeg(1)]})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert (data['count'], data['failed']) == (3, 1)
+    assert [result['index'] for result in data['results']] == [0, 1, 2]
+    assert [result['success'] for result in data['results']] == [True, False, True]
+    assert data['results'][1]['error'] == 'Invalid image data'
+    assert 'species' in data['results'][0]['analysis']
+
+def test_images_are_chunked_by_batch_size():
+    """Five images with PREDICT_BATCH_SIZE=2 run as forward passes of 2, 2 and 1"""
+    service.warm_up()
+    torch.manual_seed(0)
+    recording = RecordingModel(BiofoulingModel(num_classes=10).eval())
+    loaded_model, batch_size = service.model, service.PREDICT_BATCH_SIZE
+    service.model, service.PREDICT_BATCH_SIZE = recording, 2
+    try:
+        client = service.app.test_client()
+        response = client.post('/predict-batch', json={'images': [encoded_jpeg(seed) for seed in range(5)]})
+        data = response.get_json()
+        assert response.status_code == 200 and data['failed'] == 0
+        assert [result['index'] for result in data['results']] == [0, 1, 2, 3, 4]
+        assert all(result['analysis']['confidence'] > 0 for result in data['results'])
+        assert recording.batch_sizes == [2, 2, 1]
+    finally:
+        service.model, service.PREDICT_BATCH_SIZE = loaded_model, batch_size
+
+def test_item_cap():
+    """More than MAX_BATCH_IMAGES images get 413, and an empty list 400"""
+    client = service.app.test_client()
+    limit, service.MAX_BATCH_IMAGES = service.MAX_BATCH_IMAGES, 3
+    try:
+        assert client.post('/predict-batch', json={'images': [encoded_jpeg()] * 4}).status_code == 413
+        assert client.post('/predict-batch', json={'images': [encoded_jpeg()] * 3}).status_code == 200
+    finally:
+        service.MAX_BATCH_IMAGES = limit
+    assert client.post('/predict-batch', json={'images': []}).status_code == 400
+
+if __name__ == "__main__":
+    test_bad_image_fails_alone()
+    test_images_are_chunked_by_batch_size()
+    test_item_cap()
+    print("✅ Batch prediction tests passed!")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared-memory preprocessing pool
+"""
+
+import sys
+import os
+import io
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+from image_fixtures import jpeg_bytes
+from density import calculate_density, to_grayscale
+from preprocess_pool import PreprocessPool, preprocess_into
+
+transform = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+])
+
+def reference(image_bytes):
+    image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+    return transform(image), calculate_density(to_grayscale(image))
+
+def test_preprocess_matches_transform():
+    """The numpy pipeline reproduces Resize -> ToTensor -> Normalize"""
+    out = np.empty((3, 224, 224), dtype=np.float32)
+    image_bytes = jpeg_bytes(0, (480, 360))
+    size, density_result = preprocess_into(image_bytes, out)
+    expected_tensor, expected_density = reference(image_bytes)
+    assert size == (480, 360)
+    assert torch.allclose(torch.from_numpy(out), expected_tensor, atol=1e-5)
+    assert density_result['density_percentage'] == expected_density['density_percentage']
+
+def check_pool(mode):
+    pool = PreprocessPool(workers=2, mode=mode, slots=4)
+    try:
+        images = [jpeg_bytes(seed, (480, 360)) for seed in range(3)] + [b'not an image' * 100]
+        items = pool.preprocess_many(images)
+        assert items[3] is None
+        for image_bytes, item in zip(images, items[:3]):
+            expected_tensor, expected_density = reference(image_bytes)
+            assert item.tensor.shape == (1, 3, 224, 224)
+            assert torch.allclose(item.tensor[0], expected_tensor, atol=1e-5)
+            assert item.density_result['density_percentage'] == expected_density['density_percentage']
+        assert pool.stats()['free_slots'] == 1
+        for item in items[:3]:
+            item.release()
+        assert pool.stats()['free_slots'] == 4
+
+        try:
+            pool.preprocess_many(images + images)
+            assert False, "more images than slots should be refused"
+        except ValueError:
+            pass
+    finally:
+        pool.close()
+
+def test_failed_submit_frees_every_slot():
+    """A submit that raises midway hands back the failed, unsubmitted and already-submitted slots"""
+    pool = PreprocessPool(workers=2, mode='thread', slots=4)
+    submit = pool._submit
+    calls = []
+
+    def failing_submit(image_bytes, slot):
+        calls.append(slot)
+        if len(calls) == 2:
+            pool.release(slot)
+            raise RuntimeError("executor shut down")
+        return submit(image_bytes, slot)
+
+    try:
+        pool._submit = failing_submit
+        try:
+            pool.preprocess_many([jpeg_bytes(seed, (480, 360)) for seed in range(3)])
+            assert False, "the submit failure should propagate"
+        except RuntimeError:
+            pass
+        assert len(calls) == 2
+        assert pool.stats()['free_slots'] == 4
+        pool._submit = submit
+        assert all(item is not None for item in pool.preprocess_many([jpeg_bytes(seed) for seed in range(4)]))
+    finally:
+        pool.close()
+
+def test_thread_pool():
+    """Thread workers fill the in-process slot buffer"""
+    check_pool('thread')
+
+def test_process_pool_shared_memory():
+    """Process workers write tensors into shared memory the parent reads without copying"""
+    check_pool('process')
+
+if __name__ == "__main__":
+    test_preprocess_matches_transform()
+    test_failed_submit_frees_every_slot()
+    test_thread_pool()
+    test_process_pool_shared_memory()
+    print("✅ Preprocessing pool tests passed!")
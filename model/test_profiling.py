@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script for opt-in request profiling
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as service
+import profiling
+from image_fixtures import jpeg_bytes
+from model_architecture import BiofoulingModel
+from result_cache import ResultCache
+
+def test_admin_requires_token():
+    client = service.app.test_client()
+    token, service.PROFILE_TOKEN = service.PROFILE_TOKEN, None
+    try:
+        assert client.post('/admin/profile', json={'requests': 1}).status_code == 404
+        service.PROFILE_TOKEN = 'secret'
+        assert client.post('/admin/profile', json={'requests': 1}).status_code == 403
+        assert client.post('/admin/profile', json={'requests': 1}, headers={'X-Profile-Token': 'wrong'}).status_code == 403
+    finally:
+        service.PROFILE_TOKEN = token
+
+def test_armed_and_header_profiles():
+    """Armed requests get cProfile and torch captures; a header forces a sampled profile"""
+    cache, service.result_cache = service.result_cache, ResultCache(max_entries=0)
+    service.warm_up()
+    loaded_model, service.model = service.model, BiofoulingModel(num_classes=10).eval()
+    token, service.PROFILE_TOKEN = service.PROFILE_TOKEN, 'secret'
+    profiler = service.request_profiler
+    headers = {'X-Profile-Token': 'secret'}
+    client = service.app.test_client()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            service.request_profiler = profiling.RequestProfiler(directory)
+            response = client.post('/admin/profile', json={'requests': 1, 'mode': 'cprofile', 'torch': True}, headers=headers)
+            assert response.get_json()['armed_requests'] == 1
+            assert client.post('/admin/profile', json={'requests': 0}, headers=headers).status_code == 400
+
+            armed = client.post('/predict', data=jpeg_bytes(), content_type='image/jpeg')
+            profile_id = armed.headers['X-Profile-Id']
+            assert 'X-Profile-Id' not in client.post('/predict', data=jpeg_bytes(1), content_type='image/jpeg').headers
+
+            sampled = client.post('/calculate-density', data=jpeg_bytes(2), content_type='image/jpeg',
+                                  headers={**headers, 'X-Profile': 'sampling'})
+            sampled_id = sampled.headers['X-Profile-Id']
+
+            profiles = {entry['id']: entry for entry in client.get('/admin/profiles', headers=headers).get_json()['profiles']}
+            assert set(profiles[profile_id]['artifacts']) == {'summary', 'prof'}
+            assert profiles[sampled_id]['mode'] == 'sampling' and 'folded' in profiles[sampled_id]['artifacts']
+            torch_profiles = [entry for entry in profiles.values() if entry['mode'] == 'torch']
+            assert len(torch_profiles) == 1 and 'torch' in torch_profiles[0]['artifacts']
+
+            summary = client.get(f'/admin/profiles/{profile_id}/summary', headers=headers).get_json()
+            assert summary['endpoint'] == 'predict' and 'predict_fouling' in summary['top_functions']
+            ops = client.get(f"/admin/profiles/{torch_profiles[0]['id']}/ops", headers=headers)
+            assert 'BiofoulingModel.forward' in ops.get_data(as_text=True)
+            assert client.get('/admin/profiles/../prof', headers=headers).status_code == 404
+    finally:
+        service.request_profiler = profiler
+        service.PROFILE_TOKEN = token
+        service.model = loaded_model
+        service.result_cache = cache
+
+def test_failed_request_releases_profiler():
+    """A request whose after-request hooks never run still ends its session, so later requests are profiled"""
+    token, service.PROFILE_TOKEN = service.PROFILE_TOKEN, 'secret'
+    profiler = service.request_profiler
+    headers = {'X-Profile-Token': 'secret', 'X-Profile': 'cprofile', 'X-Profile-Torch': '1'}
+    client = service.app.test_client()
+
+    def failing_hook(response):
+        raise RuntimeError("after-request hook failed")
+
+    hooks = service.app.after_request_funcs.setdefault(None, [])
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            service.request_profiler = profiling.RequestProfiler(directory)
+            # Registered last, so it runs before the hook that normally stops the session
+            hooks.append(failing_hook)
+            try:
+                client.post('/calculate-density', data=jpeg_bytes(), content_type='image/jpeg', headers=headers)
+            except RuntimeError:
+                pass
+            finally:
+                hooks.remove(failing_hook)
+            stats = service.request_profiler.stats()
+            assert not stats['active'] and stats['captured'] == 1
+
+            response = client.post('/calculate-density', data=jpeg_bytes(1), content_type='image/jpeg', headers=headers)
+            assert 'X-Profile-Id' in response.headers
+
+            # A request that finds a session already running neither profiles nor arms a forward pass
+            service.request_profiler = profiling.RequestProfiler(directory)
+            service.request_profiler.claim('cprofile')
+            response = client.post('/calculate-density', data=jpeg_bytes(2), content_type='image/jpeg', headers=headers)
+            assert 'X-Profile-Id' not in response.headers
+            assert service.request_profiler.stats()['armed_forward_passes'] == 0
+    finally:
+        service.request_profiler = profiler
+        service.PROFILE_TOKEN = token
+
+def test_torch_capture_stays_with_its_session():
+    """Requests without a forward pass never leave a torch capture for someone else's /predict"""
+    cache, service.result_cache = service.result_cache, ResultCache(max_entries=0)
+    service.warm_up()
+    loaded_model, service.model = service.model, BiofoulingModel(num_classes=10).eval()
+    token, service.PROFILE_TOKEN = service.PROFILE_TOKEN, 'secret'
+    profiler = service.request_profiler
+    headers = {'X-Profile-Token': 'secret'}
+    client = service.app.test_client()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            service.request_profiler = profiling.RequestProfiler(directory)
+            client.post('/calculate-density', data=jpeg_bytes(), content_type='image/jpeg',
+                        headers={**headers, 'X-Profile': 'cprofile', 'X-Profile-Torch': '1'})
+            assert service.request_profiler.stats()['armed_forward_passes'] == 0
+
+            client.post('/admin/profile', json={'requests': 2, 'torch': True}, headers=headers)
+            for seed in range(2):
+                client.post('/calculate-density', data=jpeg_bytes(seed), content_type='image/jpeg')
+            assert service.request_profiler.stats()['armed_forward_passes'] == 0
+
+            # An unprofiled /predict afterwards runs without a torch capture
+            client.post('/predict', data=jpeg_bytes(3), content_type='image/jpeg')
+            modes = [entry['mode'] for entry in service.request_profiler.list()]
+            assert 'torch' not in modes and len(modes) == 3
+
+            client.post('/admin/profile', json={'requests': 1, 'torch': True}, headers=headers)
+            profile_id = client.post('/predict', data=jpeg_bytes(4), content_type='image/jpeg').headers['X-Profile-Id']
+            torch_profiles = [entry for entry in service.request_profiler.list() if entry['mode'] == 'torch']
+            assert len(torch_profiles) == 1 and torch_profiles[0]['session'] == profile_id
+    finally:
+        service.request_profiler = profiler
+        service.PROFILE_TOKEN = token
+        service.model = loaded_model
+        service.result_cache = cache
+
+if __name__ == "__main__":
+    test_admin_requires_token()
+    print("✅ Profiling access test passed!")
+    test_armed_and_header_profiles()
+    print("✅ Request profiling test passed!")
+    test_failed_request_releases_profiler()
+    print("✅ Failed request profiling test passed!")
+    test_torch_capture_stays_with_its_session()
+    print("✅ Torch capture scoping test passed!")
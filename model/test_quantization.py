@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script for INT8 quantization and the int8 inference backend
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import torch
+from PIL import Image
+from model_architecture import BiofoulingModel
+from backends import load_inference_model
+from quantize_model import default_engine, iterate_batches, measure_memory, quantize_dynamic, quantize_static, save_torchscript
+
+def calibration_images(directory, count=8):
+    """Synthetic hull photos written to disk, as (path, class_id) pairs like sample_split() returns"""
+    rng = np.random.default_rng(0)
+    samples = []
+    for index in range(count):
+        rgb = (rng.random((240, 320, 3)) * 255).astype(np.uint8)
+        path = os.path.join(directory, f'hull_{index}.jpg')
+        Image.fromarray(rgb).save(path, 'JPEG', quality=90)
+        samples.append((path, index % 10))
+    return samples
+
+def outputs_agree(reference, candidate, inputs):
+    with torch.no_grad():
+        expected = reference(inputs)
+        actual = candidate(inputs)
+    for a, b in zip(actual, expected):
+        assert a.shape == b.shape
+        similarity = torch.nn.functional.cosine_similarity(a.flatten(), b.flatten(), dim=0)
+        assert similarity > 0.9, f"quantized outputs diverged (cosine similarity {similarity:.3f})"
+
+def test_static_quantization_loads_through_int8_backend():
+    """Static INT8 of the backbone round-trips through the int8 backend and tracks the fp32 outputs"""
+    torch.backends.quantized.engine = default_engine()
+    torch.manual_seed(0)
+    model = BiofoulingModel(num_classes=10).eval()
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = os.path.join(directory, 'best_model.pt')
+        torch.save(model.state_dict(), model_path)
+        samples = calibration_images(directory)
+
+        output_path = os.path.join(directory, 'best_model.int8.pt')
+        save_torchscript(quantize_static(model_path, samples, torch.backends.quantized.engine, batch_size=4), output_path)
+        int8_model = load_inference_model('int8', output_path, torch.device('cpu'))
+
+        species_logits, coverage = int8_model(torch.randn(3, 3, 224, 224))
+        assert species_logits.shape == (3, 10) and coverage.shape == (3, 1)
+        images, _ = next(iterate_batches(samples, len(samples)))
+        outputs_agree(model, int8_model, images)
+
+        # The artifact really is smaller than the fp32 checkpoint
+        assert os.path.getsize(output_path) < os.path.getsize(model_path) / 2
+
+        memory = measure_memory('int8', output_path)
+        if memory is not None:
+            assert memory['after_forward']['rss_mb'] >= memory['before_load']['rss_mb']
+            print(f"🧠 int8 model memory: {memory['model_mb']}")
+
+def test_dynamic_quantization_only_touches_heads():
+    """Dynamic INT8 quantizes the Linear heads and leaves every backbone conv in fp32"""
+    torch.manual_seed(0)
+    model = BiofoulingModel(num_classes=10).eval()
+    quantized = quantize_dynamic(model)
+    assert not isinstance(quantized.classifier, torch.nn.Linear)
+    assert all(module.weight.dtype == torch.float32
+               for module in quantized.backbone.modules() if isinstance(module, torch.nn.Conv2d))
+
+    with tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, 'best_model.int8.pt')
+        save_torchscript(quantized, output_path)
+        int8_model = load_inference_model('int8', output_path, torch.device('cpu'))
+        outputs_agree(model, int8_model, torch.randn(2, 3, 224, 224))
+
+if __name__ == "__main__":
+    test_static_quantization_loads_through_int8_backend()
+    test_dynamic_quantization_only_touches_heads()
+    print("✅ Quantization tests passed!")
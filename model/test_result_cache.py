@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for the content-hash result cache
+"""
+
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from result_cache import ResultCache, make_cache_key
+
+def test_lru_eviction_and_ttl():
+    """The least recently used entry is evicted first and stale entries expire"""
+    cache = ResultCache(max_entries=2, ttl_seconds=0.05)
+    cache.put('a', {'density': 1})
+    cache.put('b', {'density': 2})
+    assert cache.get('a') == {'density': 1}
+    cache.put('c', {'density': 3})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'density': 1}
+    time.sleep(0.1)
+    assert cache.get('c') is None
+
+    stats = cache.stats()
+    print(f"📊 Cache stats: {stats}")
+    assert stats['evictions'] == 1
+    assert stats['expirations'] == 1
+
+def test_disk_tier_survives_restart():
+    """A new cache instance pointed at the same file serves earlier results"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'results.sqlite3')
+        key = make_cache_key(b'jpeg bytes', 'predict', 'v1')
+        ResultCache(max_entries=4, disk_path=path).put(key, {'species': 'Ulva Lactuca'})
+
+        restarted = ResultCache(max_entries=4, disk_path=path)
+        assert restarted.get(key) == {'species': 'Ulva Lactuca'}
+        assert restarted.get(key) == {'species': 'Ulva Lactuca'}
+        assert restarted.stats()['disk_hits'] == 1
+        assert restarted.stats()['hits'] == 1
+
+def test_keys_depend_on_model_version():
+    """Replacing the weights must not serve results from the old model"""
+    assert make_cache_key(b'jpeg bytes', 'predict', 'v1') != make_cache_key(b'jpeg bytes', 'predict', 'v2')
+    assert make_cache_key(b'jpeg bytes', 'predict', 'v1') != make_cache_key(b'jpeg bytes', 'density', 'v1')
+
+def test_settings_change_predict_keys():
+    """A new density cap or preprocessing path misses results cached on disk under the old settings"""
+    import app as service
+    from image_fixtures import jpeg_bytes
+
+    service.warm_up()
+    settings = service.DENSITY_MAX_PIXELS, service.FAST_PREPROCESS
+    cache = service.result_cache
+    client = service.app.test_client()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.db')
+            service.result_cache = ResultCache(max_entries=16, disk_path=path)
+            image_bytes = jpeg_bytes(size=(640, 480))
+            first = client.post('/predict', data=image_bytes, content_type='image/jpeg').get_json()
+            assert first['analysis']['density_details']['total_pixels'] == 640 * 480
+
+            # Restart with a density cap: the disk tier still holds the full-resolution entry
+            service.DENSITY_MAX_PIXELS = 100_000
+            service.result_cache = ResultCache(max_entries=16, disk_path=path)
+            second = client.post('/predict', data=image_bytes, content_type='image/jpeg').get_json()
+            assert second['analysis']['density_details']['total_pixels'] <= 100_000
+            assert service.result_cache.stats()['disk_hits'] == 0
+
+            service.FAST_PREPROCESS = not service.FAST_PREPROCESS
+            versions = {service.cache_version()}
+            service.DENSITY_MAX_PIXELS = settings[0]
+            versions.add(service.cache_version())
+            assert len(versions) == 2
+    finally:
+        service.DENSITY_MAX_PIXELS, service.FAST_PREPROCESS = settings
+        service.result_cache = cache
+
+if __name__ == "__main__":
+    test_lru_eviction_and_ttl()
+    test_disk_tier_survives_restart()
+    test_keys_depend_on_model_version()
+    test_settings_change_predict_keys()
+    print("✅ Result cache tests passed!")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the pre-forking launcher in serve.py
+"""
+
+import sys
+import os
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import torch
+import app as service
+import serve
+from jobs import JobStore, JobRunner
+
+def test_preloaded_parent_runs_no_jobs():
+    """Preloading never starts job threads in the parent, even with unfinished jobs on disk"""
+    store_path, runner, threads = service.JOB_STORE_PATH, service.job_runner, torch.get_num_threads()
+    with tempfile.TemporaryDirectory() as directory:
+        service.JOB_STORE_PATH = os.path.join(directory, 'jobs.db')
+        store = JobStore(service.JOB_STORE_PATH)
+        job_id = store.create(['left over by a previous process'])
+        service.job_runner = JobRunner(store, lambda items: [{'index': index, 'success': True} for index, _ in items])
+        try:
+            # Run the full warm-up even if an earlier test already did
+            service._service_state['status'] = 'starting'
+            existing = set(threading.enumerate())
+            serve.preload_model(service)
+            assert not service.job_runner.started
+            assert not any(thread.name.startswith('job-worker') for thread in set(threading.enumerate()) - existing)
+
+            # Serving workers resume the jobs after fork
+            service.resume_jobs()
+            assert service.job_runner.started
+            deadline = time.time() + 10
+            while store.get(job_id)['status'] != 'completed':
+                assert time.time() < deadline, "resumed job did not finish"
+                time.sleep(0.02)
+        finally:
+            service.JOB_STORE_PATH, service.job_runner = store_path, runner
+            torch.set_num_threads(threads)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def child_pids(pid):
+    children = set()
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat', 'r') as f:
+                    # The command name may contain spaces, the parent pid follows the closing parenthesis
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        children.add(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return children
+
+def ready_status(port):
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/health/ready', timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+def wait_until(condition, timeout, message):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, message
+        time.sleep(0.1)
+
+def test_prefork_serves_and_respawns_workers():
+    """Two forked workers answer /health/ready, a killed worker is replaced and memory is reported"""
+    if not hasattr(os, 'fork') or not os.path.exists('/proc/self/stat'):
+        print("⚠️ fork or /proc unavailable - skipping prefork smoke test")
+        return
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, PYTHONUNBUFFERED='1', JOB_STORE_PATH=os.path.join(directory, 'jobs.db'))
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py'),
+             '--workers', '2', '--host', '127.0.0.1', '--port', str(port)],
+            cwd=directory, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        output = []
+        reader = threading.Thread(target=lambda: output.extend(server.stdout), daemon=True)
+        reader.start()
+        try:
+            wait_until(lambda: len(child_pids(server.pid)) == 2, 60, "workers were not forked")
+            wait_until(lambda: ready_status(port) == 200, 60, "/health/ready never returned 200")
+            workers = child_pids(server.pid)
+
+            killed = min(workers)
+            os.kill(killed, signal.SIGKILL)
+            wait_until(lambda: len(child_pids(server.pid) - {killed}) == 2, 30, "killed worker was not respawned")
+            assert len(child_pids(server.pid) & workers) == 1
+            wait_until(lambda: ready_status(port) == 200, 30, "respawned server stopped answering")
+
+            # The first per-worker memory report comes from the SIGALRM handler shortly after start-up
+            wait_until(lambda: any('🧠 Parent' in line for line in output), 30, "no memory report")
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+            reader.join(timeout=5)
+        text = ''.join(output)
+        assert f'Worker {killed} exited' in text and 'restarting' in text
+        assert server.returncode == 0
+
+if __name__ == "__main__":
+    test_preloaded_parent_runs_no_jobs()
+    test_prefork_serves_and_respawns_workers()
+    print("✅ Serve tests passed!")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for meta-device, memory-mapped weight loading and the per-process memory report
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import torch
+from model_architecture import BiofoulingModel, build_model_skeleton, load_trained_model
+from process_memory import format_usage, memory_usage
+
+def mapped_ranges(path):
+    """Address ranges of ``path`` in this process's memory map"""
+    ranges = []
+    with open('/proc/self/maps', 'r') as f:
+        for line in f:
+            if line.rstrip().endswith(path):
+                start, end = line.split()[0].split('-')
+                ranges.append((int(start, 16), int(end, 16)))
+    return ranges
+
+def test_mmap_load_shares_file_pages():
+    """Mapped parameters live in the checkpoint file mapping and match a normal load"""
+    torch.manual_seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.realpath(os.path.join(directory, 'best_model.pt'))
+        torch.save(BiofoulingModel(num_classes=10).state_dict(), path)
+        copied = load_trained_model(path, torch.device('cpu'))
+        mapped = load_trained_model(path, torch.device('cpu'), mmap=True)
+
+        inputs = torch.randn(2, 3, 224, 224)
+        with torch.no_grad():
+            assert all(torch.equal(a, b) for a, b in zip(copied(inputs), mapped(inputs)))
+        if os.path.exists('/proc/self/maps'):
+            ranges = mapped_ranges(path)
+            pointer = mapped.classifier.weight.data_ptr()
+            assert any(start <= pointer < end for start, end in ranges)
+            assert not any(start <= copied.classifier.weight.data_ptr() < end for start, end in ranges)
+        del mapped
+
+def test_meta_build_and_load_timings():
+    """The skeleton allocates nothing; loading reports its stages and rejects incomplete checkpoints"""
+    skeleton = build_model_skeleton(10)
+    assert all(parameter.is_meta for parameter in skeleton.parameters())
+
+    torch.manual_seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'best_model.pt')
+        state_dict = BiofoulingModel(num_classes=10).state_dict()
+        torch.save(state_dict, path)
+        timings = {}
+        model = load_trained_model(path, torch.device('cpu'), mmap=True, timings=timings)
+        assert timings['mmap'] is True
+        assert set(timings) >= {'build_seconds', 'read_seconds', 'assign_seconds', 'load_seconds'}
+        assert torch.equal(model.regressor.weight, state_dict['regressor.weight'])
+        assert all(parameter.requires_grad for parameter in model.parameters())
+
+        state_dict.pop('regressor.bias')
+        torch.save(state_dict, path)
+        assert load_trained_model(path, torch.device('cpu')) is None
+
+def test_memory_usage():
+    usage = memory_usage()
+    if usage is None:
+        return
+    assert usage['rss_mb'] > 0
+    assert usage['rss_mb'] >= usage['private_mb']
+    assert format_usage(usage).startswith('RSS ')
+
+if __name__ == "__main__":
+    test_mmap_load_shares_file_pages()
+    print("✅ Memory-mapped loading test passed!")
+    test_meta_build_and_load_timings()
+    print("✅ Meta-device loading test passed!")
+    test_memory_usage()
+    print("✅ Memory usage test passed!")
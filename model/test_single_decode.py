@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test script checking that /predict fetches and decodes each upload once and
+takes density from the same decoded image
+"""
+
+import sys
+import os
+import io
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+import app as service
+import density as density_engine
+from result_cache import ResultCache
+from test_density_engine import hull_jpeg, original_density
+
+def test_predict_fetches_and_decodes_once():
+    """One fetch and one Image.open per /predict, and density never decodes the bytes again"""
+    image_bytes = hull_jpeg(640, 480, 0)
+    calls = {'fetch': 0, 'open': 0, 'decode_grayscale': 0}
+    open_image, fetch, decode_grayscale = Image.open, service.image_fetcher.fetch, density_engine.decode_grayscale
+
+    def counting_open(*args, **kwargs):
+        calls['open'] += 1
+        return open_image(*args, **kwargs)
+
+    def counting_fetch(url):
+        calls['fetch'] += 1
+        return image_bytes
+
+    def counting_decode_grayscale(*args, **kwargs):
+        calls['decode_grayscale'] += 1
+        return decode_grayscale(*args, **kwargs)
+
+    service.warm_up()
+    cache, service.result_cache = service.result_cache, ResultCache(max_entries=0)
+    Image.open, service.image_fetcher.fetch = counting_open, counting_fetch
+    density_engine.decode_grayscale = counting_decode_grayscale
+    try:
+        client = service.app.test_client()
+        response = client.post('/predict', json={'image': 'https://example.com/hull.jpg'})
+        assert response.status_code == 200
+        assert calls == {'fetch': 1, 'open': 1, 'decode_grayscale': 0}
+
+        response = client.post('/predict', data=image_bytes, content_type='image/jpeg')
+        assert response.status_code == 200
+        assert calls == {'fetch': 1, 'open': 2, 'decode_grayscale': 0}
+        assert response.get_json()['analysis']['density_details']['total_pixels'] == 640 * 480
+    finally:
+        Image.open, service.image_fetcher.fetch = open_image, fetch
+        density_engine.decode_grayscale = decode_grayscale
+        service.result_cache = cache
+
+def test_density_from_decoded_image_matches_cv2():
+    """Density from the shared PIL image stays within 1 point of the original cv2 pipeline"""
+    for seed in range(3):
+        image_bytes = hull_jpeg(800, 600, seed)
+        image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+        result = service.calculate_fouling_density(image)
+        assert result['success']
+        assert abs(result['density_percentage'] - original_density(image_bytes)) < 1.0
+
+if __name__ == "__main__":
+    test_predict_fetches_and_decodes_once()
+    test_density_from_decoded_image_matches_cv2()
+    print("✅ Single decode tests passed!")
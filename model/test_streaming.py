@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test script for streamed batch results and their running aggregates
+"""
+
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from image_fixtures import encoded_jpeg
+from streaming import RunningAggregate
+
+def test_running_aggregate():
+    """Mean density, species counts and the worst criticality track the results seen so far"""
+    aggregate = RunningAggregate(total=4)
+    aggregate.add({'success': True, 'analysis': {'density': 20, 'species': 'Ulva Lactuca', 'criticality': 'Low'}})
+    aggregate.add({'success': False, 'error': 'Invalid image data'})
+    aggregate.add({'success': True, 'analysis': {'density': 60, 'species': 'Perna Viridis', 'criticality': 'High'}})
+    aggregate.add({'success': True, 'analysis': {'density': 40, 'species': 'Ulva Lactuca', 'criticality': 'Medium'}})
+    snapshot = aggregate.snapshot()
+    assert snapshot['completed'] == 4 and snapshot['failed'] == 1
+    assert snapshot['mean_density'] == 40.0
+    assert snapshot['species_histogram'] == {'Ulva Lactuca': 2, 'Perna Viridis': 1}
+    assert snapshot['worst_criticality'] == 'High'
+
+def test_stream_endpoint_formats():
+    """NDJSON and SSE streams carry one event per image plus a final summary"""
+    import app as service
+    client = service.app.test_client()
+    images = [encoded_jpeg(0), 'not-an-image', encoded_jpeg(1)]
+
+    lines = client.post('/predict-batch/stream', json={'images': images}).get_data(as_text=True).splitlines()
+    events = [json.loads(line) for line in lines]
+    assert sorted(event['index'] for event in events[:-1]) == [0, 1, 2]
+    assert [event['aggregate']['completed'] for event in events[:-1]] == [1, 2, 3]
+    assert events[-1]['done'] and events[-1]['aggregate']['failed'] == 1
+    assert sum(events[-1]['aggregate']['species_histogram'].values()) == 2
+
+    response = client.post('/predict-batch/stream', json={'images': images},
+                           headers={'Accept': 'text/event-stream'})
+    assert response.mimetype == 'text/event-stream'
+    blocks = [block for block in response.get_data(as_text=True).split('\n\n') if block]
+    assert len(blocks) == 4
+    assert blocks[-1].startswith('event: done')
+    assert json.loads(blocks[0].split('data: ', 1)[1])['aggregate']['total'] == 3
+
+if __name__ == "__main__":
+    test_running_aggregate()
+    test_stream_endpoint_formats()
+    print("✅ Streaming tests passed!")
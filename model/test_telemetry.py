@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for the service metrics and the /metrics endpoint
+"""
+
+import sys
+import os
+import logging
+import signal
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as service
+from image_fixtures import jpeg_bytes
+from result_cache import ResultCache
+from telemetry import BackgroundLogHandler, Registry
+
+def test_histogram_rendering():
+    """Buckets are cumulative and every series ends with _sum and _count"""
+    registry = Registry()
+    histogram = registry.histogram('demo_seconds', 'Demo latency', ('stage',), buckets=(0.1, 1.0))
+    counter = registry.counter('demo_total', 'Demo events')
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage='decode')
+    counter.inc(2)
+
+    text = registry.render()
+    assert 'demo_seconds_bucket{stage="decode",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="decode",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{stage="decode",le="+Inf"} 3' in text
+    assert 'demo_seconds_sum{stage="decode"} 5.55' in text
+    assert 'demo_seconds_count{stage="decode"} 3' in text
+    assert 'demo_total 2' in text
+    assert '# TYPE demo_seconds histogram' in text
+
+def test_metrics_endpoint():
+    """/predict records its stages, and mock predictions and decode failures are counted"""
+    cache, service.result_cache = service.result_cache, ResultCache(max_entries=0)
+    try:
+        service.warm_up()
+        client = service.app.test_client()
+        decodes = service.STAGE_SECONDS.count(stage='decode')
+        failures = service.DECODE_FAILURES.value(stage='decode')
+        mock = service.MOCK_PREDICTIONS.value()
+
+        assert client.post('/predict', data=jpeg_bytes(), content_type='image/jpeg').status_code == 200
+        assert client.post('/predict', data=b'not an image' * 200, content_type='image/jpeg').status_code == 400
+
+        assert service.STAGE_SECONDS.count(stage='decode') == decodes + 2
+        assert service.DECODE_FAILURES.value(stage='decode') == failures + 1
+        if service.model is None:
+            assert service.MOCK_PREDICTIONS.value() == mock + 1
+
+        response = client.get('/metrics')
+        text = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        for stage in ('decode', 'transform', 'otsu', 'response'):
+            assert f'foulingguard_stage_seconds_count{{stage="{stage}"}}' in text
+        assert 'foulingguard_requests_total{endpoint="predict",status="400"}' in text
+        assert 'foulingguard_model_errors_total' in text
+    finally:
+        service.result_cache = cache
+
+def test_log_writer_drains_before_fork():
+    """fork() waits for the writer thread to finish its records, so no child starts mid-write"""
+    if not hasattr(os, 'fork'):
+        return
+
+    class SlowHandler(logging.Handler):
+        written = []
+
+        def emit(self, record):
+            time.sleep(0.2)
+            self.written.append(record.getMessage())
+
+    target = SlowHandler()
+    handler = BackgroundLogHandler(target)
+    logger = logging.getLogger('foulingguard.test_fork')
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        logger.warning("written while the parent forks")
+        time.sleep(0.05)
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                # The parent's record was written before fork() returned, and the child can log on its own
+                logger.warning("written by the child")
+                handler.flush_and_stop()
+                status = 0 if target.written == ["written while the parent forks", "written by the child"] else 1
+            finally:
+                os._exit(status)
+        deadline = time.time() + 10
+        while True:
+            finished, status = os.waitpid(pid, os.WNOHANG)
+            if finished:
+                break
+            if time.time() > deadline:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                assert False, "forked child hung on the log writer"
+            time.sleep(0.05)
+        assert os.waitstatus_to_exitcode(status) == 0
+    finally:
+        logger.removeHandler(handler)
+        handler.flush_and_stop()
+
+if __name__ == "__main__":
+    test_histogram_rendering()
+    print("✅ Histogram rendering test passed!")
+    test_metrics_endpoint()
+    print("✅ Metrics endpoint test passed!")
+    test_log_writer_drains_before_fork()
+    print("✅ Log writer fork test passed!")
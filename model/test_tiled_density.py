@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for tile-by-tile density on memory-mapped mosaics
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from PIL import Image
+from density import calculate_density, otsu_threshold, gray_histogram
+from tiled_density import ArraySource, calculate_tiled_density, open_raw, open_tiff
+
+def hull_mosaic(width, height, seed=0):
+    """Synthetic RGB mosaic that is darker on one side, like uneven hull lighting"""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(40, 140, width, dtype=np.float32)[None, :]
+    patches = (rng.random((-(-height // 16), -(-width // 16))) > 0.75).repeat(16, 0).repeat(16, 1)[:height, :width] * 80
+    gray = gradient + patches + rng.normal(0, 12, (height, width))
+    return np.stack([gray * 0.8, gray, gray * 0.9 + 10], axis=-1).clip(0, 255).astype(np.uint8)
+
+def test_global_threshold_matches_whole_image():
+    """One global threshold over all tiles gives exactly the untiled density"""
+    rgb = hull_mosaic(700, 500)
+    reference = calculate_density(Image.fromarray(rgb).convert('L'))
+    result = calculate_tiled_density(ArraySource(rgb), tile_size=128)
+
+    for key in ('density_percentage', 'total_pixels', 'fouling_pixels', 'threshold'):
+        assert result[key] == reference[key]
+    assert result['grid_shape'] == [4, 6]
+    assert len(result['density_grid']) == 4 and len(result['density_grid'][0]) == 6
+    # The bright side of the gradient carries more fouling than the dark side
+    assert result['density_grid'][0][-1] > result['density_grid'][0][0]
+
+def test_local_threshold_grid():
+    """Per-tile thresholds score each tile on its own histogram"""
+    rgb = hull_mosaic(512, 256, seed=1)
+    gray = np.asarray(Image.fromarray(rgb).convert('L'))
+    result = calculate_tiled_density(ArraySource(rgb), tile_size=256, local_threshold=True)
+
+    assert result['threshold_method'] == 'otsu_local'
+    for col in range(2):
+        tile = gray[:, col * 256:(col + 1) * 256]
+        threshold = otsu_threshold(gray_histogram(tile))
+        expected = round((tile > threshold).sum() / tile.size * 100, 2)
+        assert result['density_grid'][0][col] == expected
+
+def test_memory_mapped_sources():
+    """Uncompressed TIFFs and raw dumps are read through a memory map"""
+    rgb = hull_mosaic(300, 200, seed=2)
+    reference = calculate_tiled_density(ArraySource(rgb), tile_size=64)
+    with tempfile.TemporaryDirectory() as directory:
+        tiff_path = os.path.join(directory, 'mosaic.tif')
+        Image.fromarray(rgb).save(tiff_path, compression=None)
+        source = open_tiff(tiff_path)
+        assert isinstance(source.array, np.memmap)
+        assert calculate_tiled_density(source, tile_size=64) == reference
+
+        raw_path = os.path.join(directory, 'mosaic.raw')
+        rgb.tofile(raw_path)
+        assert calculate_tiled_density(open_raw(raw_path, 300, 200, channels=3), tile_size=64) == reference
+
+        compressed_path = os.path.join(directory, 'mosaic_lzw.tif')
+        Image.fromarray(rgb).save(compressed_path, compression='tiff_lzw')
+        try:
+            open_tiff(compressed_path)
+            assert False, "compressed TIFF should be rejected"
+        except ValueError as e:
+            print(f"✅ Rejected compressed TIFF: {e}")
+
+if __name__ == "__main__":
+    test_global_threshold_matches_whole_image()
+    test_local_threshold_grid()
+    test_memory_mapped_sources()
+    print("✅ Tiled density tests passed!")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for JSON, multipart and raw image uploads to the model service
+"""
+
+import sys
+import os
+import io
+import base64
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as service
+from image_fixtures import jpeg_bytes
+from result_cache import ResultCache
+
+def test_density_upload_forms_agree():
+    """Base64 JSON, multipart and raw image/jpeg bodies give the same density"""
+    # Without a cache every form really goes through its own decode path
+    cache, service.result_cache = service.result_cache, ResultCache(max_entries=0)
+    try:
+        client = service.app.test_client()
+        image_bytes = jpeg_bytes()
+
+        responses = [
+            client.post('/calculate-density', json={'image': base64.b64encode(image_bytes).decode(), 'tile_size': 64}),
+            client.post('/calculate-density', data={'image': (io.BytesIO(image_bytes), 'hull.jpg'), 'tile_size': '64'},
+                        content_type='multipart/form-data'),
+            client.post('/calculate-density?tile_size=64', data=image_bytes, content_type='image/jpeg')
+        ]
+        analyses = [response.get_json()['density_analysis'] for response in responses]
+        assert all(response.status_code == 200 for response in responses)
+        assert all(analysis == analyses[0] for analysis in analyses)
+        assert analyses[0]['grid_shape'] == [4, 5]
+    finally:
+        service.result_cache = cache
+
+def test_upload_errors():
+    """Missing images are rejected with 400 and oversized bodies with 413"""
+    client = service.app.test_client()
+    assert client.post('/calculate-density', json={}).status_code == 400
+    assert client.post('/calculate-density', data=b'', content_type='image/png').status_code == 400
+    assert client.post('/calculate-density', data={'note': 'no file'}, content_type='multipart/form-data').status_code == 400
+    assert client.post('/calculate-density', data=b'not an image' * 200, content_type='image/jpeg').status_code == 400
+
+    limit = service.MAX_UPLOAD_BYTES
+    service.MAX_UPLOAD_BYTES = 1000
+    try:
+        assert client.post('/calculate-density', data=jpeg_bytes(), content_type='image/jpeg').status_code == 413
+    finally:
+        service.MAX_UPLOAD_BYTES = limit
+
+def test_chunked_uploads_are_capped():
+    """Bodies without a Content-Length (chunked transfer) are held to the same cap"""
+    client = service.app.test_client()
+    image_bytes = jpeg_bytes()
+    # The WSGI server de-chunks the body and marks the stream as terminated
+    chunked = {'wsgi.input_terminated': True, 'HTTP_TRANSFER_ENCODING': 'chunked'}
+
+    response = client.post('/calculate-density', input_stream=io.BytesIO(image_bytes), content_type='image/jpeg',
+                           environ_overrides=chunked)
+    assert response.status_code == 200
+
+    limit = service.MAX_UPLOAD_BYTES
+    service.MAX_UPLOAD_BYTES = 1000
+    try:
+        response = client.post('/calculate-density', input_stream=io.BytesIO(image_bytes), content_type='image/jpeg',
+                               environ_overrides=chunked)
+        assert response.status_code == 413
+        boundary = 'hull-boundary'
+        form = (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="hull.jpg"\r\n'
+                f'Content-Type: image/jpeg\r\n\r\n').encode() + image_bytes + f'\r\n--{boundary}--\r\n'.encode()
+        response = client.post('/calculate-density', input_stream=io.BytesIO(form),
+                               content_type=f'multipart/form-data; boundary={boundary}', environ_overrides=chunked)
+        assert response.status_code == 413
+    finally:
+        service.MAX_UPLOAD_BYTES = limit
+
+if __name__ == "__main__":
+    test_density_upload_forms_agree()
+    test_upload_errors()
+    test_chunked_uploads_are_capped()
+    print("✅ Upload tests passed!")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test script for the embedding index and the /embed and /index endpoints
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import app as service
+from image_fixtures import encoded_jpeg, jpeg_bytes
+from model_architecture import BiofoulingModel
+from vector_index import VectorIndex
+
+def clustered_vectors(count, dim=64, clusters=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, count)] + 0.3 * rng.normal(size=(count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def test_exact_search_and_incremental_inserts():
+    """Rows persist, load memory-mapped, and other instances see later inserts"""
+    vectors = clustered_vectors(300)
+    with tempfile.TemporaryDirectory() as directory:
+        writer = VectorIndex(directory, dim=64)
+        writer.add(vectors[:200], [f'hull-{i}' for i in range(200)], [{'vessel': i % 7} for i in range(200)])
+
+        reader = VectorIndex(directory, dim=64)
+        top = reader.search(vectors[5], k=3)
+        assert top[0]['id'] == 'hull-5' and top[0]['metadata'] == {'vessel': 5}
+        assert abs(top[0]['score'] - 1.0) < 1e-5
+        assert isinstance(reader._vectors, np.memmap)
+
+        # An interrupted insert leaves bytes past the committed count; the next insert overwrites them
+        with open(os.path.join(directory, 'vectors.f32'), 'ab') as f:
+            f.write(b'\0' * 100)
+        writer.add(vectors[200:], [f'hull-{i}' for i in range(200, 300)])
+        assert len(reader) == 300
+        assert reader.search(vectors[250], k=1)[0]['id'] == 'hull-250'
+        assert os.path.getsize(os.path.join(directory, 'vectors.f32')) == 300 * 64 * 4
+
+def test_trained_search_recall():
+    """IVF and PQ candidates, re-scored exactly, find most of the exact neighbours"""
+    vectors = clustered_vectors(2000)
+    with tempfile.TemporaryDirectory() as directory:
+        index = VectorIndex(directory, dim=64)
+        index.add(vectors[:1500], [str(i) for i in range(1500)])
+        index.train(ivf_lists=16, pq_subspaces=8, iterations=10)
+        # Inserts after training are assigned to lists and encoded as well
+        index.add(vectors[1500:], [str(i) for i in range(1500, 2000)])
+        assert index.stats()['ivf'] == {'lists': 16}
+
+        queries = clustered_vectors(20, seed=1)
+        for method in ('ivf', 'pq', 'ivf_pq'):
+            recall = []
+            for query in queries:
+                exact = {match['id'] for match in index.search(query, 10, 'exact')}
+                approximate = {match['id'] for match in index.search(query, 10, method, nprobe=4, rerank=200)}
+                recall.append(len(exact & approximate) / 10)
+            assert np.mean(recall) >= 0.8, (method, np.mean(recall))
+
+def test_embed_and_index_endpoints():
+    service.warm_up()
+    loaded_model, service.model = service.model, BiofoulingModel(num_classes=10).eval()
+    index = service.vector_index
+    client = service.app.test_client()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            service.vector_index = VectorIndex(directory)
+            response = client.post('/embed', data=jpeg_bytes(), content_type='image/jpeg')
+            embedding = np.array(response.get_json()['embedding'])
+            assert embedding.shape == (2048,) and abs(np.linalg.norm(embedding) - 1) < 1e-4
+
+            images = [encoded_jpeg(seed) for seed in range(3)] + ['not an image' * 20]
+            batch = client.post('/embed-batch', json={'images': images}).get_json()
+            assert batch['failed'] == 1
+            assert np.allclose(batch['results'][0]['embedding'], embedding, atol=1e-5)
+
+            added = client.post('/index/add', json={'images': images, 'ids': ['a', 'b', 'c', 'd'],
+                                                    'metadata': [{'vessel': 'A'}, None, None, None]}).get_json()
+            assert added['added'] == 3 and added['index']['count'] == 3
+            matches = client.post('/index/search?k=2', data=jpeg_bytes(0), content_type='image/jpeg').get_json()['matches']
+            assert matches[0]['id'] == 'a' and matches[0]['metadata'] == {'vessel': 'A'}
+            assert len(matches) == 2
+            assert client.post('/index/add', json={'images': images, 'ids': ['a']}).status_code == 400
+
+        service.model = None
+        assert client.post('/embed', data=jpeg_bytes(), content_type='image/jpeg').status_code == 503
+    finally:
+        service.vector_index = index
+        service.model = loaded_model
+
+def test_empty_lists_are_skipped():
+    """More IVF lists than distinct rows leaves some lists empty; nprobe=1 still finds the nearest rows"""
+    base = clustered_vectors(2, dim=8, clusters=2, seed=3)
+    with tempfile.TemporaryDirectory() as directory:
+        index = VectorIndex(directory, dim=8)
+        index.add(np.repeat(base, 3, axis=0), [f'row-{row}' for row in range(6)])
+        index.train(ivf_lists=6, pq_subspaces=4)
+        lists = np.fromfile(os.path.join(directory, 'ivf_lists.i32'), dtype=np.int32)
+        assert (np.bincount(lists, minlength=6) == 0).any()
+        for method in ('ivf', 'ivf_pq'):
+            for seed in range(5):
+                query = base[seed % 2]
+                matches = index.search(query, k=2, method=method, nprobe=1)
+                assert len(matches) == 2
+                assert all(int(match['id'][4:]) // 3 == seed % 2 for match in matches)
+
+def test_cli_search_rejects_unreadable_images():
+    """search on a non-image or missing file reports it and exits non-zero instead of crashing"""
+    import vector_index
+
+    service.warm_up()
+    loaded_model, service.model = service.model, BiofoulingModel(num_classes=10).eval()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            notes = os.path.join(directory, 'notes.jpg')
+            with open(notes, 'wb') as f:
+                f.write(b'not an image' * 200)
+            for target in (notes, os.path.join(directory, 'missing.jpg')):
+                assert vector_index.main(['search', target, '--index', os.path.join(directory, 'index')]) == 1
+
+            photo = os.path.join(directory, 'hull.jpg')
+            with open(photo, 'wb') as f:
+                f.write(jpeg_bytes())
+            assert vector_index.main(['search', photo, '--index', os.path.join(directory, 'index')]) == 0
+    finally:
+        service.model = loaded_model
+
+if __name__ == "__main__":
+    test_exact_search_and_incremental_inserts()
+    print("✅ Exact search and insert test passed!")
+    test_trained_search_recall()
+    print("✅ IVF/PQ recall test passed!")
+    test_empty_lists_are_skipped()
+    print("✅ Empty IVF list test passed!")
+    test_cli_search_rejects_unreadable_images()
+    print("✅ CLI search input test passed!")
+    test_embed_and_index_endpoints()
+    print("✅ Embedding endpoint test passed!")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tile-by-tile Otsu density for hull mosaics too large to decode in memory.
+
+    python tiled_density.py mosaic.tif --tile-size 1024
+    python tiled_density.py mosaic.raw --raw-shape 120000x80000x3 --local-threshold
+
+The mosaic is read through a memory map (uncompressed TIFF or raw pixel dump),
+one tile at a time, and only a 256-bin histogram per tile is kept. The global
+Otsu threshold comes from the sum of those histograms, so memory use depends
+on the tile size, not on the mosaic size, and the pixels are read only once.
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+from PIL import Image
+from density import density_from_histogram, otsu_threshold
+
+TIFF_COMPRESSION = 259
+TIFF_STRIP_OFFSETS = 273
+TIFF_SAMPLES_PER_PIXEL = 277
+TIFF_STRIP_BYTE_COUNTS = 279
+TIFF_PLANAR_CONFIG = 284
+TIFF_BITS_PER_SAMPLE = 258
+
+
+class ArraySource:
+    """Tiles from an in-memory or memory-mapped HxW or HxWxC uint8 array"""
+
+    def __init__(self, array):
+        if array.dtype != np.uint8 or array.ndim not in (2, 3):
+            raise ValueError("Expected an HxW or HxWxC uint8 array")
+        self.array = array
+        self.height, self.width = array.shape[:2]
+
+    def read_gray(self, top, left, height, width):
+        tile = self.array[top:top + height, left:left + width]
+        if tile.ndim == 2:
+            return np.asarray(tile)
+        if tile.shape[2] == 1:
+            return np.asarray(tile[:, :, 0])
+        # ITU-R 601-2 luma with PIL's fixed-point rounding, so results match Image.convert('L')
+        rgb = tile[:, :, :3].astype(np.uint32)
+        return ((rgb[:, :, 0] * 19595 + rgb[:, :, 1] * 38470 + rgb[:, :, 2] * 7471 + 0x8000) >> 16).astype(np.uint8)
+
+
+def open_raw(path, width, height, channels=1, offset=0):
+    """Memory-map a raw uint8 pixel dump (row-major, interleaved channels)"""
+    shape = (height, width) if channels == 1 else (height, width, channels)
+    return ArraySource(np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=shape))
+
+
+def open_tiff(path):
+    """Memory-map an uncompressed, 8-bit, chunky TIFF whose strips are stored contiguously"""
+    with Image.open(path) as image:
+        tags = image.tag_v2
+        width, height = image.size
+        compression = tags.get(TIFF_COMPRESSION, 1)
+        compression_name = image.info.get('compression', compression)
+        bits = tags.get(TIFF_BITS_PER_SAMPLE, (8,))
+        samples = tags.get(TIFF_SAMPLES_PER_PIXEL, 1)
+        planar = tags.get(TIFF_PLANAR_CONFIG, 1)
+        offsets = list(tags.get(TIFF_STRIP_OFFSETS, ()))
+        counts = list(tags.get(TIFF_STRIP_BYTE_COUNTS, ()))
+
+    bits = bits if isinstance(bits, tuple) else (bits,)
+    if compression != 1 or planar != 1 or any(b != 8 for b in bits):
+        raise ValueError(f"Only uncompressed 8-bit chunky TIFFs can be memory-mapped (compression: {compression_name})")
+    if not offsets or any(offsets[i] + counts[i] != offsets[i + 1] for i in range(len(offsets) - 1)):
+        raise ValueError("TIFF strips are not stored contiguously")
+    return open_raw(path, width, height, channels=samples, offset=offsets[0])
+
+
+def iter_tiles(height, width, tile_size):
+    for top in range(0, height, tile_size):
+        for left in range(0, width, tile_size):
+            yield top, left, min(tile_size, height - top), min(tile_size, width - left)
+
+
+def calculate_tiled_density(source, tile_size=1024, local_threshold=False):
+    """Global Otsu density plus a per-tile density grid, reading each tile once.
+
+    With ``local_threshold`` every tile is thresholded with its own Otsu
+    value, which follows lighting changes across a long hull; otherwise one
+    threshold is computed from the whole mosaic's histogram.
+    """
+    rows = -(-source.height // tile_size)
+    cols = -(-source.width // tile_size)
+    tile_histograms = np.zeros((rows * cols, 256), dtype=np.int64)
+
+    for index, (top, left, height, width) in enumerate(iter_tiles(source.height, source.width, tile_size)):
+        gray = source.read_gray(top, left, height, width)
+        tile_histograms[index] = np.bincount(gray.ravel(), minlength=256)
+
+    tile_pixels = tile_histograms.sum(axis=1)
+    if local_threshold:
+        thresholds = np.array([otsu_threshold(hist) for hist in tile_histograms])
+    else:
+        global_threshold = otsu_threshold(tile_histograms.sum(axis=0))
+        thresholds = np.full(len(tile_histograms), global_threshold)
+
+    # Pixels above each tile's threshold, read off the cumulative histograms
+    above = tile_pixels - np.take_along_axis(np.cumsum(tile_histograms, axis=1), thresholds[:, None], axis=1)[:, 0]
+    grid = np.round(above / np.maximum(tile_pixels, 1) * 100, 2).reshape(rows, cols)
+
+    if local_threshold:
+        total_pixels = int(tile_pixels.sum())
+        fouling_pixels = int(above.sum())
+        result = {
+            'density_percentage': round(fouling_pixels / total_pixels * 100, 2) if total_pixels else 0.0,
+            'total_pixels': total_pixels,
+            'fouling_pixels': fouling_pixels,
+            'threshold': None,
+            'threshold_method': 'otsu_local'
+        }
+    else:
+        result = density_from_histogram(tile_histograms.sum(axis=0))
+
+    result.update({
+        'tile_size': tile_size,
+        'grid_shape': [rows, cols],
+        'density_grid': grid.tolist()
+    })
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Tile-by-tile Otsu density for large hull mosaics')
+    parser.add_argument('path', help='uncompressed TIFF, or raw uint8 pixels with --raw-shape')
+    parser.add_argument('--raw-shape', help='WIDTHxHEIGHT[xCHANNELS] of a raw pixel file')
+    parser.add_argument('--raw-offset', type=int, default=0, help='header bytes to skip in a raw file')
+    parser.add_argument('--tile-size', type=int, default=1024)
+    parser.add_argument('--local-threshold', action='store_true', help='threshold each tile on its own')
+    parser.add_argument('--output', help='write the JSON result here instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.raw_shape:
+        dims = [int(value) for value in args.raw_shape.lower().split('x')]
+        source = open_raw(args.path, dims[0], dims[1], channels=dims[2] if len(dims) > 2 else 1, offset=args.raw_offset)
+    else:
+        source = open_tiff(args.path)
+
+    print(f"🧩 Mosaic {source.width}x{source.height}, {args.tile_size}px tiles", file=sys.stderr)
+    result = calculate_tiled_density(source, args.tile_size, args.local_threshold)
+    print(f"✅ Density: {result['density_percentage']}% over {result['grid_shape'][0]}x{result['grid_shape'][1]} tiles",
+          file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f)
+    else:
+        json.dump(result, sys.stdout)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Local nearest-neighbour index over BiofoulingModel embeddings.
+
+    python vector_index.py add surveys/2023-drydock/ --index model/vector_index
+    python vector_index.py train --index model/vector_index --ivf 64 --pq 16
+    python vector_index.py search hull.jpg --index model/vector_index -k 5
+    python vector_index.py info --index model/vector_index
+
+The index is a directory of flat files: ``vectors.f32`` holds one float32
+row per embedding and is memory-mapped for search, ``ids.jsonl`` holds each
+row's id and metadata, and ``meta.json`` records the committed row count, so
+rows appended by an interrupted insert are ignored and overwritten by the
+next one. Search is exact brute force by default. ``train`` adds an IVF
+coarse quantizer (probe only the closest lists) and/or product-quantization
+codes (score compressed codes, then rerank the best candidates exactly);
+both are kept up to date by later inserts.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: inserts are only serialised within one process
+    fcntl = None
+
+SEARCH_CHUNK_ROWS = 65536
+
+
+def nearest_centroids(data, centroids):
+    """Index of the closest centroid (squared L2) for every row"""
+    distances = (centroids ** 2).sum(axis=1)[None, :] - 2 * data @ centroids.T
+    return np.argmin(distances, axis=1)
+
+
+def kmeans(data, k, iterations=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignment = nearest_centroids(data, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        counts = np.bincount(assignment, minlength=k)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+def pq_encode(vectors, codebooks):
+    """uint8 code per subspace for every row; codebooks are (subspaces, codes, sub_dim)"""
+    subspaces, _, sub_dim = codebooks.shape
+    codes = np.empty((len(vectors), subspaces), dtype=np.uint8)
+    for subspace in range(subspaces):
+        part = vectors[:, subspace * sub_dim:(subspace + 1) * sub_dim]
+        codes[:, subspace] = nearest_centroids(part, codebooks[subspace])
+    return codes
+
+
+class VectorIndex:
+    """Append-only inner-product index stored in ``path``; opened lazily and re-mapped when it grows.
+
+    Vectors should be L2-normalised, so inner product is cosine similarity.
+    Inserts from several worker processes are serialised with a file lock;
+    every process picks up the others' rows on its next search.
+    """
+
+    def __init__(self, path, dim=2048):
+        self.path = path
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._version = None
+        self._meta = None
+        self._vectors = None
+        self._lists = None
+        self._codes = None
+        self._centroids = None
+        self._codebooks = None
+        self._ids = []
+        self._metadata = []
+        self._ids_offset = 0
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _read_meta(self):
+        try:
+            with open(self._file('meta.json'), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'dim': self.dim, 'count': 0, 'ids_bytes': 0, 'ivf': None, 'pq': None}
+
+    def _write_meta(self, meta):
+        temporary = self._file('meta.json.tmp')
+        with open(temporary, 'w') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self._file('meta.json'))
+
+    def _map(self, name, dtype, shape):
+        if shape[0] == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode='r', shape=shape)
+
+    def _refresh(self):
+        """Re-map the files if meta.json changed since the last call (another insert committed)"""
+        try:
+            stat = os.stat(self._file('meta.json'))
+            version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            version = None
+        if version == self._version and self._meta is not None:
+            return
+        meta = self._read_meta()
+        count, dim = meta['count'], meta['dim']
+        self._vectors = self._map('vectors.f32', np.float32, (count, dim))
+        self._lists = self._map('ivf_lists.i32', np.int32, (count,)) if meta['ivf'] else None
+        self._codes = self._map('pq_codes.u8', np.uint8, (count, meta['pq']['subspaces'])) if meta['pq'] else None
+        self._centroids = np.load(self._file('ivf_centroids.npy')) if meta['ivf'] else None
+        self._codebooks = np.load(self._file('pq_codebooks.npy')) if meta['pq'] else None
+
+        if count < len(self._ids):
+            self._ids, self._metadata, self._ids_offset = [], [], 0
+        if count > len(self._ids):
+            with open(self._file('ids.jsonl'), 'rb') as f:
+                f.seek(self._ids_offset)
+                for line in f.read(meta['ids_bytes'] - self._ids_offset).splitlines():
+                    row = json.loads(line)
+                    self._ids.append(row['id'])
+                    self._metadata.append(row.get('metadata'))
+            self._ids_offset = meta['ids_bytes']
+        self._meta = meta
+        self._version = version
+
+    def _file_lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        handle = open(self._file('.lock'), 'w')
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _append(self, name, data, committed_bytes):
+        # Drop whatever an interrupted insert left past the committed end, then append
+        with open(self._file(name), 'ab') as f:
+            f.truncate(committed_bytes)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replace(self, name, array):
+        # New inode, so other processes' existing mappings keep the old contents instead of faulting
+        temporary = self._file(name + '.tmp')
+        with open(temporary, 'wb') as f:
+            if name.endswith('.npy'):
+                np.save(f, array)
+            else:
+                array.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self._file(name))
+
+    def add(self, vectors, ids, metadata=None):
+        """Append rows; ``ids`` are caller-chosen strings, ``metadata`` optional JSON objects"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        metadata = metadata if metadata is not None else [None] * len(ids)
+        if len(metadata) != len(ids):
+            raise ValueError("ids and metadata must have the same length")
+        with self._lock, self._file_lock():
+            meta = self._read_meta()
+            if vectors.shape[1] != meta['dim']:
+                raise ValueError(f"Expected {meta['dim']}-d vectors, got {vectors.shape[1]}-d")
+            count = meta['count']
+            lines = b''.join(
+                (json.dumps({'id': str(item_id), 'metadata': item_metadata}) + '\n').encode()
+                for item_id, item_metadata in zip(ids, metadata)
+            )
+            self._append('vectors.f32', vectors.tobytes(), count * meta['dim'] * 4)
+            self._append('ids.jsonl', lines, meta['ids_bytes'])
+            if meta['ivf']:
+                centroids = np.load(self._file('ivf_centroids.npy'))
+                lists = nearest_centroids(vectors, centroids).astype(np.int32)
+                self._append('ivf_lists.i32', lists.tobytes(), count * 4)
+            if meta['pq']:
+                codes = pq_encode(vectors, np.load(self._file('pq_codebooks.npy')))
+                self._append('pq_codes.u8', codes.tobytes(), count * meta['pq']['subspaces'])
+            meta['count'] = count + len(ids)
+            meta['ids_bytes'] += len(lines)
+            self._write_meta(meta)
+        return meta['count']
+
+    def train(self, ivf_lists=0, pq_subspaces=0, sample=50000, iterations=20, seed=0):
+        """Fit IVF centroids and/or PQ codebooks on a sample of the stored rows and encode every row"""
+        with self._lock, self._file_lock():
+            self._version = None
+            self._refresh()
+            meta = dict(self._meta)
+            count, dim = meta['count'], meta['dim']
+            if count == 0:
+                raise ValueError("Cannot train an empty index")
+            rng = np.random.default_rng(seed)
+            rows = np.sort(rng.choice(count, min(count, sample), replace=False))
+            training = np.asarray(self._vectors[rows], dtype=np.float32)
+
+            if ivf_lists:
+                centroids = kmeans(training, min(ivf_lists, len(training)), iterations, seed)
+                self._replace('ivf_centroids.npy', centroids)
+                lists = np.concatenate([
+                    nearest_centroids(np.asarray(self._vectors[start:start + SEARCH_CHUNK_ROWS]), centroids)
+                    for start in range(0, count, SEARCH_CHUNK_ROWS)
+                ]).astype(np.int32)
+                self._replace('ivf_lists.i32', lists)
+                meta['ivf'] = {'lists': len(centroids)}
+            if pq_subspaces:
+                if dim % pq_subspaces:
+                    raise ValueError(f"{dim} dimensions do not split into {pq_subspaces} subspaces")
+                sub_dim = dim // pq_subspaces
+                codebooks = np.stack([
+                    kmeans(training[:, subspace * sub_dim:(subspace + 1) * sub_dim], min(256, len(training)),
+                           iterations, seed + subspace)
+                    for subspace in range(pq_subspaces)
+                ])
+                self._replace('pq_codebooks.npy', codebooks)
+                codes = np.concatenate([
+                    pq_encode(np.asarray(self._vectors[start:start + SEARCH_CHUNK_ROWS]), codebooks)
+                    for start in range(0, count, SEARCH_CHUNK_ROWS)
+                ])
+                self._replace('pq_codes.u8', codes)
+                meta['pq'] = {'subspaces': pq_subspaces, 'codes': codebooks.shape[1]}
+            self._write_meta(meta)
+            self._version = None
+        return self.stats()
+
+    def search(self, query, k=10, method=None, nprobe=8, rerank=100):
+        """The ``k`` rows with the highest inner product with ``query``.
+
+        ``method`` is 'exact', 'ivf', 'pq' or 'ivf_pq'; by default every
+        trained structure is used. Approximate candidates are always
+        re-scored exactly against the mapped vectors.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        with self._lock:
+            self._refresh()
+            vectors, lists, codes = self._vectors, self._lists, self._codes
+            centroids, codebooks = self._centroids, self._codebooks
+            ids, metadata = self._ids, self._metadata
+        count = len(vectors)
+        if count == 0:
+            return []
+        if query.shape[0] != vectors.shape[1]:
+            raise ValueError(f"Expected a {vectors.shape[1]}-d query, got {query.shape[0]}-d")
+        if method is None:
+            method = ('ivf_' if lists is not None else '') + ('pq' if codes is not None else '')
+            method = method.rstrip('_') or 'exact'
+        use_ivf, use_pq = 'ivf' in method, 'pq' in method
+        if (use_ivf and lists is None) or (use_pq and codes is None) or method not in ('exact', 'ivf', 'pq', 'ivf_pq'):
+            raise ValueError(f"Search method '{method}' is not available for this index")
+
+        candidates = None
+        if use_ivf:
+            # Probe the nprobe closest lists that hold rows; k-means leaves some lists empty
+            # (duplicate rows, more lists than distinct vectors), and those add no candidates
+            populated = np.bincount(lists, minlength=len(centroids)) > 0
+            order = np.argsort(((centroids - query) ** 2).sum(axis=1))
+            probed = order[populated[order]][:nprobe]
+            candidates = np.flatnonzero(np.isin(lists, probed))
+        if use_pq:
+            subspaces, _, sub_dim = codebooks.shape
+            table = np.einsum('scd,sd->sc', codebooks, query.reshape(subspaces, sub_dim))
+            candidate_codes = codes if candidates is None else codes[candidates]
+            if len(candidate_codes) == 0:
+                return []
+            approximate = table[np.arange(subspaces), candidate_codes].sum(axis=1)
+            keep = min(len(approximate), max(rerank, k))
+            best = np.argpartition(-approximate, keep - 1)[:keep]
+            candidates = best if candidates is None else candidates[best]
+
+        if candidates is None:
+            scores = np.concatenate([
+                vectors[start:start + SEARCH_CHUNK_ROWS] @ query for start in range(0, count, SEARCH_CHUNK_ROWS)
+            ])
+            candidates = np.arange(count)
+        else:
+            candidates = np.sort(candidates)
+            scores = np.asarray(vectors[candidates]) @ query
+        if len(scores) == 0:
+            return []
+        top = min(k, len(scores))
+        order = np.argpartition(-scores, top - 1)[:top]
+        order = order[np.argsort(-scores[order])]
+        return [
+            {'id': ids[candidates[index]], 'score': round(float(scores[index]), 6),
+             'metadata': metadata[candidates[index]]}
+            for index in order
+        ]
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return self._meta['count']
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            meta = self._meta
+        return {
+            'path': self.path,
+            'count': meta['count'],
+            'dim': meta['dim'],
+            'ivf': meta['ivf'],
+            'pq': meta['pq']
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Build and query the inspection image embedding index')
+    parser.add_argument('command', choices=('add', 'train', 'search', 'info'))
+    parser.add_argument('target', nargs='?', help='add: image folder; search: image file')
+    parser.add_argument('--index', default=os.environ.get('VECTOR_INDEX_PATH', os.path.join('model', 'vector_index')))
+    parser.add_argument('--manifest', help='add: text file of image paths, or a CSV with a "path" column')
+    parser.add_argument('--model-path', default=os.environ.get('MODEL_PATH'))
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument('--ivf', type=int, default=0, help='train: number of IVF lists')
+    parser.add_argument('--pq', type=int, default=0, help='train: number of PQ subspaces (must divide 2048)')
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--method', choices=('exact', 'ivf', 'pq', 'ivf_pq'))
+    parser.add_argument('--nprobe', type=int, default=8)
+    args = parser.parse_args(argv)
+    if args.command == 'search' and not args.target:
+        parser.error('search needs an image file')
+    if args.command == 'add' and bool(args.target) == bool(args.manifest):
+        parser.error('add needs either an image folder or --manifest')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    index = VectorIndex(args.index)
+    if args.command == 'info':
+        print(json.dumps(index.stats(), indent=2))
+        return 0
+    if args.command == 'train':
+        print(json.dumps(index.train(args.ivf, args.pq), indent=2))
+        return 0
+
+    if args.model_path:
+        os.environ['MODEL_PATH'] = args.model_path
+    import torch
+    import app as service
+    import bulk_score
+    service.warm_up()
+    if not service.supports_embeddings():
+        print("❌ Embeddings need the trained eager model (INFERENCE_BACKEND=eager or compile)")
+        return 1
+
+    if args.command == 'search':
+        try:
+            with open(args.target, 'rb') as f:
+                image = service.decode_image(f.read())
+        except OSError as e:
+            print(f"❌ Cannot read {args.target}: {e}", file=sys.stderr)
+            return 1
+        image_tensor = service.process_image(image) if image is not None else None
+        if image_tensor is None:
+            print(f"❌ {args.target} is not a readable image", file=sys.stderr)
+            return 1
+        embedding = service.embed_tensors([image_tensor])[0]
+        for rank, match in enumerate(index.search(embedding, args.k, args.method, args.nprobe), 1):
+            print(f"{rank:>3}. {match['score']:.4f}  {match['id']}")
+        return 0
+
+    paths = bulk_score.read_manifest(args.manifest) if args.manifest else bulk_score.list_images(args.target)
+    known = set(index._ids) if len(index) else set()
+    todo = [path for path in paths if path not in known]
+    print(f"📂 {len(paths)} images, {len(paths) - len(todo)} already indexed, {len(todo)} to go")
+    loader = torch.utils.data.DataLoader(
+        bulk_score.ImageFileDataset(todo),
+        batch_size=args.batch_size,
+        num_workers=args.workers,
+        collate_fn=bulk_score.collate_items,
+        prefetch_factor=2 if args.workers > 0 else None
+    )
+    for items in loader:
+        valid = [(path, tensor) for path, tensor, _, error in items if error is None]
+        if valid:
+            embeddings = service.embed_tensors([tensor.unsqueeze(0) for _, tensor in valid])
+            total = index.add(embeddings, [path for path, _ in valid])
+            print(f"⏱️ {total} vectors indexed")
+    print(f"✅ Index at {args.index} holds {len(index)} vectors")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,22 @@ const router = express.Router();
 // AI Model Service Configuration
 const AI_SERVICE_URL = process.env.AI_SERVICE_URL || 'http://localhost:5001';
 
+// Build the model service request for an image: URLs stay JSON, base64 uploads are
+// decoded here and sent as a raw image/* body (no base64 or JSON parsing in Python)
+const toModelRequest = (image) => {
+  if (typeof image === 'string' && image.startsWith('http')) {
+    return { body: { image }, headers: { 'Content-Type': 'application/json' } };
+  }
+  // Drop any data URL prefix ("data:<type>[;params];base64,"), like load_image_bytes in the model service
+  const comma = image.indexOf(',');
+  const base64Data = comma === -1 ? image : image.slice(comma + 1);
+  const mediaType = /^data:(image\/[\w.+-]+)[;,]/.exec(image);
+  return {
+    body: Buffer.from(base64Data, 'base64'),
+    headers: { 'Content-Type': mediaType ? mediaType[1] : 'application/octet-stream' }
+  };
+};
+
 // Health check for AI service
 router.get('/health', async (req, res) => {
   console.log('🔍 Checking AI service health...');
@@ -42,11 +58,13 @@ router.post('/analyze', async (req, res) => {
     
     // Call AI model service
     console.log('📡 Sending image to AI model...');
+    const modelRequest = toModelRequest(image);
     const aiResponse = await axios.post(`${AI_SERVICE_URL}/predict`, 
-      { image }, 
+      modelRequest.body, 
       { 
         timeout: 30000,
-        headers: { 'Content-Type': 'application/json' }
+        headers: modelRequest.headers,
+        maxBodyLength: Infinity
       }
     );
     
@@ -120,11 +138,13 @@ router.post('/calculate-density', async (req, res) => {
     
     // Call AI model service for density calculation
     console.log('📡 Sending image to AI model for density calculation...');
+    const modelRequest = toModelRequest(image);
     const densityResponse = await axios.post(`${AI_SERVICE_URL}/calculate-density`, 
-      { image }, 
+      modelRequest.body, 
       { 
         timeout: 30000,
-        headers: { 'Content-Type': 'application/json' }
+        headers: modelRequest.headers,
+        maxBodyLength: Infinity
       }
     );
     